@@ -1,11 +1,12 @@
 # -*- coding: utf-8 -*-
-import curses
 import shlex # For parsing command arguments safely
 import json # For saving/loading game state
 import os # For path manipulation
-from collections import deque # For fill command BFS
 from .element_manager import element_manager
-from .config import TARGET_FPS as DEFAULT_TARGET_FPS, MAX_CURSOR_SIZE
+from .savefile import save_grid, load_grid, BINARY_EXTENSION, JSON_EXTENSION
+from .replay import Recorder, ReplayPlayer, load_replay, REPLAY_EXTENSION
+from .timeline import Timeline, TIMELINE_EXTENSION
+from .config import DEFAULT_TICK_RATE, MAX_CURSOR_SIZE, TIMELINE_KEYFRAME_TICKS, FILL_MAX_CELLS
 
 class CommandError(Exception):
     """Custom exception for command processing errors."""
@@ -14,12 +15,10 @@ class CommandError(Exception):
 class CommandProcessor:
     """Handles parsing and execution of user commands."""
 
-    # In-memory quick save slots
-    quick_saves = {} # {number: grid_state_dict}
-
     def __init__(self, game_instance, screen_interface):
         self.game = game_instance
-        self.screen = screen_interface # To interact with curses (e.g., show messages)
+        self.screen = screen_interface # The curses screen (messages go through game.messages)
+        self.quick_saves = {} # In-memory quick save slots {number: GridSnapshot}, per game
         self.commands = {
             "fill": self._cmd_fill,
             "clear": self._cmd_clear,
@@ -27,7 +26,19 @@ class CommandProcessor:
             "size": self._cmd_size,
             "fps": self._cmd_fps,
             "speed": self._cmd_speed,
+            "tick_rate": self._cmd_tick_rate, # Simulation steps per second only
+            "render_rate": self._cmd_render_rate, # Drawn frames per second only
             "tag": self._cmd_tag,
+            "pause": self._cmd_pause,     # Toggle the simulation on/off
+            "step": self._cmd_step,       # Advance a paused simulation by N ticks
+            "ff": self._cmd_ff,           # Fast-forward N ticks without drawing
+            "undo": self._cmd_undo,       # Revert the last N edits
+            "redo": self._cmd_redo,       # Re-apply the last N undone edits
+            "keyframes": self._cmd_keyframes, # Checkpoint the simulation into the undo history
+            "seed": self._cmd_seed,       # Show or set the simulation random seed
+            "record": self._cmd_record,   # Log inputs and commands to a replay file
+            "replay": self._cmd_replay,   # Play a replay file back headlessly
+            "timeline": self._cmd_timeline, # Record a seekable timeline / jump to a recorded tick
             "help": self._cmd_help,
             "save": self._cmd_save,       # Added save command
             "load": self._cmd_load,       # Added load command
@@ -37,27 +48,8 @@ class CommandProcessor:
         }
 
     def show_message(self, message, duration=1.5):
-        """Displays a message at the bottom of the screen."""
-        if not self.screen: return
-        h, w = self.screen.getmaxyx()
-        prompt_line = h - 1
-        try:
-            # Clear the line first
-            self.screen.move(prompt_line, 0)
-            self.screen.clrtoeol()
-            # Add the message
-            # Ensure message doesn't exceed screen width
-            message_to_display = message[:w-1]
-            self.screen.addstr(prompt_line, 0, message_to_display)
-            self.screen.refresh()
-            curses.napms(int(duration * 1000)) # Wait
-            # Clear the message line again
-            self.screen.move(prompt_line, 0)
-            self.screen.addstr(prompt_line, 0, " " * w)
-            self.screen.clrtoeol()
-            self.screen.refresh()
-        except curses.error:
-            pass # Ignore errors if screen size is weird
+        """Queues a message for the bottom line of the screen (shown without pausing the game)."""
+        self.game.messages.post(message, duration)
 
     def process_command(self, command_string):
         """Parses and executes a command string."""
@@ -71,6 +63,8 @@ class CommandProcessor:
 
             command_name = parts[0].lower()
             args = parts[1:]
+            if self.game.recorder is not None:
+                self.game.recorder.record_command(self.game, command_name, command_string)
 
             if command_name in self.commands:
                 # Call the corresponding command handler
@@ -123,10 +117,13 @@ class CommandProcessor:
     def _cmd_fill(self, args):
         """
         Fills the grid with a specified element using a 'paint bucket' method
-        from the current cursor position.
+        from the current cursor position. Optional limits: the maximum number of
+        cells to fill (the fill is cancelled if the area is larger) and a radius
+        around the cursor that the fill does not leave.
         """
-        if len(args) != 1:
-            raise CommandError("用法: fill <element_key_or_name>")
+        usage = "用法: fill <element_key_or_name> [max_cells] [radius]"
+        if not 1 <= len(args) <= 3:
+            raise CommandError(usage)
 
         element_identifier = args[0]
         element_key = element_identifier # Assume key first
@@ -143,57 +140,57 @@ class CommandProcessor:
         if not element_class:
             raise CommandError(f"未找到元素: '{element_identifier}'.")
 
+        try:
+            limits = [int(arg) for arg in args[1:]]
+        except ValueError:
+            raise CommandError(f"max_cells 和 radius 必须是整数. {usage}")
+        if any(limit <= 0 for limit in limits):
+            raise CommandError(f"max_cells 和 radius 必须为正数. {usage}")
+        max_cells = limits[0] if limits else FILL_MAX_CELLS
+
+        grid = self.game.grid
         start_y, start_x = self.game.cursor_y, self.game.cursor_x
 
         # Check if the starting point is within bounds
-        if not self.game.grid.is_valid(start_y, start_x):
+        if not grid.is_valid(start_y, start_x):
              raise CommandError(f"光标位置 ({start_x},{start_y}) 超出网格范围.")
 
-        target_element = self.game.grid.get_element(start_y, start_x)
+        target_element = grid.get_element(start_y, start_x)
         target_key = target_element.key if target_element else None # Key of the element to replace
 
         # If the target element is the same as the fill element, do nothing
         if target_key == element_key:
              return f"目标元素已经是 '{element_class.name}' ({element_key}), 无需填充."
 
-        # Use BFS/DFS to find connected components
-        queue = deque([(start_y, start_x)])
-        visited = set([(start_y, start_x)])
-        filled_count = 0
-
-        # Use grid factory method, passing current tags
-        def create_fill_element(y, x):
-            # Important: Create *new* element instance for each cell
-            element = self.game.grid.create_element(element_key, y, x)
-            if element:
-                element.tags = list(self.game.current_tags) # Apply current tags
-            return element
-
-        # Directions for adjacent check (orthogonal)
-        directions = [(0, 1), (0, -1), (1, 0), (-1, 0)]
+        bounds = None
+        if len(limits) == 2:
+            radius = limits[1]
+            bounds = (start_y - radius, start_y + radius + 1, start_x - radius, start_x + radius + 1)
 
-        while queue:
-            cy, cx = queue.popleft()
-
-            # Place the new element at the current cell
-            element_to_set = create_fill_element(cy, cx)
-            self.game.grid.set_element(cy, cx, element_to_set)
-            filled_count += 1
-
-            # Check neighbors
-            for dy, dx in directions:
-                ny, nx = cy + dy, cx + dx
-
-                # Check bounds and if not visited
-                if self.game.grid.is_valid(ny, nx) and (ny, nx) not in visited:
-                    neighbor_element = self.game.grid.get_element(ny, nx)
-                    neighbor_key = neighbor_element.key if neighbor_element else None
-
-                    # If the neighbor is the same type as the *original* target element, add to queue
-                    if neighbor_key == target_key:
-                        visited.add((ny, nx))
-                        queue.append((ny, nx))
+        # Find the whole area first (row runs, see Grid.find_region), so an oversized
+        # fill is refused before anything changes
+        spans = grid.find_region(start_y, start_x, max_cells, bounds)
+        if spans is None:
+            raise CommandError(f"填充区域超过 {max_cells} 个单元格, 已取消. {usage}")
 
+        filled_count = 0
+        tags = self.game.current_tags
+        edit = self.game.history.begin("fill", grid) # Replaced cells, for undo
+        create_element = grid.create_element
+        failed = False
+        for y, x_start, x_end in spans:
+            # Important: Create *new* element instances for each cell, with the current tags,
+            # through the grid factory like every other placement
+            elements = [create_element(element_key, y, x, tags or None) for x in range(x_start, x_end)]
+            if any(element is None for element in elements):
+                failed = True # create_element already printed the error
+                break
+            replaced = grid.set_span(y, x_start, elements) # Writes the run at once
+            edit.record_span(y, x_start, replaced, elements)
+            filled_count += x_end - x_start
+        self.game.history.commit(edit) # The rows filled so far stay undoable
+        if failed:
+            raise CommandError(f"无法创建元素 '{element_key}', 填充在 {filled_count} 个单元格后中止.")
         return f"从 ({start_x},{start_y}) 填充 {filled_count} 个单元格为 '{element_class.name}' ({element_key})."
 
 
@@ -201,8 +198,8 @@ class CommandProcessor:
         """Clears the grid."""
         if args:
             raise CommandError("用法: clear (无参数)")
-        self.game.grid.clear()
-        return "网格已清空."
+        self.game.clear_grid()
+        return "网格已清空 (可撤销)."
 
     def _cmd_select(self, args):
         """Selects an element by its key or Chinese name."""
@@ -267,34 +264,294 @@ class CommandProcessor:
             raise CommandError("大小必须是数字.")
 
     def _cmd_fps(self, args):
-        """Sets the target frames per second."""
+        """Sets both the simulation rate and the render rate."""
         if len(args) != 1:
             raise CommandError("用法: fps <number>")
         try:
             new_fps = float(args[0])
             if new_fps > 0:
                 self.game.set_target_fps(new_fps)
-                return f"目标帧率设置为 {new_fps:.1f}."
+                return f"模拟速率与渲染帧率均设置为 {new_fps:.1f}."
             else:
                 raise CommandError("帧率必须为正数.")
         except ValueError:
             raise CommandError("帧率必须是数字.")
 
+    def _cmd_tick_rate(self, args):
+        """Sets the simulation rate (ticks per second), independent of drawing."""
+        if len(args) != 1:
+            raise CommandError("用法: tick_rate <ticks per second>")
+        try:
+            new_rate = float(args[0])
+            if new_rate > 0:
+                self.game.set_tick_rate(new_rate)
+                return f"模拟速率设置为每秒 {self.game.tick_rate:.1f} 步."
+            else:
+                raise CommandError("模拟速率必须为正数.")
+        except ValueError:
+            raise CommandError("模拟速率必须是数字.")
+
+    def _cmd_render_rate(self, args):
+        """Sets the render rate (frames per second), independent of the simulation."""
+        if len(args) != 1:
+            raise CommandError("用法: render_rate <frames per second>")
+        try:
+            new_rate = float(args[0])
+            if new_rate > 0:
+                self.game.set_render_rate(new_rate)
+                return f"渲染帧率设置为 {self.game.render_rate:.1f}."
+            else:
+                raise CommandError("渲染帧率必须为正数.")
+        except ValueError:
+            raise CommandError("渲染帧率必须是数字.")
+
     def _cmd_speed(self, args):
-        """Sets the target FPS based on a multiplier of the default."""
+        """Sets the simulation rate as a multiplier of the default (render rate unchanged)."""
         if len(args) != 1:
             raise CommandError("用法: speed <multiplier>")
         try:
             multiplier = float(args[0])
             if multiplier > 0:
-                new_fps = DEFAULT_TARGET_FPS * multiplier
-                self.game.set_target_fps(new_fps)
-                return f"速度倍率设置为 {multiplier}x (目标帧率: {new_fps:.1f})."
+                new_rate = DEFAULT_TICK_RATE * multiplier
+                self.game.set_tick_rate(new_rate)
+                return f"速度倍率设置为 {multiplier}x (模拟速率: {self.game.tick_rate:.1f})."
             else:
                 raise CommandError("倍率必须为正数.")
         except ValueError:
             raise CommandError("倍率必须是数字.")
 
+    def _parse_tick_count(self, args, usage, default=None):
+        """Parses the optional/required count argument of step, ff, undo and redo."""
+        if len(args) > 1 or (not args and default is None):
+            raise CommandError(usage)
+        if not args:
+            return default
+        try:
+            count = int(args[0])
+        except ValueError:
+            raise CommandError("步数必须是整数.")
+        if count <= 0:
+            raise CommandError("步数必须为正数.")
+        return count
+
+    def _cmd_pause(self, args):
+        """Pauses or resumes the simulation."""
+        if args:
+            raise CommandError("用法: pause")
+        self.game.paused = not self.game.paused
+        if not self.game.paused:
+            self.game.scheduler.reset() # Don't catch up the time spent paused
+        return "模拟已暂停 (step N 单步, 再次 pause 继续)." if self.game.paused else "模拟已继续."
+
+    def _cmd_step(self, args):
+        """Pauses the simulation and advances it by exactly N ticks (default 1)."""
+        count = self._parse_tick_count(args, "用法: step [ticks]", default=1)
+        self.game.paused = True
+        self.game.run_ticks(count)
+        return f"已单步执行 {count} 步 (模拟已暂停)."
+
+    def _cmd_ff(self, args):
+        """Runs N ticks back to back without drawing the grid, then reports the speed."""
+        count = self._parse_tick_count(args, "用法: ff <ticks>")
+        def progress(done):
+            self.game.draw_status(self.screen, f"快进中: {done}/{count} ({done * 100 // count}%)")
+        elapsed = self.game.run_ticks(count, progress if self.screen else None)
+        self.game.scheduler.reset() # Time spent fast-forwarding is not caught up
+        rate = count / elapsed if elapsed > 0 else 0.0
+        return f"快进完成: {count} 步, 用时 {elapsed:.2f} 秒 ({rate:.0f} 步/秒)."
+
+    def _cmd_undo(self, args):
+        """Undoes the last N recorded edits (default 1)."""
+        count = self._parse_tick_count(args, "用法: undo [steps]", default=1)
+        done = 0
+        while done < count and self.game.history.undo(self.game.grid, self.game.snapshots) is not None:
+            done += 1
+        if not done:
+            raise CommandError("没有可撤销的操作.")
+        return f"已撤销 {done} 步 (剩余 {len(self.game.history)} 步)."
+
+    def _cmd_redo(self, args):
+        """Redoes the last N undone edits (default 1)."""
+        count = self._parse_tick_count(args, "用法: redo [steps]", default=1)
+        done = 0
+        while done < count and self.game.history.redo(self.game.grid, self.game.snapshots) is not None:
+            done += 1
+        if not done:
+            raise CommandError("没有可重做的操作.")
+        return f"已重做 {done} 步."
+
+    def _cmd_keyframes(self, args):
+        """Sets every how many ticks the grid is checkpointed into the undo history (0 = off)."""
+        history = self.game.history
+        if not args:
+            interval = self.game.keyframe_interval
+            state = f"每 {interval} 步" if interval else "关闭"
+            self.show_message(f"关键帧: {state}. 历史: {len(history)} 步, 约 {history.memory_used // 1024} KB / "
+                              f"{history.budget // 1024} KB. 用法: keyframes <ticks|0>", duration=3)
+            return None
+        if len(args) != 1:
+            raise CommandError("用法: keyframes <ticks|0>")
+        try:
+            interval = int(args[0])
+        except ValueError:
+            raise CommandError("步数必须是整数.")
+        if interval < 0:
+            raise CommandError("步数不能为负数.")
+        self.game.keyframe_interval = interval
+        return f"每 {interval} 步保存一个撤销关键帧." if interval else "已关闭撤销关键帧."
+
+    def _cmd_seed(self, args):
+        """Shows the simulation random seed, or restarts the random streams from a new one."""
+        simulation = self.game.simulation
+        if not args:
+            self.show_message(f"随机种子: {simulation.seed}. 用法: seed <number>", duration=3)
+            return None
+        if len(args) != 1:
+            raise CommandError("用法: seed <number>")
+        try:
+            seed = int(args[0])
+        except ValueError:
+            raise CommandError("种子必须是整数.")
+        simulation.set_seed(seed)
+        return f"随机种子设置为 {seed} (同一种子和输入会得到相同的模拟结果)."
+
+    def _file_path(self, file_name, default_extension):
+        """Path of a replay or timeline file in the current directory (extension added if missing)."""
+        if not os.path.splitext(file_name)[1]:
+            file_name += default_extension
+        return os.path.join(".", file_name)
+
+    def _cmd_record(self, args):
+        """Starts logging inputs and commands to a replay file ('record stop' ends it)."""
+        recorder = self.game.recorder
+        if not args:
+            if recorder is None:
+                self.show_message("未在录制. 用法: record <file_name>[.fsr] | record stop", duration=3)
+            else:
+                self.show_message(f"正在录制到 '{recorder.path}' ({recorder.event_count} 个输入). "
+                                  f"用法: record stop", duration=3)
+            return None
+        if len(args) != 1:
+            raise CommandError("用法: record <file_name>[.fsr] | record stop")
+        if args[0].lower() == "stop":
+            recorder = self.game.stop_recording()
+            if recorder is None:
+                raise CommandError("未在录制.")
+            return f"录制已保存到 '{recorder.path}' ({recorder.event_count} 个输入)."
+        if recorder is not None:
+            raise CommandError(f"已在录制到 '{recorder.path}', 请先 record stop.")
+        record_path = self._file_path(args[0], REPLAY_EXTENSION)
+        try:
+            self.game.recorder = Recorder(self.game, record_path)
+        except OSError as e:
+            raise CommandError(f"无法创建录制文件: {e}")
+        return f"开始录制到 '{record_path}' (撤销历史已清空, record stop 结束)."
+
+    def _cmd_replay(self, args):
+        """Plays a replay file back headlessly at full speed and shows its final state."""
+        if len(args) != 1:
+            raise CommandError("用法: replay <file_name>[.fsr]")
+        if self.game.recorder is not None:
+            raise CommandError("录制中不能回放, 请先 record stop.")
+        replay_path = self._file_path(args[0], REPLAY_EXTENSION)
+        if not os.path.exists(replay_path):
+            raise CommandError(f"文件 '{replay_path}' 未找到.")
+        try:
+            player = ReplayPlayer(*load_replay(replay_path))
+        except (OSError, ValueError, KeyError, IndexError, TypeError) as e:
+            raise CommandError(f"无法读取回放文件: {e}")
+
+        total = max(1, player.tick_count)
+        def progress(done):
+            self.game.draw_status(self.screen, f"回放中: {done}/{total} ({done * 100 // total}%)")
+        elapsed = player.run(progress=progress if self.screen else None)
+        self.game.scheduler.reset() # Time spent replaying is not caught up
+
+        self.game.set_grid(player.game.grid) # Show the replayed end state in the live game
+
+        matches = player.checksum_matches()
+        check = {True: "结果与录制一致", False: "结果与录制不一致!", None: "录制未正常结束, 无法校验"}[matches]
+        rate = player.tick_count / elapsed if elapsed > 0 else 0.0
+        return (f"回放完成: {len(player.events)} 个输入, {player.tick_count} 步, 用时 {elapsed:.2f} 秒 "
+                f"({rate:.0f} 步/秒). {check}")
+
+    def _cmd_timeline(self, args):
+        """Records the run into a seekable timeline file, or rebuilds a recorded tick from it."""
+        usage = "用法: timeline start <file> [keyframe_ticks] [overwrite] | stop | open <file> | seek <tick>"
+        timeline = self.game.timeline
+        if not args:
+            if timeline is None:
+                self.show_message(f"无时间线. {usage}", duration=4)
+            else:
+                state = "录制中" if timeline.recording else "浏览"
+                self.show_message(f"时间线 '{timeline.path}' ({state}): 第 {timeline.first_tick}-{timeline.last_tick} 步, "
+                                  f"{timeline.keyframe_count} 个关键帧, {timeline.size // 1024} KB. {usage}", duration=4)
+            return None
+        sub_command = args[0].lower()
+        if sub_command == "start":
+            start_usage = "用法: timeline start <file> [keyframe_ticks] [overwrite]"
+            overwrite = len(args) > 2 and args[-1].lower() == "overwrite"
+            if overwrite:
+                args = args[:-1]
+            if len(args) not in (2, 3):
+                raise CommandError(start_usage)
+            interval = self._parse_tick_count(args[2:], start_usage, default=TIMELINE_KEYFRAME_TICKS)
+            timeline_path = self._file_path(args[1], TIMELINE_EXTENSION)
+            try:
+                new_timeline = Timeline(timeline_path, interval, overwrite=overwrite)
+            except FileExistsError:
+                raise CommandError(f"文件 '{timeline_path}' 已存在, 在命令末尾加 overwrite 以覆盖.")
+            except OSError as e:
+                raise CommandError(f"无法创建时间线文件: {e}")
+            self.game.close_timeline()
+            new_timeline.start(self.game.grid, self.game.simulation.tick_count)
+            self.game.timeline = new_timeline
+            return f"开始录制时间线到 '{timeline_path}' (每 {interval} 步一个关键帧)."
+        elif sub_command == "stop":
+            if len(args) != 1:
+                raise CommandError("用法: timeline stop")
+            if timeline is None or not timeline.recording:
+                raise CommandError("未在录制时间线.")
+            timeline.stop()
+            return (f"时间线录制结束: 第 {timeline.first_tick}-{timeline.last_tick} 步, {timeline.size // 1024} KB "
+                    f"(timeline seek <tick> 可跳转).")
+        elif sub_command == "open":
+            if len(args) != 2:
+                raise CommandError("用法: timeline open <file>")
+            timeline_path = self._file_path(args[1], TIMELINE_EXTENSION)
+            if not os.path.exists(timeline_path):
+                raise CommandError(f"文件 '{timeline_path}' 未找到.")
+            try:
+                new_timeline = Timeline.open(timeline_path)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"无法读取时间线文件: {e}")
+            self.game.close_timeline()
+            self.game.timeline = new_timeline
+            return f"已打开时间线 '{timeline_path}': 第 {new_timeline.first_tick}-{new_timeline.last_tick} 步."
+        elif sub_command == "seek":
+            if len(args) != 2:
+                raise CommandError("用法: timeline seek <tick>")
+            if timeline is None:
+                raise CommandError("没有时间线, 请先 timeline start 或 timeline open.")
+            try:
+                tick = int(args[1])
+            except ValueError:
+                raise CommandError("步数必须是整数.")
+            try:
+                new_grid = timeline.seek(tick, self.game.simulation.grid_class)
+            except ValueError as e:
+                raise CommandError(f"跳转失败: {e}")
+            stopped = timeline.recording
+            timeline.stop() # Ticks would no longer follow on from the recorded ones
+            self.game.set_grid(new_grid)
+            self.game.simulation.tick_count = tick
+            self.game.paused = True
+            if self.game.recorder is not None:
+                self.game.recorder.record_grid(self.game) # The seek itself is not replayed
+            return f"已跳转到第 {tick} 步 (模拟已暂停{', 时间线录制已结束' if stopped else ''})."
+        else:
+            raise CommandError(usage)
+
     def _cmd_tag(self, args):
         """Manages the tags applied by the cursor."""
         if not args:
@@ -335,125 +592,34 @@ class CommandProcessor:
 
     # --- New Commands ---
 
-    def _grid_to_dict(self, grid):
-        """Serializes the grid state to a dictionary."""
-        # This is a basic implementation. More complex elements might need custom serialization.
-        grid_data = {
-            "height": grid.height,
-            "width": grid.width,
-            "elements": [] # List of element dictionaries
-        }
-        for r in range(grid.height):
-            for c in range(grid.width):
-                element = grid.get_element(r, c)
-                if element:
-                    element_data = {
-                        "key": element.key,
-                        "y": element.y,
-                        "x": element.x,
-                        "tags": list(element.tags) # Save tags
-                        # Add any other essential element state here if needed
-                        # For example, Thermite's burn_timer, Photosensitive's is_solidified etc.
-                        # This requires adding serialization logic to Element base or subclasses.
-                        # Simple approach: check for known state attributes
-                    }
-                    # Add specific state for elements that need it
-                    if hasattr(element, 'is_burning'): # Thermite
-                        element_data['is_burning'] = element.is_burning
-                        element_data['burn_timer'] = getattr(element, 'burn_timer', 0)
-                    if hasattr(element, 'is_solidified'): # PhotosensitivePowder
-                         element_data['is_solidified'] = element.is_solidified
-                    # Add more element-specific states as needed
-                    grid_data["elements"].append(element_data)
-        return grid_data
-
-    def _dict_to_grid(self, grid_data):
-        """Deserializes grid state from a dictionary."""
-        if not grid_data or "height" not in grid_data or "width" not in grid_data or "elements" not in grid_data:
-            raise ValueError("Invalid grid data format.")
-
-        height = grid_data["height"]
-        width = grid_data["width"]
-        elements_data = grid_data["elements"]
-
-        # Create a new grid with specified dimensions
-        new_grid = self.game.grid.__class__(height, width, element_manager) # Use same Grid class
-
-        # Place elements from data
-        for element_data in elements_data:
-            key = element_data.get("key")
-            y = element_data.get("y")
-            x = element_data.get("x")
-            tags = element_data.get("tags", []) # Load tags
-
-            if key is None or y is None or x is None:
-                print(f"Warning: Skipping malformed element data: {element_data}")
-                continue
-
-            # Create element instance using the new grid's factory method
-            element = new_grid.create_element(key, y, x)
-
-            if element:
-                # Apply tags
-                if tags:
-                    element.tags = list(tags)
-
-                # Load specific state for elements
-                if 'is_burning' in element_data and hasattr(element, 'is_burning'):
-                    element.is_burning = element_data['is_burning']
-                    element.burn_timer = element_data.get('burn_timer', 0)
-                    element.is_heat_source = element.is_burning # Ensure heat source state is correct
-                if 'is_solidified' in element_data and hasattr(element, 'is_solidified'):
-                    element.is_solidified = element_data['is_solidified']
-                    # Update characteristics based on solidification state
-                    if element.is_solidified:
-                         element.is_powder = False
-                         element.is_static = True
-                         element.char = getattr(element, 'solidified_char', element.char)
-                         element.density = getattr(element, 'solidified_density', element.density)
-                    else:
-                         element.is_powder = True
-                         element.is_static = False
-                         element.char = getattr(element, 'char', element.char) # Revert to powder char
-                         element.density = 4.5 # Revert to powder density (hardcoded or use class attr?)
-                         # Assuming powder density is 4.5 based on PhotosensitivePowder definition
-
-                # Add more element-specific state loading as needed
-
-                # Place the element on the new grid
-                new_grid.set_element(y, x, element)
-            else:
-                 print(f"Warning: Element class for key '{key}' not found during loading.")
-
-        return new_grid
-
-
     def _cmd_save(self, args):
-        """Saves the current game state to a file."""
+        """Saves the current game state to a file (binary .fsg, or JSON for .json names)."""
         if len(args) != 1:
-            raise CommandError("用法: save <file_name>")
+            raise CommandError("用法: save <file_name>[.fsg|.json]")
         file_name = args[0]
-        # Add .json extension if not present
-        if not file_name.lower().endswith(".json"):
-             file_name += ".json"
+        # Add the default (binary) extension if none of the known ones is present
+        if not file_name.lower().endswith((BINARY_EXTENSION, JSON_EXTENSION)):
+             file_name += BINARY_EXTENSION
 
         save_path = os.path.join(".", file_name) # Save in current directory
 
         try:
-            grid_data = self._grid_to_dict(self.game.grid)
-            with open(save_path, 'w', encoding='utf-8') as f:
-                json.dump(grid_data, f, ensure_ascii=False, indent=4)
+            save_grid(self.game.grid, save_path)
             return f"游戏状态已保存到 '{save_path}'."
         except Exception as e:
             raise CommandError(f"保存游戏状态失败: {e}")
 
     def _cmd_load(self, args):
-        """Loads game state from a file."""
+        """Loads game state from a file (binary or JSON, detected from the contents)."""
         if len(args) != 1:
-            raise CommandError("用法: load <file_name>")
+            raise CommandError("用法: load <file_name>[.fsg|.json]")
         file_name = args[0]
-        if not file_name.lower().endswith(".json"):
-             file_name += ".json"
+        if not file_name.lower().endswith((BINARY_EXTENSION, JSON_EXTENSION)):
+             # Without an extension, prefer the binary save and fall back to JSON
+             if os.path.exists(os.path.join(".", file_name + BINARY_EXTENSION)):
+                 file_name += BINARY_EXTENSION
+             else:
+                 file_name += JSON_EXTENSION
 
         load_path = os.path.join(".", file_name)
 
@@ -461,26 +627,11 @@ class CommandProcessor:
             raise CommandError(f"文件 '{load_path}' 未找到.")
 
         try:
-            with open(load_path, 'r', encoding='utf-8') as f:
-                grid_data = json.load(f)
-
             # Create and set the new grid
-            new_grid = self._dict_to_grid(grid_data)
-            self.game.grid = new_grid
-            # Adjust game dimensions if necessary based on loaded grid size
-            # This might be tricky with fixed curses window.
-            # For simplicity, let's assume loaded grid fits current window or handle resize later.
-            # If loaded grid is smaller, fine. If larger, drawing might be clipped.
+            new_grid = load_grid(load_path, self.game.grid.__class__)
+            # If the loaded grid is larger than the game area, drawing is clipped.
             # A more robust solution would involve resizing the curses window or game area.
-            # For now, just update the game instance's grid reference.
-            self.game.game_height = new_grid.height # Update game dimensions based on loaded grid
-            self.game.game_width = new_grid.width
-            # Recalculate info panel position might be needed if game area size changed significantly
-            self.game._recalculate_layout() # This recalculates info_width etc.
-
-            # Adjust cursor position to be within new bounds
-            self.game.cursor_x = min(max(0, self.game.cursor_x), self.game.game_width - 1)
-            self.game.cursor_y = min(max(0, self.game.cursor_y), self.game.game_height - 1)
+            self.game.set_grid(new_grid) # Also fits the layout and cursor to the loaded size
 
             return f"游戏状态已从 '{load_path}' 加载."
         except FileNotFoundError:
@@ -502,10 +653,8 @@ class CommandProcessor:
             if slot_number < 0 or slot_number > 9: # Example limit for quick save slots
                  raise CommandError("快速保存槽位数字必须在 0 到 9 之间.")
 
-            # Serialize the current grid state to a dictionary
-            grid_data = self._grid_to_dict(self.game.grid)
-            # Store the dictionary in the quick_saves dictionary
-            CommandProcessor.quick_saves[slot_number] = grid_data
+            # Snapshot the grid; chunks unchanged since an earlier snapshot are shared
+            self.quick_saves[slot_number] = self.game.snapshots.capture(self.game.grid)
 
             return f"快速保存状态到槽位 {slot_number}."
         except ValueError:
@@ -523,24 +672,17 @@ class CommandProcessor:
             if slot_number < 0 or slot_number > 9:
                  raise CommandError("快速加载槽位数字必须在 0 到 9 之间.")
 
-            if slot_number not in CommandProcessor.quick_saves:
+            if slot_number not in self.quick_saves:
                  raise CommandError(f"快速保存槽位 {slot_number} 为空.")
 
-            # Retrieve the grid state dictionary from the quick save slot
-            grid_data = CommandProcessor.quick_saves[slot_number]
-
-            # Create and set the new grid from the dictionary
-            new_grid = self._dict_to_grid(grid_data)
-            self.game.grid = new_grid
-            # Adjust game dimensions if necessary
-            self.game.game_height = new_grid.height
-            self.game.game_width = new_grid.width
-            self.game._recalculate_layout()
-
-            # Adjust cursor position
-            self.game.cursor_x = min(max(0, self.game.cursor_x), self.game.game_width - 1)
-            self.game.cursor_y = min(max(0, self.game.cursor_y), self.game.game_height - 1)
+            # Retrieve the snapshot from the quick save slot
+            snapshot = self.quick_saves[slot_number]
 
+            # Same size: keep the current state as a keyframe, so the load can be undone
+            if (snapshot.height, snapshot.width) == (self.game.grid.height, self.game.grid.width):
+                self.game.history.add_keyframe(self.game.snapshots.capture(self.game.grid), "quick_load")
+            # Rewrite the chunks that differ (a new grid only if the size differs)
+            self.game.set_grid(self.game.snapshots.restore(snapshot, self.game.grid))
 
             return f"从快速保存槽位 {slot_number} 加载状态."
         except ValueError:
@@ -565,12 +707,10 @@ class CommandProcessor:
 
          if element:
               info_msg = f"元素: '{getattr(element, 'name', '未知')}' ({element.key}). 位置: ({element.x},{element.y}). 密度: {getattr(element, 'density', 'N/A'):.1f}. 标签: [{', '.join(element.tags) if element.tags else '无'}]."
-              # Add element-specific state info if available
-              if hasattr(element, 'is_burning'):
-                  info_msg += f" 燃烧: {element.is_burning} (剩余: {getattr(element, 'burn_timer', 0)})."
-              if hasattr(element, 'is_solidified'):
-                  info_msg += f" 固化: {element.is_solidified}."
-              # Add more checks for other complex states
+              # Add element-specific state (declared in Element.state_fields)
+              if element.state_fields:
+                  state_str = ', '.join(f"{name}={getattr(element, name, None)}" for name in element.state_fields)
+                  info_msg += f" 状态: {state_str}."
 
          else:
               info_msg = f"位置 ({cursor_x},{cursor_y}) 为空."
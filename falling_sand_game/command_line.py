@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+import collections
+import curses
+import time
+
+COMMAND_PROMPT = "CMD> "
+
+
+class CommandLine:
+    """
+    Command input edited one key at a time from the main loop, so the simulation
+    and drawing keep running while a command is typed.
+    """
+
+    def __init__(self, prompt=COMMAND_PROMPT):
+        self.prompt = prompt
+        self.text = ""
+        self.cursor = 0 # Insert position within text
+
+    def start(self):
+        """Begins a new, empty command."""
+        self.text = ""
+        self.cursor = 0
+
+    def handle_key(self, key):
+        """
+        Applies one key. Returns the finished command string on Enter, "" if the
+        input was cancelled with Esc, or None while the command is still being typed.
+        """
+        # Handle Enter
+        if key == curses.KEY_ENTER or key == 10 or key == 13:
+            return self.text
+        # Handle Esc (cancel)
+        elif key == 27:
+            return ""
+        # Handle Backspace
+        elif key == curses.KEY_BACKSPACE or key == 127 or key == 8:
+            if self.cursor > 0:
+                self.text = self.text[:self.cursor - 1] + self.text[self.cursor:]
+                self.cursor -= 1
+        # Handle Delete
+        elif key == curses.KEY_DC:
+            self.text = self.text[:self.cursor] + self.text[self.cursor + 1:]
+        # Handle regular characters
+        elif 32 <= key <= 126: # Printable ASCII
+            self.text = self.text[:self.cursor] + chr(key) + self.text[self.cursor:]
+            self.cursor += 1
+        elif key == curses.KEY_LEFT:
+            self.cursor = max(0, self.cursor - 1)
+        elif key == curses.KEY_RIGHT:
+            self.cursor = min(len(self.text), self.cursor + 1)
+        elif key == curses.KEY_HOME:
+            self.cursor = 0
+        elif key == curses.KEY_END:
+            self.cursor = len(self.text)
+        return None
+
+    def display(self):
+        """Returns (line text, cursor column) for the status line."""
+        return self.prompt + self.text, len(self.prompt) + self.cursor
+
+
+class MessageQueue:
+    """
+    Messages shown on the status line one after another, each for its duration.
+    Replaces sleeping while a message is on screen: the caller asks for the
+    current message every frame and the queue advances by itself.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._pending = collections.deque() # (message, duration) not shown yet
+        self._current = None # Message on screen
+        self._expires = 0.0  # Clock time when the current message disappears
+
+    def post(self, message, duration=1.5):
+        """Queues a message to show for `duration` seconds."""
+        self._pending.append((message, duration))
+
+    def clear(self):
+        """Drops the current and all pending messages."""
+        self._pending.clear()
+        self._current = None
+
+    def time_remaining(self):
+        """
+        Seconds until the status line must change (the current message expires or a
+        pending one is due), or None if there are no messages.
+        """
+        if self._pending and self._current is None:
+            return 0.0
+        if self._current is None:
+            return None
+        return max(0.0, self._expires - self._clock())
+
+    def current(self):
+        """Returns the message to show now, or None. Starts the next one when due."""
+        now = self._clock()
+        if self._current is not None and now >= self._expires:
+            self._current = None
+        if self._current is None and self._pending:
+            self._current, duration = self._pending.popleft()
+            self._expires = now + duration
+        return self._current
@@ -4,11 +4,26 @@
 # TARGET_FPS is now the DEFAULT, actual FPS is managed in Game/Main
 DEFAULT_TARGET_FPS = 25   # 默认目标游戏帧率
 TARGET_FPS = 25
+DEFAULT_TICK_RATE = 25     # 默认模拟速率 (每秒模拟步数, 与渲染帧率相互独立)
+DEFAULT_RENDER_RATE = 25   # 默认渲染帧率 (每秒绘制次数)
+MAX_CATCHUP_TICKS = 5      # 模拟落后时每次循环最多补算的步数 (超出部分直接丢弃)
+RENDER_THREAD = False      # 是否在后台线程中绘制画面 (模拟线程只负责生成帧快照)
+INPUT_POLL_INTERVAL = 0.02 # 主循环两次输入检查之间的最长休眠时间 (秒)
+MAX_KEYS_PER_FRAME = 256   # 每帧最多读取的按键数 (其余留到下一帧)
+IDLE_SLEEP = True          # 场景静止且无输入时阻塞等待按键 (空闲时几乎不占用 CPU)
 GAME_AREA_RATIO = 0.7   # 游戏区域占屏幕宽度的比例
 EMPTY_CHAR = ' '          # 代表空格子的字符 (Now less critical, use grid.get_element is None)
 MAX_CURSOR_SIZE = 10      # 光标的最大尺寸 (Increased limit)
 DEFAULT_CURSOR_SIZE = 1   # 默认光标尺寸
 ELEMENT_DIR = "falling_sand_game/elements" # Path to elements directory
+CHUNK_SIZE = 16           # 活跃区块调度: 区块边长 (格)
+CHUNK_SLEEP_TICKS = 60    # 区块连续多少帧无变化后进入休眠 (不再更新)
+GRID_BACKEND = "object"   # 网格存储后端: "object" (元素对象列表) 或 "typed" (元素对象加类型码数组, 供批量移动内核使用, 内存占用略高; 见 typed_grid.py)
+HISTORY_MEMORY_BUDGET = 8 * 1024 * 1024 # 撤销历史的内存上限 (字节), 超出后丢弃最早的记录
+HISTORY_STROKE_GAP = 0.5   # 间隔不超过该秒数的同类光标操作合并为一步撤销
+HISTORY_KEYFRAME_TICKS = 0 # 每隔多少模拟步在撤销历史中保存一个关键帧 (0 = 不保存)
+FILL_MAX_CELLS = 250000      # fill 命令默认最多填充的格子数 (超过则取消, 可在命令中指定)
+TIMELINE_KEYFRAME_TICKS = 250 # 时间线录制: 每隔多少模拟步保存一个完整关键帧 (其余步只保存变化的格子)
 
 # --- Colors ---
 # Define a default color pair ID, maybe for errors or unloaded elements
@@ -42,6 +42,9 @@ class ElementManager:
                 return
             self.registry = {}
             self.placeable_order = []
+            # Interned element-type codes for typed grid storage (code 0 = empty)
+            self.type_codes = {} # {element_class: code}
+            self.code_classes = [None] # code -> element_class
             self._loaded = False
             self._initialized = True
             print("ElementManager initialized.") # Debug print
@@ -71,7 +74,11 @@ class ElementManager:
             return
 
         # Use os.walk to traverse directories
-        for root, _, files in os.walk(element_dir):
+        for root, dirs, files in os.walk(element_dir):
+            # Visit subdirectories and files in a stable order, so the registry (and the
+            # tail of the placeable list) does not depend on the file system
+            dirs.sort()
+            files.sort()
             # Calculate the package path relative to the base element_dir
             # Replace os.sep with '.' for module path
             relative_path = os.path.relpath(root, element_dir).replace(os.sep, '.')
@@ -111,7 +118,8 @@ class ElementManager:
 
 
                                     if key in self.registry:
-                                         print(f"Warning: Duplicate element key '{key}' found in {module_path}. Overwriting.")
+                                         # Keys must be unique; the later module wins, so name both classes
+                                         print(f"Warning: Duplicate element key '{key}': {self.registry[key].__name__} is overwritten by {name} from {module_path}.")
                                     if key and key != ' ': # Don't register the empty space element if defined
                                         self.registry[key] = obj # Store the class itself
                                         loaded_keys.add(key)
@@ -132,11 +140,16 @@ class ElementManager:
         # self.placeable_order = [key for key in selfin loaded_keys]
         # Add any newly found elements that weren't in the original order (optional)
         # This adds them at the end of the placeable list
-        for key in loaded_keys:
+        # Iterate the registry (load order), not the set, so the order is the same on every run
+        for key in self.registry:
             if key not in self.placeable_order:
                 print("NEW KEY",key)
                 self.placeable_order.append(key)
 
+        # Assign compact type codes in placeable order so they are stable between runs
+        for key in self.placeable_order:
+            self.intern_type(self.registry[key])
+
         self._loaded = True
         print(f"Loaded {len(self.registry)} elements: {list(self.registry.keys())}")
         print(f"Placeable elements order: {self.placeable_order}")
@@ -146,6 +159,37 @@ class ElementManager:
         """Gets the element class from the registry."""
         return self.registry.get(key)
 
+    def intern_type(self, element_class):
+        """
+        Returns the interned integer type code for an element class, assigning a new one
+        if the class has not been seen yet. Code 0 is reserved for empty cells.
+        The code is also stored on the class as 'type_code' for fast lookups.
+        """
+        code = self.type_codes.get(element_class)
+        if code is None:
+            code = len(self.code_classes)
+            self.type_codes[element_class] = code
+            self.code_classes.append(element_class)
+            element_class.type_code = code
+        return code
+
+    def get_type_code(self, key):
+        """Gets the type code for an element key. Returns 0 if the key is unknown."""
+        element_class = self.registry.get(key)
+        if element_class is None:
+            return 0
+        return self.intern_type(element_class)
+
+    def get_class_for_code(self, code):
+        """Gets the element class for a type code. Returns None for empty/unknown codes."""
+        if 0 < code < len(self.code_classes):
+            return self.code_classes[code]
+        return None
+
+    def get_type_code_count(self):
+        """Returns the number of type codes in use, including the empty code 0."""
+        return len(self.code_classes)
+
     def get_registry(self):
         """Returns the element registry dictionary."""
         return self.registry
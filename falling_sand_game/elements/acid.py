@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 from .base import Liquid, Element
-import random
 import curses
 
 class Acid(Liquid):
@@ -30,14 +29,14 @@ class Acid(Liquid):
                 if neighbor and not neighbor.processed and neighbor.dissolvable_by_acid:
                     dissolvable_neighbors.append((ny, nx, neighbor))
 
-        if dissolvable_neighbors and random.random() < self.dissolve_chance:
-            ny, nx, target_neighbor = random.choice(dissolvable_neighbors)
+        if dissolvable_neighbors and grid.rng.random() < self.dissolve_chance:
+            ny, nx, target_neighbor = grid.rng.choice(dissolvable_neighbors)
             # Dissolve the neighbor
             grid.set_element(ny, nx, None) # Neighbor is gone
             # Mark the dissolved neighbor's original object as processed? No, it's just gone.
 
             # Chance to consume the acid itself AFTER dissolving something
-            if random.random() < self.self_consume_chance:
+            if grid.rng.random() < self.self_consume_chance:
                 grid.set_element(self.y, self.x, None) # Remove self from grid
                 self.processed = True # Mark self as processed because it's gone
                 return # Exit interaction logic early if self-consumed
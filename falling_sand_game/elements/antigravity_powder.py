@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 from .base import Powder, Element # Inherit from Powder structure, but reverse gravity
-import random
 import curses
 
 class AntiGravityPowder(Powder):
@@ -52,8 +51,7 @@ class AntiGravityPowder(Powder):
         # 2. Try moving diagonally up (if couldn't move straight up)
         if not moved:
             possible_targets = []
-            directions = [-1, 1]
-            random.shuffle(directions)
+            directions = (-1, 1) if grid.rng.coin() else (1, -1) # Random diagonal order
 
             for dx in directions:
                 diag_x = self.x + dx
@@ -1,7 +1,6 @@
 # -*- coding: utf-8 -*-
 from .base import Powder, Element
 import curses
-import random
 
 class Ash(Powder):
     key = 'H'
@@ -26,7 +25,7 @@ class Ash(Powder):
                 neighbor = grid.get_element(ny, nx)
                 # Check if neighbor is Water ('W') by key and not processed
                 if neighbor and neighbor.key == 'W' and not neighbor.processed:
-                    if random.random() < self.mud_formation_chance:
+                    if grid.rng.random() < self.mud_formation_chance:
                         # Turn self into Mud ('R') using grid factory
                         new_mud = grid.create_element('R', self.y, self.x)
                         if new_mud:
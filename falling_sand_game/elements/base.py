@@ -1,6 +1,26 @@
 # -*- coding: utf-8 -*-
-import random
 import curses
+import itertools
+
+# Frame epochs of all grids come from one counter, so two grids never share an epoch value
+_epochs = itertools.count(1)
+
+
+class FrameClock:
+    """
+    The frame epoch of one grid. Every element placed on the grid holds a reference
+    to it (Element.frame_clock), so its 'processed' flag follows that grid's frames.
+    """
+    __slots__ = ("epoch",)
+
+    def __init__(self):
+        self.epoch = next(_epochs)
+
+    def advance(self):
+        """Starts a new frame. Returns its epoch."""
+        self.epoch = next(_epochs)
+        return self.epoch
+
 
 # --- Base Classes ---
 class Element:
@@ -10,7 +30,11 @@ class Element:
     char = ' ' # Character used for drawing
     color = (curses.COLOR_WHITE, -1) # Default: White foreground, default background
     color_pair_index = 0 # Assigned during curses initialization
-    processed = False # Flag to prevent processing an element multiple times per frame
+    type_code = 0 # Interned by ElementManager for typed grid storage (0 = not interned yet)
+    processed_epoch = -1 # Frame epoch in which this element was last processed
+    # Clock of the grid the element belongs to (set by Grid.create_element/set_element).
+    # Advanced once per frame by Grid.advance_epoch() instead of resetting every element.
+    frame_clock = FrameClock() # Elements not on a grid yet
     density = 0 # Affects how elements displace each other. Higher sinks below lower.
     is_static = True # Does the element generally not move on its own?
     is_flammable = False
@@ -22,6 +46,12 @@ class Element:
     is_heat_source = False
     can_freeze = False # Can this element be frozen by CryoPowder?
     can_grow_on = False # Can plants/fungus grow on this? (e.g., Mud)
+    # Does the element act on its own (timers, random growth/decay) even when nothing
+    # around it changes? Such elements keep their chunk awake in the active-chunk scheduler.
+    always_active = False
+    # Does an instance change its own movement kind or density at runtime (e.g. solidifying)?
+    # Batched kernels then read these from the object instead of the per-type tables.
+    has_dynamic_properties = False
 
     # Property for light emission (used by Lamp)
     emits_light = False
@@ -30,6 +60,11 @@ class Element:
     # Property for light sensitivity (used by PhotosensitivePowder)
     is_light_sensitive = False
 
+    # Per-instance attributes saved and restored with the grid (see savefile.py), e.g.
+    # timers and lit/burning flags. Attributes derived from them are not listed; they
+    # are rebuilt by on_state_loaded().
+    state_fields = ()
+
 
     def __init__(self, y, x):
         self.y = y
@@ -37,6 +72,16 @@ class Element:
         self.processed = False # Reset processed flag on creation
         self.tags: list[str] = [] # Initialize empty list for custom tags
 
+    @property
+    def processed(self):
+        """True if the element was already processed in the current frame (epoch)."""
+        return self.processed_epoch == self.frame_clock.epoch
+
+    @processed.setter
+    def processed(self, value):
+        # Keeps 'self.processed = True/False' working for all element modules
+        self.processed_epoch = self.frame_clock.epoch if value else -1
+
     def update(self, grid):
         """
         The main update logic for the element.
@@ -44,8 +89,14 @@ class Element:
         The base implementation does nothing but mark as processed.
         """
         # Ensure processed flag is set if not already done by subclass
-        if not self.processed:
-            self.processed = True
+        self.processed_epoch = self.frame_clock.epoch
+
+    def on_state_loaded(self):
+        """
+        Called after the state_fields were restored from a save, before the element is
+        placed on the grid. Subclasses rebuild attributes derived from their state here.
+        """
+        pass
 
     def get_drawing_info(self):
         """Returns the character and color pair index for drawing."""
@@ -64,34 +115,17 @@ class Element:
 
     def _swap_with(self, grid, ny, nx):
         """Swaps this element's position with the target cell (ny, nx) on the grid."""
-        target_element = grid.get_element(ny, nx)
-
-        # Store current position before modifying grid
-        old_y, old_x = self.y, self.x
-
-        # Update grid state
-        # Pass tags when setting elements? No, tags are per-instance.
-        grid.set_element(old_y, old_x, target_element) # Put target where self was
-        grid.set_element(ny, nx, self)               # Put self where target was
-
-        # Update element positions and internal coordinates (including tags if they were swapped)
-        if target_element:
-            target_element.y, target_element.x = old_y, old_x
-            # Swapping tags might be needed if tags define behavior/appearance
-            # For now, assume tags stay with the original instance object.
-
-        self.y, self.x = ny, nx
-        self.processed = True # Mark self as processed *after* successfully moving/swapping
+        # Swaps both cells and their coordinates in one step (tags stay with each instance)
+        grid.swap_elements(self.y, self.x, ny, nx)
+        self.processed_epoch = self.frame_clock.epoch # Mark self as processed *after* successfully moving/swapping
 
 
     def _move_to(self, grid, ny, nx):
         """Moves this element to the target cell (ny, nx), assuming it's empty."""
         if grid.get_element(ny, nx) is None:
-            grid.set_element(self.y, self.x, None) # Clear old position
-            # Update self position *before* placing in grid for consistency
-            self.y, self.x = ny, nx
-            grid.set_element(ny, nx, self) # Set new position (implicitly handles tags)
-            self.processed = True # Mark self as processed after moving
+            # Swapping with the empty cell clears the old position and updates self.y/x
+            grid.swap_elements(self.y, self.x, ny, nx)
+            self.processed_epoch = self.frame_clock.epoch # Mark self as processed after moving
             return True
         return False
 
@@ -131,13 +165,14 @@ class Powder(Movable):
     can_freeze = True # Most powders can be 'frozen' into a solid block
 
     def update(self, grid):
-        if self.processed:
+        epoch = self.frame_clock.epoch # Read once: 'processed' is checked several times per update
+        if self.processed_epoch == epoch:
             return
 
         # --- Interactions first? Or Movement first? ---
         # Let's try interactions *before* movement for powders, allows reactions before falling
         self.run_interactions(grid)
-        if self.processed: # Interaction might have transformed or moved the element
+        if self.processed_epoch == epoch: # Interaction might have transformed or moved the element
             return
 
         # --- Movement Logic (if not processed by interaction) ---
@@ -165,8 +200,7 @@ class Powder(Movable):
         # 2. Try moving diagonally down (if couldn't move straight down)
         if not moved:
             possible_targets = []
-            directions = [-1, 1]
-            random.shuffle(directions)
+            directions = (-1, 1) if grid.rng.coin() else (1, -1) # Random diagonal order
 
             for dx in directions:
                 diag_x = self.x + dx
@@ -206,8 +240,7 @@ class Powder(Movable):
             if moved: return
 
         # 3. Final Processing Flag (if not processed by move or interaction)
-        if not self.processed:
-            self.processed = True
+        self.processed_epoch = epoch
 
     def run_interactions(self, grid):
         """Placeholder for specific powder interactions, called BEFORE movement attempts."""
@@ -222,12 +255,13 @@ class Liquid(Movable):
     can_freeze = True # Liquids can typically be frozen
 
     def update(self, grid):
-        if self.processed:
+        epoch = self.frame_clock.epoch
+        if self.processed_epoch == epoch:
             return
 
         # --- 1. Interactions First ---
         self.run_interactions(grid)
-        if self.processed: # Return if interaction consumed/transformed self
+        if self.processed_epoch == epoch: # Return if interaction consumed/transformed self
             return
 
         # --- 2. Movement Logic (if not processed by interaction) ---
@@ -247,8 +281,7 @@ class Liquid(Movable):
         # Try moving diagonally down
         if not moved:
             possible_targets = []
-            directions = [-1, 1]
-            random.shuffle(directions)
+            directions = (-1, 1) if grid.rng.coin() else (1, -1) # Random diagonal order
             for dx in directions:
                 diag_x = self.x + dx
                 if grid.is_valid(potential_y, diag_x):
@@ -275,7 +308,7 @@ class Liquid(Movable):
 
         # Try flowing horizontally
         if not moved:
-            direction = random.choice([-1, 1])
+            direction = -1 if grid.rng.coin() else 1
             can_flow = False
             final_target_x = self.x
             is_swap_flow = False
@@ -318,8 +351,7 @@ class Liquid(Movable):
             if moved: return
 
         # --- 3. Final Processing Flag ---
-        if not self.processed:
-            self.processed = True
+        self.processed_epoch = epoch
 
     def run_interactions(self, grid):
         """Placeholder for specific liquid interactions. Called BEFORE movement."""
@@ -329,12 +361,15 @@ class Gas(Movable):
     """Behavior for gas elements (Steam, Smoke, Fire)."""
     is_gas = True
     density = -5
+    always_active = True # Gases keep rising, spreading and dissipating
     rise_speed = 1
     spread_factor = 2
+    boundary_dissipation_chance = 0.01 # Chance per step to vanish when rising into the top edge
     can_freeze = False # Gases typically don't get frozen by cryo powder
 
     def update(self, grid):
-        if self.processed:
+        epoch = self.frame_clock.epoch
+        if self.processed_epoch == epoch:
             return
 
         # --- 1. Movement Logic First ---
@@ -351,7 +386,7 @@ class Gas(Movable):
             check_y = current_y - i
             if not grid.is_valid(check_y, current_x):
                 self.check_boundary_dissipation(grid)
-                if self.processed: return # Dissipated at boundary
+                if self.processed_epoch == epoch: return # Dissipated at boundary
                 break # Hit boundary
             above_element = grid.get_element(check_y, current_x)
             if above_element is None:
@@ -371,9 +406,9 @@ class Gas(Movable):
 
         # B. Try Spreading (if not processed by rising or dissipation)
         # Use potentially updated position (self.y, self.x)
-        if not self.processed:
+        if self.processed_epoch != epoch:
             spread_y, spread_x = self.y, self.x # Position after potential rise
-            direction = random.choice([-1, 1])
+            direction = -1 if grid.rng.coin() else 1
             can_spread = False
             final_target_x = spread_x
             is_swap_spread = False
@@ -410,12 +445,11 @@ class Gas(Movable):
                      if self._move_to(grid, spread_y, final_target_x): moved = True
 
         # --- 2. Interactions (only if not processed by movement/dissipation) ---
-        if not self.processed:
+        if self.processed_epoch != epoch:
              self.run_interactions(grid) # Interactions might set processed = True
 
         # --- 3. Final Processing Flag ---
-        if not self.processed:
-            self.processed = True
+        self.processed_epoch = epoch
 
     def run_interactions(self, grid):
         """Placeholder for specific gas interactions. Called AFTER movement attempts."""
@@ -424,7 +458,7 @@ class Gas(Movable):
     def check_boundary_dissipation(self, grid):
         """Check if gas should dissipate at the top boundary."""
         # Default: Low chance to dissipate at boundary
-        if random.random() < 0.01:
+        if grid.rng.random() < self.boundary_dissipation_chance:
             grid.set_element(self.y, self.x, None)
             self.processed = True
 
@@ -441,13 +475,13 @@ class Solid(Element):
     can_freeze = False # Solids typically aren't frozen further
 
     def update(self, grid):
-        if self.processed:
+        epoch = self.frame_clock.epoch
+        if self.processed_epoch == epoch:
             return
         # Interactions first for static solids
         self.run_interactions(grid)
         # If interaction didn't process it, mark as processed
-        if not self.processed:
-            self.processed = True
+        self.processed_epoch = epoch
 
     def run_interactions(self, grid):
         """Placeholder for solid interactions (melting, reacting, growing)."""
@@ -463,8 +497,7 @@ class StaticSolid(Solid):
 
     # Override update to do nothing but set processed flag
     def update(self, grid):
-        if not self.processed:
-             self.processed = True
+        self.processed_epoch = self.frame_clock.epoch
 
     # Override run_interactions to be empty
     def run_interactions(self, grid):
@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 from .base import Powder, Element
-import random
 import curses
 # No top-level imports of Water, Stone
 
@@ -33,7 +32,7 @@ class CementPowder(Powder):
                     water_neighbor_coord = (ny, nx)
                     break # Found one water source
 
-        if found_water and random.random() < self.solidify_chance:
+        if found_water and grid.rng.random() < self.solidify_chance:
             # Turn self into Stone using grid factory
             new_stone = grid.create_element('O', self.y, self.x)
             grid.set_element(self.y, self.x, new_stone)
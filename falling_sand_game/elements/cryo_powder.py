@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 from .base import Powder, Element
-import random
 import curses
 
 class CryoPowder(Powder):
@@ -31,8 +30,8 @@ class CryoPowder(Powder):
                     freezable_neighbors.append((ny, nx, neighbor))
 
         # 2. Attempt to freeze one neighbor
-        if freezable_neighbors and random.random() < self.freeze_chance:
-            ny, nx, target_neighbor = random.choice(freezable_neighbors)
+        if freezable_neighbors and grid.rng.random() < self.freeze_chance:
+            ny, nx, target_neighbor = grid.rng.choice(freezable_neighbors)
 
             # Turn the neighbor into Ice ('C') using grid factory
             # Preserve tags? Let's copy tags from original to new ice.
@@ -45,7 +44,7 @@ class CryoPowder(Powder):
                 frozen_neighbor = True
 
                 # 3. Chance to consume self after freezing
-                if random.random() < self.self_consume_chance:
+                if grid.rng.random() < self.self_consume_chance:
                     grid.set_element(self.y, self.x, None) # Remove self
                     self.processed = True # Mark self as processed (it's gone)
                     return # Exit early
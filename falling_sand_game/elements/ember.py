@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 from .base import Powder, Element
-import random
 import curses
 # No top-level imports of Ash, Fire, Smoke
 
@@ -12,6 +11,7 @@ class Ember(Powder):
     color = (curses.COLOR_RED, curses.COLOR_YELLOW)
     density = 4.5 # Similar to ash but maybe slightly denser
     is_heat_source = True
+    always_active = True # Burns out on its own
     ignite_chance = 0.25
     burn_out_chance_ignited = 0.04
     burn_out_chance_idle = 0.02
@@ -37,8 +37,8 @@ class Ember(Powder):
                    and neighbor.key != 'F' and neighbor.key != 'B':
                      flammable_neighbors.append((ny, nx, neighbor))
 
-        if flammable_neighbors and random.random() < self.ignite_chance:
-            ny, nx, target_neighbor = random.choice(flammable_neighbors)
+        if flammable_neighbors and grid.rng.random() < self.ignite_chance:
+            ny, nx, target_neighbor = grid.rng.choice(flammable_neighbors)
             # Turn neighbor into Fire using grid factory
             new_fire = grid.create_element('F', ny, nx)
             grid.set_element(ny, nx, new_fire)
@@ -47,7 +47,7 @@ class Ember(Powder):
 
         # 2. Chance to burn out
         current_burn_out_chance = self.burn_out_chance_ignited if ignited_neighbor else self.burn_out_chance_idle
-        if random.random() < current_burn_out_chance:
+        if grid.rng.random() < current_burn_out_chance:
             # Create Ash using grid factory
             new_ash = grid.create_element('H', self.y, self.x)
             grid.set_element(self.y, self.x, new_ash)
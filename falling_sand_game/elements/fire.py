@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 from .base import Gas, Element
-import random
 import curses
 # No top-level imports of Ash, Smoke, Ember
 
@@ -18,6 +17,7 @@ class Fire(Gas):
     burn_out_chance_fueled = 0.05
     burn_out_chance_idle = 0.15
     ash_on_burnout_chance = 0.4 # Chance to become Ash vs Smoke
+    boundary_dissipation_chance = 0.0 # Fire doesn't dissipate at the boundary, it just stops rising
 
     # Coordinates for spreading/burning (includes diagonals)
     BURN_CHECKS = [(0, 1), (0, -1), (1, 0), (-1, 0), (1, 1), (1, -1), (-1, 1), (-1, -1)]
@@ -39,8 +39,8 @@ class Fire(Gas):
                    and neighbor.key != 'F' and neighbor.key != 'B':
                     flammable_neighbors.append((ny, nx, neighbor))
 
-        if flammable_neighbors and random.random() < self.burn_chance:
-            ny, nx, target_neighbor = random.choice(flammable_neighbors)
+        if flammable_neighbors and grid.rng.random() < self.burn_chance:
+            ny, nx, target_neighbor = grid.rng.choice(flammable_neighbors)
 
             # Determine product key based on fuel key
             product_key = None
@@ -59,9 +59,9 @@ class Fire(Gas):
 
         # 2. Chance to burn out
         current_burn_out_chance = self.burn_out_chance_fueled if fuel_consumed else self.burn_out_chance_idle
-        if random.random() < current_burn_out_chance:
+        if grid.rng.random() < current_burn_out_chance:
             # Turn into Smoke or Ash
-            product_key = 'H' if random.random() < self.ash_on_burnout_chance else 'K'
+            product_key = 'H' if grid.rng.random() < self.ash_on_burnout_chance else 'K'
             # Create product using grid factory
             new_product = grid.create_element(product_key, self.y, self.x)
             grid.set_element(self.y, self.x, new_product)
@@ -72,9 +72,3 @@ class Fire(Gas):
         # Mark as processed if not already done
         if not self.processed:
             self.processed = True
-
-    def check_boundary_dissipation(self, grid):
-        """Fire doesn't dissipate at the boundary, it just stops rising."""
-        pass # Override Gas behavior
-
-
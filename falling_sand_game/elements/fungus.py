@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 from .base import Solid, Element # Fungus is a solid that spreads
-import random
 import curses
 
 class Fungus(Solid):
@@ -14,6 +13,7 @@ class Fungus(Solid):
     is_flammable = True # Organic
     dissolvable_by_acid = True
     spread_chance = 0.005 # Chance to spread to an adjacent valid spot
+    always_active = True # Spreads and releases spores at random
     spore_release_chance = 0.001 # Chance to release a spore into adjacent empty space
     max_neighbors_to_spread = 2 # Limit spread if too crowded
 
@@ -45,9 +45,9 @@ class Fungus(Solid):
         # 1. Attempt to Spread (if not too crowded)
         spread_occurred = False
         if neighbor_count < self.max_neighbors_to_spread and \
-           possible_spread_spots and random.random() < self.spread_chance:
+           possible_spread_spots and grid.rng.random() < self.spread_chance:
 
-            target_y, target_x, target_element = random.choice(possible_spread_spots)
+            target_y, target_x, target_element = grid.rng.choice(possible_spread_spots)
             # Replace the target element with new Fungus
             new_fungus = Fungus(target_y, target_x)
             new_fungus.tags = list(self.tags) # Copy tags
@@ -56,8 +56,8 @@ class Fungus(Solid):
             spread_occurred = True
 
         # 2. Attempt to Release Spore (only if didn't spread)
-        if not spread_occurred and possible_spore_spots and random.random() < self.spore_release_chance:
-            spore_y, spore_x = random.choice(possible_spore_spots)
+        if not spread_occurred and possible_spore_spots and grid.rng.random() < self.spore_release_chance:
+            spore_y, spore_x = grid.rng.choice(possible_spore_spots)
             # Create a Spore element (key ',')
             new_spore = grid.create_element(',', spore_y, spore_x)
             if new_spore:
@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 from .base import Powder, Element
-import random
 import curses
 # No top-level imports of Fire
 
@@ -34,7 +33,7 @@ class Gunpowder(Powder):
                     is_heated = True
                     break
 
-        if is_heated and random.random() < self.explode_on_heat_chance:
+        if is_heated and grid.rng.random() < self.explode_on_heat_chance:
             # Turn self into Fire using grid factory
             new_fire = grid.create_element('F', self.y, self.x)
             grid.set_element(self.y, self.x, new_fire)
@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 from .base import Solid, Element
-import random
 import curses
 # No top-level imports of Water, Ash, Smoke
 
@@ -38,7 +37,7 @@ class Ice(Solid):
                     heat_source_element = neighbor
                     break # Found one heat source
 
-        if heated and random.random() < self.melt_chance:
+        if heated and grid.rng.random() < self.melt_chance:
             # Turn into Water using grid factory
             new_water = grid.create_element('W', self.y, self.x)
             grid.set_element(self.y, self.x, new_water)
@@ -50,13 +49,13 @@ class Ice(Solid):
                 ny, nx = heat_source_coord
                 # Check heat source type by key
                 if heat_source_element.key == 'B': # Ember
-                     if random.random() < self.cool_ember_chance:
+                     if grid.rng.random() < self.cool_ember_chance:
                          # Create Ash using grid factory
                          cooled_product = grid.create_element('H', ny, nx)
                          grid.set_element(ny, nx, cooled_product)
                          if cooled_product: cooled_product.processed = True # Mark cooled product
                 elif heat_source_element.key == 'F': # Fire
-                     if random.random() < self.cool_fire_chance:
+                     if grid.rng.random() < self.cool_fire_chance:
                           # Create Smoke using grid factory
                           cooled_product = grid.create_element('K', ny, nx)
                           grid.set_element(ny, nx, cooled_product)
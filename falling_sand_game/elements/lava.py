@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 from .base import Liquid, Element
-import random
 import curses
 # No top-level imports of Water, Ice, Stone, Steam, Fire
 
@@ -64,7 +63,7 @@ class Lava(Liquid):
 
                     # 3. Ignite Flammable (if no reaction yet)
                     # Check properties, ensure neighbor is flammable and not already a heat source
-                    elif neighbor.is_flammable and not neighbor.is_heat_source and random.random() < self.ignite_chance:
+                    elif neighbor.is_flammable and not neighbor.is_heat_source and grid.rng.random() < self.ignite_chance:
                          # Turn neighbor into Fire (use factory)
                          new_fire = grid.create_element('F', ny, nx)
                          grid.set_element(ny, nx, new_fire)
@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 from ...base import StaticSolid, Element  # Use StaticSolid as it doesn't move
-import random
 import curses
 # Import the element manager singleton (though not strictly needed here)
 # from ....element_manager import element_manager
@@ -39,7 +38,7 @@ class Duplicator(StaticSolid):
         # Check if element above exists, is not None, and is not itself a Duplicator ('*')
         if above_element and above_element.key != '*':
             # Check duplication chance
-            if random.random() < self.duplicate_chance:
+            if grid.rng.random() < self.duplicate_chance:
                 # Find available EMPTY target cells in the specified directions
                 possible_targets = []
                 for dy, dx in self.DUPLICATE_DIRECTIONS:
@@ -51,7 +50,7 @@ class Duplicator(StaticSolid):
                 # If there are valid, empty target cells, attempt duplication
                 if possible_targets:
                     # Choose a random empty target cell
-                    target_y, target_x = random.choice(possible_targets)
+                    target_y, target_x = grid.rng.choice(possible_targets)
 
                     # Get the key of the element above to duplicate
                     element_to_duplicate_key = above_element.key
@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 from ...base import Solid, Element  # Use Solid as the base class
-import random
 import curses
 # Import the element manager singleton to get the list of placeable elements
 from ....element_manager import element_manager
@@ -18,6 +17,7 @@ class Emitter(Solid):
     # Defaults from Solid: not flammable, not dissolvable etc.
 
     EMIT_CHANCE = 0.10 # 10% chance per frame to emit
+    always_active = True # Emits at random, keep its chunk awake
     # Directions: Up, Down, Left, Right relative to the emitter
     DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
 
@@ -27,9 +27,9 @@ class Emitter(Solid):
         This is called by the Solid base class's update method.
         """
         # Check the probability condition first
-        if random.random() < self.EMIT_CHANCE:
+        if grid.rng.random() < self.EMIT_CHANCE:
             # Choose a random direction from the defined list
-            dy, dx = random.choice(self.DIRECTIONS)
+            dy, dx = grid.rng.choice(self.DIRECTIONS)
             ny, nx = self.y + dy, self.x + dx # Calculate neighbor coordinates
 
             # Check if the target cell is within grid bounds AND is currently empty
@@ -40,7 +40,7 @@ class Emitter(Solid):
                 # Ensure there are elements available to emit
                 if placeable_keys:
                     # Choose a random element key from the placeable list
-                    emit_key = random.choice(placeable_keys)
+                    emit_key = grid.rng.choice(placeable_keys)
 
                     # Use the grid's factory method to create an instance of the chosen element
                     # at the target neighbor coordinates (ny, nx)
@@ -76,7 +76,7 @@ class PowerfulEmitter(Emitter):
         Powerful Emitter attempts to emit a random placeable element within its range (radius 5)
         and will replace the content of the target cell.
         """
-        if random.random() < self.EMIT_CHANCE:
+        if grid.rng.random() < self.EMIT_CHANCE:
             # Find a random target cell within the radius
             # We'll iterate through cells within the square bounding box of the circle and check distance
             max_offset = self.EMIT_RANGE
@@ -93,7 +93,7 @@ class PowerfulEmitter(Emitter):
 
             if possible_targets:
                 # Choose a random target cell from the possible locations
-                ny, nx = random.choice(possible_targets)
+                ny, nx = grid.rng.choice(possible_targets)
 
                 # Get the list of currently known placeable element keys
                 placeable_keys = element_manager.get_placeable_order()
@@ -101,7 +101,7 @@ class PowerfulEmitter(Emitter):
                 # Ensure there are elements available to emit
                 if placeable_keys:
                     # Choose a random element key from the placeable list
-                    emit_key = random.choice(placeable_keys)
+                    emit_key = grid.rng.choice(placeable_keys)
 
                     # Use the grid's factory method to create an instance of the chosen element
                     # at the target coordinates (ny, nx)
@@ -132,9 +132,9 @@ class CleanEmitter(Emitter):
         Clean Emitter attempts to emit a random placeable element (excluding 'v')
         into an adjacent empty cell.
         """
-        if random.random() < self.EMIT_CHANCE:
+        if grid.rng.random() < self.EMIT_CHANCE:
             # Choose a random direction from the defined list
-            dy, dx = random.choice(self.DIRECTIONS)
+            dy, dx = grid.rng.choice(self.DIRECTIONS)
             ny, nx = self.y + dy, self.x + dx # Calculate neighbor coordinates
 
             # Check if the target cell is within grid bounds AND is currently empty
@@ -148,7 +148,7 @@ class CleanEmitter(Emitter):
                 # Ensure there are elements available to emit after filtering
                 if clean_placeable_keys:
                     # Choose a random element key from the filtered list
-                    emit_key = random.choice(clean_placeable_keys)
+                    emit_key = grid.rng.choice(clean_placeable_keys)
 
                     # Use the grid's factory method to create an instance of the chosen element
                     # at the target neighbor coordinates (ny, nx)
@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 from ..base import Element, Powder, Liquid, Solid, Gas, StaticSolid, Movable
-import random
 import curses
 import math
 
@@ -17,10 +16,12 @@ class Explosive(Solid):
     dissolvable_by_acid = True
     blast_radius = 5 # 爆炸半径
     fuse_frames = 5 # 点燃后几帧爆炸
+    always_active = True # 点燃后计时, 保持所在区块活跃
 
     # 内部状态
     is_lit = False
     lit_timer = 0
+    state_fields = ("is_lit", "lit_timer") # 存档时保存的状态
 
     def __init__(self, y, x):
         super().__init__(y, x)
@@ -47,7 +48,7 @@ class Explosive(Solid):
                          return True
                     # 检查是否是燃烧中的炸药或炸弹
                     if (neighbor.key == 'D' and getattr(neighbor, 'is_lit', False)) or \
-                       (neighbor.key == 'B' and getattr(neighbor, 'is_lit', False)):
+                       (neighbor.key == 'o' and getattr(neighbor, 'is_lit', False)):
                          return True
 
         return False
@@ -106,7 +107,7 @@ class Explosive(Solid):
 
 # 2. 炸弹 (Bomb)
 class Bomb(Solid):
-    key = 'B' # 使用 B，余烬是 'b'
+    key = 'o' # B 已是余烬的键 (余烬显示为 'b')，炸弹仍显示为 'B'
     name = '炸弹'
     char = 'B'
     color = (curses.COLOR_YELLOW, curses.COLOR_BLACK, curses.A_BOLD) # 黄色
@@ -121,6 +122,8 @@ class Bomb(Solid):
     lit_timer = 20 # 点燃后 20 帧爆炸
     blast_radius = 7 # 爆炸半径比炸药大
     fall_speed = 1 # 点燃后每帧尝试下落的距离
+    always_active = True # 点燃后计时, 保持所在区块活跃
+    state_fields = ("is_lit", "lit_timer") # 存档时保存的状态
 
     def __init__(self, y, x):
         super().__init__(y, x)
@@ -141,7 +144,7 @@ class Bomb(Solid):
                     if neighbor.is_heat_source: return True
                     if neighbor.key == 'U': return True
                     if (neighbor.key == 'D' and getattr(neighbor, 'is_lit', False)) or \
-                       (neighbor.key == 'B' and getattr(neighbor, 'is_lit', False)): return True
+                       (neighbor.key == 'o' and getattr(neighbor, 'is_lit', False)): return True
         return False
 
     def update(self, grid):
@@ -247,6 +250,7 @@ class Bug(Movable): # 虫子是可移动的活物
     dissolvable_by_acid = True # 酸可以腐蚀虫子
 
     move_chance = 0.3 # 每帧移动的几率
+    always_active = True # 随机移动和繁殖
     reproduce_chance = 0.001 # 繁殖几率 (低)
     reproduce_min_neighbors = 1 # 需要至少一个相邻的虫子才能繁殖
 
@@ -275,8 +279,8 @@ class Bug(Movable): # 虫子是可移动的活物
                  if grid.is_valid(ny, nx) and grid.get_element(ny, nx) is None:
                       empty_spots.append((ny, nx))
 
-            if empty_spots and random.random() < self.reproduce_chance:
-                gy, gx = random.choice(empty_spots)
+            if empty_spots and grid.rng.random() < self.reproduce_chance:
+                gy, gx = grid.rng.choice(empty_spots)
                 # 使用工厂方法创建新的虫子实例
                 new_bug = Bug(gy, gx) # 或者 grid.create_element('W', gy, gx)
                 if new_bug:
@@ -285,9 +289,10 @@ class Bug(Movable): # 虫子是可移动的活物
                     # 新生成的虫子不立即处理，下一帧自然更新
 
         # --- 移动 --- (在繁殖后尝试移动)
-        if random.random() < self.move_chance:
-            random.shuffle(self.MOVE_DIRECTIONS)
-            for dy, dx in self.MOVE_DIRECTIONS:
+        if grid.rng.random() < self.move_chance:
+            directions = list(self.MOVE_DIRECTIONS) # 打乱副本: 类属性由所有虫子共享
+            grid.rng.shuffle(directions)
+            for dy, dx in directions:
                 ny, nx = self.y + dy, self.x + dx
                 if grid.is_valid(ny, nx):
                     target_element = grid.get_element(ny, nx)
@@ -355,7 +360,7 @@ class GlassPowder(Powder):
                     is_heated = True
                     break
 
-        if is_heated and random.random() < self.melt_chance:
+        if is_heated and grid.rng.random() < self.melt_chance:
             # 熔化成玻璃 (key 'X')
             new_glass = grid.create_element('X', self.y, self.x)
             if new_glass:
@@ -387,14 +392,14 @@ class CorrosiveGas(Gas):
         if self.processed: return
 
         # 1. 消散 ( Gas base class also has check_boundary_dissipation)
-        if random.random() < self.dissipate_chance:
+        if grid.rng.random() < self.dissipate_chance:
             grid.set_element(self.y, self.x, None)
             self.processed = True
             return
 
         # 2. 腐蚀邻居 (如果未消散)
         corroded_neighbor = False
-        if random.random() < self.corrode_chance:
+        if grid.rng.random() < self.corrode_chance:
             possible_targets = []
             for dy, dx in self.CORRODE_CHECKS:
                 ny, nx = self.y + dy, self.x + dx
@@ -405,7 +410,7 @@ class CorrosiveGas(Gas):
                         possible_targets.append((ny, nx, neighbor))
 
             if possible_targets:
-                ny, nx, target_neighbor = random.choice(possible_targets)
+                ny, nx, target_neighbor = grid.rng.choice(possible_targets)
                 # 移除被腐蚀的邻居
                 grid.set_element(ny, nx, None)
                 # 腐蚀气体本身不消失
@@ -423,12 +428,13 @@ class FrozenMetal(Solid):
     is_static = True # 不移动
     is_solid = True
     melt_chance = 0.005 # 缓慢融化几率
+    always_active = True # 随机融化
 
     def run_interactions(self, grid):
         """Frozen Metal gradually melts into Metal."""
         if self.processed: return
 
-        if random.random() < self.melt_chance:
+        if grid.rng.random() < self.melt_chance:
             # 融化成金属 (key 'M')
             new_metal = grid.create_element('M', self.y, self.x)
             if new_metal:
@@ -461,7 +467,7 @@ class Goo(Liquid):
         if self.processed: return
 
         stuck_neighbor = False
-        if random.random() < self.stick_chance:
+        if grid.rng.random() < self.stick_chance:
             possible_targets = []
             for dy, dx in self.STICK_CHECKS:
                 ny, nx = self.y + dy, self.x + dx
@@ -473,7 +479,7 @@ class Goo(Liquid):
 
             if possible_targets:
                 # 选择一个可粘住的邻居
-                ny, nx, target_neighbor = random.choice(possible_targets)
+                ny, nx, target_neighbor = grid.rng.choice(possible_targets)
                 # 将邻居标记为静态或添加一个“粘住”标签，使其暂时无法移动
                 # 最简单的方式是添加一个标签，然后在 Base Movable 的 update 中检查这个标签
                 # 复杂的实现可能需要覆盖邻居的 update 方法
@@ -495,9 +501,11 @@ class EnergyParticle(Movable): # 像气体一样飘散或短暂存在
     rise_speed = 1
     spread_factor = 3
     lifetime = 10 # 短暂存在，10 帧后消失
+    always_active = True # 寿命计时
 
     # 内部状态
     timer = 0
+    state_fields = ("timer",) # 存档时保存的剩余寿命
 
     def __init__(self, y, x):
         super().__init__(y, x)
@@ -528,14 +536,14 @@ class EnergyParticle(Movable): # 像气体一样飘散或短暂存在
                          pass
                     elif neighbor.key == 'W':
                          # 水变成蒸汽
-                         if random.random() < 0.3:
+                         if grid.rng.random() < 0.3:
                               new_steam = grid.create_element('G', ny, nx)
                               grid.set_element(ny, nx, new_steam)
                               if new_steam: new_steam.processed = True
                               triggered = True; break
                     elif neighbor.key == 'D':
                          # 点燃炸药
-                         if random.random() < 0.8:
+                         if grid.rng.random() < 0.8:
                              if hasattr(neighbor, 'is_lit') and not neighbor.is_lit:
                                   neighbor.is_lit = True
                                   neighbor.lit_timer = neighbor.fuse_frames
@@ -577,9 +585,9 @@ class Absorber(StaticSolid):
                 if neighbor and not neighbor.is_static and neighbor.key != '@' and not neighbor.processed:
                      absorbable_neighbors.append((ny, nx, neighbor))
 
-        if absorbable_neighbors and random.random() < self.absorb_chance:
+        if absorbable_neighbors and grid.rng.random() < self.absorb_chance:
             # 选择一个可吸收的邻居
-            ny, nx, target_neighbor = random.choice(absorbable_neighbors)
+            ny, nx, target_neighbor = grid.rng.choice(absorbable_neighbors)
             # 吸收邻居 (移除它)
             grid.set_element(ny, nx, None)
             # 吸收块本身不消失，也不标记为 processed=True (因为它是一个静态固体，它的 processed 状态由 StaticSolid 基类在 update 中处理)
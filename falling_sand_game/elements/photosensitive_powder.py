@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 from .base import Powder, Element, Solid # Can be Powder or Solid depending on state
-import random
 import curses
 import math
 from ..element_manager import element_manager # Import singleton directly
@@ -16,6 +15,8 @@ class PhotosensitivePowder(Powder):
     is_light_sensitive = True
     solidification_threshold = 3 # Needs light from >= this many sources or distance? Let's use distance.
     solidification_range = 6 # Max distance from a Lamp to solidify
+    always_active = True # Reacts to lamps further away than the neighbouring chunk border
+    has_dynamic_properties = True # Switches is_powder/density when (un)solidifying
     solidified_char = 'H' # Character when solidified ('#' might be confusing)
     solidified_color = (curses.COLOR_BLUE, -1, curses.A_BOLD) # Bright Blue when solid
     solidified_density = 100 # Make it dense like a wall when solid
@@ -23,11 +24,25 @@ class PhotosensitivePowder(Powder):
 
     # Store solidified state
     is_solidified = False
+    state_fields = ("is_solidified",)
 
     def __init__(self, y, x):
         super().__init__(y, x)
         self.is_solidified = False # Start as powder
 
+    def on_state_loaded(self):
+        """Restores the powder or solid characteristics matching the loaded state."""
+        if self.is_solidified:
+            self.is_powder = False
+            self.is_static = True
+            self.char = self.solidified_char
+            self.density = self.solidified_density
+        else:
+            self.is_powder = True
+            self.is_static = False
+            self.char = PhotosensitivePowder.char
+            self.density = PhotosensitivePowder.density
+
     def check_light(self, grid):
         """Checks for nearby light sources (Lamps)."""
         for r in range(max(0, self.y - self.solidification_range), min(grid.height, self.y + self.solidification_range + 1)):
@@ -97,7 +112,7 @@ class PhotosensitivePowder(Powder):
                  # 2. Try moving diagonally down
                  if not moved:
                      possible_targets = []
-                     directions = [-1, 1]; random.shuffle(directions)
+                     directions = (-1, 1) if grid.rng.coin() else (1, -1)
                      for dx in directions:
                          diag_x = self.x + dx
                          if grid.is_valid(potential_y, diag_x):
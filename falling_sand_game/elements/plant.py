@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 from .base import Solid, Element # Keep base import
-import random
 import curses
 # No top-level imports of Water, Mud
 
@@ -15,6 +14,7 @@ class Plant(Solid):
     is_flammable = True
     dissolvable_by_acid = True
     grow_chance = 0.003
+    always_active = True # Grows at random, keep its chunk awake
 
     # Define potential growth directions (prefer up, then sides)
     GROW_DIRECTIONS = [(-1, 0), (0, -1), (0, 1)]
@@ -48,8 +48,8 @@ class Plant(Solid):
                  possible_grow_spots.append((ny, nx))
 
         # 3. Attempt growth
-        if possible_grow_spots and random.random() < self.grow_chance:
-            gy, gx = random.choice(possible_grow_spots)
+        if possible_grow_spots and grid.rng.random() < self.grow_chance:
+            gy, gx = grid.rng.choice(possible_grow_spots)
             # Create another Plant instance using self.__class__
             new_plant = self.__class__(gy, gx) # Use own class to create more
             grid.set_element(gy, gx, new_plant)
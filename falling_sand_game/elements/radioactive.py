@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 from .base import Powder, Element # Let's make it a powder that falls
-import random
 import curses
 
 class Radioactive(Powder):
@@ -14,6 +13,7 @@ class Radioactive(Powder):
     is_flammable = False # Doesn't burn easily
     dissolvable_by_acid = True # Acid might neutralize it?
     decay_chance = 0.001 # Chance per frame to decay into something else (e.g., Lead/Metal)
+    always_active = True # Decays and mutates neighbours at random
     mutation_chance = 0.005 # Chance per frame to mutate an adjacent non-static neighbor
     radiation_particle_chance = 0.01 # Chance to emit a short-lived particle effect
 
@@ -25,7 +25,7 @@ class Radioactive(Powder):
         if self.processed: return
 
         # 1. Decay
-        if random.random() < self.decay_chance:
+        if grid.rng.random() < self.decay_chance:
             # Turn into Metal ('M') - assuming Metal represents a stable end product like lead
             new_stable = grid.create_element('M', self.y, self.x)
             if new_stable:
@@ -37,7 +37,7 @@ class Radioactive(Powder):
 
         # 2. Mutate Neighbor (if didn't decay)
         mutated_neighbor = False
-        if random.random() < self.mutation_chance:
+        if grid.rng.random() < self.mutation_chance:
             possible_targets = []
             for dy, dx in self.MUTATION_CHECKS:
                 ny, nx = self.y + dy, self.x + dx
@@ -48,10 +48,10 @@ class Radioactive(Powder):
                         possible_targets.append((ny, nx, neighbor))
 
             if possible_targets:
-                ny, nx, target_neighbor = random.choice(possible_targets)
+                ny, nx, target_neighbor = grid.rng.choice(possible_targets)
                 # Simple mutation: turn target into another random element? Risky.
                 # Or turn into Virus ('V') or Fungus ('f')?
-                mutated_key = random.choice(['V', 'f'])
+                mutated_key = grid.rng.choice(['V', 'f'])
                 new_mutant = grid.create_element(mutated_key, ny, nx)
                 if new_mutant:
                     new_mutant.tags = list(target_neighbor.tags) # Copy tags from original
@@ -61,15 +61,15 @@ class Radioactive(Powder):
 
         # 3. Emit Radiation Particle (visual effect - hard in curses)
         # Instead, let's just have a small chance to turn an adjacent EMPTY cell into fire or acid temporarily?
-        # if random.random() < self.radiation_particle_chance:
+        # if grid.rng.random() < self.radiation_particle_chance:
         #     empty_neighbors = []
         #     for dy, dx in self.MUTATION_CHECKS: # Reuse check coordinates
         #         ny, nx = self.y + dy, self.x + dx
         #         if grid.is_valid(ny, nx) and grid.get_element(ny, nx) is None:
         #             empty_neighbors.append((ny,nx))
         #     if empty_neighbors:
-        #         py, px = random.choice(empty_neighbors)
-        #         particle_key = random.choice(['F']) # Temp Fire particle?
+        #         py, px = grid.rng.choice(empty_neighbors)
+        #         particle_key = grid.rng.choice(['F']) # Temp Fire particle?
         #         # Need a way for this particle to disappear quickly.
         #         # This adds complexity. Skip visual particle for now.
 
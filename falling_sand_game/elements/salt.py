@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 from .base import Powder, Element
-import random
 import curses
 # No top-level import of Water
 
@@ -30,7 +29,7 @@ class Salt(Powder):
                     found_water = True
                     break # Found one water source
 
-        if found_water and random.random() < self.dissolve_chance:
+        if found_water and grid.rng.random() < self.dissolve_chance:
             # Turn into Water using grid factory
             # Copy tags from salt to the new water? Maybe not, water is just water.
             new_water = grid.create_element('W', self.y, self.x)
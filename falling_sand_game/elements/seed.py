@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 from .base import Powder, Element
-import random
 import curses
 # No top-level imports of Water, Mud, Plant
 
@@ -11,6 +10,7 @@ class Seed(Powder):
     color = (curses.COLOR_YELLOW, -1, curses.A_DIM) # Dim Yellow
     density = 2 # Seeds are light
     grow_chance = 0.008
+    always_active = True # Sprouts at random, keep its chunk awake
     is_flammable = True
     dissolvable_by_acid = True
 
@@ -48,7 +48,7 @@ class Seed(Powder):
 
 
         # Attempt to grow if conditions met
-        if has_source and has_space and random.random() < self.grow_chance:
+        if has_source and has_space and grid.rng.random() < self.grow_chance:
             # Turn into Plant using grid factory
             new_plant = grid.create_element('P', self.y, self.x)
             grid.set_element(self.y, self.x, new_plant)
@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 from .base import StaticSolid, Element
-import random
 import curses
 import math
 
@@ -13,6 +12,7 @@ class Singularity(StaticSolid):
     is_static = True # Doesn't move
     is_solid = True
     pull_radius = 7 # Radius within which it pulls elements
+    always_active = True # Pulls elements from a wide radius
     pull_strength = 0.4 # Chance per frame for an element within radius to be pulled closer
     consume_radius = 1 # Radius within which it consumes elements directly (orthogonal+diagonal)
     consume_chance = 0.8 # High chance to consume elements very close
@@ -32,7 +32,7 @@ class Singularity(StaticSolid):
                     neighbor = grid.get_element(ny, nx)
                     # Consume any non-static, non-singularity neighbor if chance passes
                     if neighbor and not neighbor.is_static and neighbor.key != '@' and not neighbor.processed:
-                        if random.random() < self.consume_chance:
+                        if grid.rng.random() < self.consume_chance:
                             grid.set_element(ny, nx, None) # Consume
                             consumed_something = True
                             # Don't mark neighbor processed, it's gone.
@@ -51,7 +51,7 @@ class Singularity(StaticSolid):
                         element = grid.get_element(r, c)
                         # Pull non-static, non-singularity elements if chance passes
                         if element and not element.is_static and element.key != '@' and not element.processed:
-                            if random.random() < self.pull_strength:
+                            if grid.rng.random() < self.pull_strength:
                                 # Calculate direction towards singularity
                                 move_dy = 0
                                 if r < self.y: move_dy = 1
@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 from .base import Gas
-import random
 import curses
 
 class Smoke(Gas):
@@ -13,12 +12,13 @@ class Smoke(Gas):
     rise_speed = 1
     spread_factor = 2
     dissipate_chance = 0.02
+    boundary_dissipation_chance = 0.05 # Higher chance to dissipate at the top boundary (2.5x)
 
     def run_interactions(self, grid):
         """Smoke has a chance to dissipate."""
         if self.processed: return
 
-        if random.random() < self.dissipate_chance:
+        if grid.rng.random() < self.dissipate_chance:
             grid.set_element(self.y, self.x, None)
             self.processed = True
             return
@@ -27,10 +27,3 @@ class Smoke(Gas):
         # Note: Gas movement might already mark it processed
         if not self.processed:
             self.processed = True
-
-    def check_boundary_dissipation(self, grid):
-        """Smoke has a higher chance to dissipate at the top boundary."""
-        # Inherited Gas checks if self.y == 0 basically
-        if random.random() < self.dissipate_chance * 2.5: # Increased chance at boundary
-             grid.set_element(self.y, self.x, None)
-             self.processed = True
@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 from .base import Powder, Element # Spores are light powders
-import random
 import curses
 
 class Spore(Powder):
@@ -13,6 +12,7 @@ class Spore(Powder):
     is_solid = True # Treat as solid particle
     dissipate_chance = 0.005 # Chance to disappear naturally
     grow_chance = 0.01 # Chance to grow into Fungus if conditions met
+    always_active = True # Dissipates or grows at random
 
     # Coordinates for checking growth conditions
     GROW_CHECK = [(1, 0), (0, 1), (0, -1), (-1, 0)] # Check adjacent for growable surface
@@ -22,7 +22,7 @@ class Spore(Powder):
         if self.processed: return
 
         # 1. Chance to dissipate
-        if random.random() < self.dissipate_chance:
+        if grid.rng.random() < self.dissipate_chance:
             grid.set_element(self.y, self.x, None)
             self.processed = True
             return
@@ -38,7 +38,7 @@ class Spore(Powder):
                      can_grow_here = True
                      break
 
-        if can_grow_here and random.random() < self.grow_chance:
+        if can_grow_here and grid.rng.random() < self.grow_chance:
             # Turn into Fungus ('f')
             new_fungus = grid.create_element('f', self.y, self.x)
             if new_fungus:
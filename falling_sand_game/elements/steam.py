@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 from .base import Gas, Element
-import random
 import curses
 # No top-level imports of Water, Ash
 
@@ -14,6 +13,7 @@ class Steam(Gas):
     spread_factor = 2
     condense_chance = 0.005
     cool_ember_chance = 0.05
+    boundary_dissipation_chance = 0.0 # Steam doesn't dissipate at boundary, it might condense
 
     # Define coordinates for cooling check (orthogonal)
     COOL_CHECKS = [(0, 1), (0, -1), (1, 0), (-1, 0)]
@@ -23,7 +23,7 @@ class Steam(Gas):
         if self.processed: return
 
         # 1. Chance to condense
-        if random.random() < self.condense_chance:
+        if grid.rng.random() < self.condense_chance:
             # Create Water using grid factory
             new_water = grid.create_element('W', self.y, self.x)
             grid.set_element(self.y, self.x, new_water)
@@ -39,7 +39,7 @@ class Steam(Gas):
                 neighbor = grid.get_element(ny, nx)
                 # Check if neighbor is Ember ('B') by key and not processed
                 if neighbor and neighbor.key == 'B' and not neighbor.processed:
-                     if random.random() < self.cool_ember_chance:
+                     if grid.rng.random() < self.cool_ember_chance:
                          # Create Ash using grid factory
                          new_ash = grid.create_element('H', ny, nx)
                          grid.set_element(ny, nx, new_ash)
@@ -50,9 +50,3 @@ class Steam(Gas):
         # Mark as processed if not already done
         if not self.processed:
             self.processed = True
-
-    def check_boundary_dissipation(self, grid):
-        """Steam doesn't dissipate at boundary, it might condense."""
-        pass # Override Gas behavior
-
-
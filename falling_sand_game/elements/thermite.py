@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 from .base import Powder, Element
-import random
 import curses
 
 class Thermite(Powder):
@@ -17,11 +16,13 @@ class Thermite(Powder):
     ignition_chance = 0.6 # Chance to ignite if threshold met
     burn_duration = 5 # How many frames it burns for (simple counter)
     burn_temp = 3 # Burns hotter than Fire/Lava
+    always_active = True # Burn timer counts down every frame
 
     # State variables
     is_burning = False
     burn_timer = 0
     is_heat_source = False # Only a heat source when burning
+    state_fields = ("is_burning", "burn_timer")
 
     def __init__(self, y, x):
         super().__init__(y, x)
@@ -29,6 +30,10 @@ class Thermite(Powder):
         self.burn_timer = 0
         self.is_heat_source = False
 
+    def on_state_loaded(self):
+        """A loaded burning Thermite is a heat source again."""
+        self.is_heat_source = self.is_burning
+
     # Coordinates for checking ignition sources
     HEAT_CHECKS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
 
@@ -73,7 +78,7 @@ class Thermite(Powder):
                              current_heat = max(current_heat, 3) # Use max heat from neighbor
 
             if current_heat >= self.ignition_threshold_temp:
-                if random.random() < self.ignition_chance:
+                if grid.rng.random() < self.ignition_chance:
                     self.is_burning = True
                     self.burn_timer = self.burn_duration
                     self.is_heat_source = True # Becomes heat source immediately
@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 from .base import Solid, Element # Treat as a non-falling solid that spreads
-import random
 import curses
 
 class Virus(Solid):
@@ -12,6 +11,7 @@ class Virus(Solid):
     is_static = False # It spreads, so not static
     is_solid = True # Acts like a spreading solid block
     spread_chance = 0.02
+    always_active = True # Spreads at random
     dissolvable_by_acid = True # Viruses can be killed by acid
     is_flammable = True
 
@@ -34,8 +34,8 @@ class Virus(Solid):
                  possible_spread_spots.append((ny, nx))
 
         # Attempt to spread
-        if possible_spread_spots and random.random() < self.spread_chance:
-            gy, gx = random.choice(possible_spread_spots)
+        if possible_spread_spots and grid.rng.random() < self.spread_chance:
+            gy, gx = grid.rng.choice(possible_spread_spots)
             new_virus = Virus(gy, gx)
             grid.set_element(gy, gx, new_virus)
             new_virus.processed = True # Mark the newly spread virus as processed
@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 from .base import StaticSolid, Element # Void doesn't move, it affects others
-import random
 import curses
 # Import Wall explicitly if needed for checks
 # from .wall import Wall
@@ -32,8 +31,8 @@ class Void(StaticSolid):
                     consumable_neighbors.append((ny, nx, neighbor))
 
         # Attempt to consume one neighbor
-        if consumable_neighbors and random.random() < self.consume_chance:
-            ny, nx, target_neighbor = random.choice(consumable_neighbors)
+        if consumable_neighbors and grid.rng.random() < self.consume_chance:
+            ny, nx, target_neighbor = grid.rng.choice(consumable_neighbors)
             grid.set_element(ny, nx, None) # Consume neighbor
             # Mark the consumed cell's *original* element? No, just remove it.
 
@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 from .base import Liquid, Element
-import random
 import curses
 # No top-level imports of Steam, Ash, Smoke, CementPowder, Stone
 
@@ -42,7 +41,7 @@ class Water(Liquid):
                     heat_source_element = neighbor
                     break # Found one
 
-        if heat_source_found and random.random() < self.vaporize_chance:
+        if heat_source_found and grid.rng.random() < self.vaporize_chance:
             # Turn into Steam using grid factory at original position
             new_steam = grid.create_element('G', original_y, original_x)
             grid.set_element(original_y, original_x, new_steam)
@@ -56,10 +55,10 @@ class Water(Liquid):
                 cooled_product = None
                 # Check key for type of heat source
                 if heat_source_element.key == 'B': # Ember
-                    if random.random() < self.cool_ember_chance:
+                    if grid.rng.random() < self.cool_ember_chance:
                         cooled_product = grid.create_element('H', ny, nx) # Ash
                 elif heat_source_element.key == 'F': # Fire
-                    if random.random() < self.cool_fire_chance:
+                    if grid.rng.random() < self.cool_fire_chance:
                          cooled_product = grid.create_element('K', ny, nx) # Smoke
                 elif heat_source_element.key == 'L': # Lava - Water doesn't cool lava typically
                     pass
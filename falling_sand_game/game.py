@@ -1,18 +1,33 @@
 # -*- coding: utf-8 -*-
 import curses
 import math
-import random
 import time # For potential timing/debug
 
-from .grid import Grid
+from .simulation import Simulation, GRID_BACKENDS
+from .renderer import GridRenderer
+from .render_thread import FrameSnapshot
+from .command_line import CommandLine, MessageQueue
+from .snapshot import SnapshotStore
+from .history import History
+from .scheduler import FrameScheduler
 # Import the manager instance directly
 from .element_manager import element_manager
-from .config import EMPTY_CHAR, DEFAULT_CURSOR_SIZE, MAX_CURSOR_SIZE, DEFAULT_COLOR_PAIR_INDEX, DEFAULT_TARGET_FPS
+from .config import EMPTY_CHAR, DEFAULT_CURSOR_SIZE, MAX_CURSOR_SIZE, DEFAULT_COLOR_PAIR_INDEX, GRID_BACKEND, HISTORY_KEYFRAME_TICKS
+
+# Cursor movement keys -> (dy, dx), summed per frame by Game.feed_key
+_MOVE_KEYS = {
+    curses.KEY_UP: (-1, 0), ord('k'): (-1, 0),
+    curses.KEY_DOWN: (1, 0), ord('j'): (1, 0),
+    curses.KEY_LEFT: (0, -1), ord('h'): (0, -1),
+    curses.KEY_RIGHT: (0, 1), ord('l'): (0, 1),
+}
+# Keys that change the cells under the cursor -> action, applied once per position per frame
+_ACTION_KEYS = {ord(' '): "place", curses.KEY_DC: "delete", ord('x'): "delete"}
 
 class Game:
     """Manages the overall game state, grid, drawing, and update loop."""
 
-    def __init__(self, height, width, game_area_ratio):
+    def __init__(self, height, width, game_area_ratio, grid_backend=GRID_BACKEND, seed=None):
         self.height = max(1, height) # Ensure height is at least 1
         self.width = max(1, width) # Ensure width is at least 1
         self.game_area_ratio = game_area_ratio
@@ -22,8 +37,9 @@ class Game:
 
         self._recalculate_layout() # Calculate game_width, info_width, etc.
 
-        # Pass the manager instance to the Grid constructor
-        self.grid = Grid(self.game_height, self.game_width, element_manager)
+        # The simulation owns the grid and the update loop; Game adds cursor, input and drawing
+        self.simulation = Simulation(self.game_height, self.game_width, grid_backend, seed)
+        self.renderer = GridRenderer() # Draws the grid area in attribute runs
 
         # Game State
         self.cursor_x = self.game_width // 2
@@ -32,10 +48,44 @@ class Game:
         self.selected_index = 0 # Index into placeable_elements_keys
         self.element_scroll_offset = 0 # For scrolling the element list UI
         self.current_tags = [] # Tags to apply when placing elements
-        self.target_fps = DEFAULT_TARGET_FPS # Current target FPS, can be changed by commands
+        self.scheduler = FrameScheduler() # Independent simulation tick rate and render frame rate
 
         self.running = True
         self.command_mode = False # Flag for command input mode
+        self.paused = False # Simulation stopped (pause/step commands); input and drawing go on
+        self.snapshots = SnapshotStore() # Copy-on-write snapshots of the grid (quick saves, keyframes)
+        self.history = History() # Undo/redo of cursor actions, fill and clear
+        self.keyframe_interval = HISTORY_KEYFRAME_TICKS # Ticks between undo keyframes (0 = none)
+        self.recorder = None # Input log being written (record command, see replay.py)
+        self.timeline = None # Timeline being recorded or browsed (timeline command, see timeline.py)
+        self.command_line = CommandLine() # Command being typed (edited from the main loop)
+        self.messages = MessageQueue() # Timed messages for the bottom line
+        self._info_panel_key = None # Inputs of the last drawn info panel (see draw)
+        self._status_line = None # Last drawn bottom line (text, cursor column)
+        # Input batching for one frame (see feed_key)
+        self._pending_dy = 0
+        self._pending_dx = 0
+        self._last_action = None # Place/delete key already applied at the current cursor
+
+    @property
+    def grid(self):
+        """The simulation grid (replaced on resize and when loading a save)."""
+        return self.simulation.grid
+
+    @grid.setter
+    def grid(self, new_grid):
+        if new_grid is not self.simulation.grid:
+            self.history.clear() # Recorded edits belong to the old grid
+        self.simulation.grid = new_grid
+
+    def set_grid(self, new_grid):
+        """Replaces the grid with a loaded or rebuilt one, fitting the game area and cursor to its size."""
+        self.grid = new_grid
+        self.game_height = new_grid.height
+        self.game_width = new_grid.width
+        self._recalculate_layout()
+        self.cursor_x = min(max(0, self.cursor_x), self.game_width - 1)
+        self.cursor_y = min(max(0, self.cursor_y), self.game_height - 1)
 
     def _recalculate_layout(self):
         """Calculates game area and info panel dimensions."""
@@ -46,6 +96,8 @@ class Game:
 
     def resize(self, new_height, new_width):
         """Handles terminal resize events."""
+        if self.recorder is not None:
+            self.recorder.record_resize(self, new_height, new_width)
         old_height = self.height
         old_width = self.width
         # Ensure new dimensions are positive
@@ -57,21 +109,9 @@ class Game:
         old_game_height = self.game_height
         self._recalculate_layout() # This now recalculates game_height based on new self.height
 
-        # Create a new grid, passing the manager instance
-        new_grid = Grid(self.game_height, self.game_width, element_manager)
-        # Copy old elements, considering the potentially changed game_height
-        for r in range(min(old_game_height, self.game_height)):
-            for c in range(min(old_game_width, self.game_width)):
-                element = self.grid.get_element(r, c)
-                if element:
-                    # Use the factory method on the NEW grid to create elements
-                    # Preserve tags when resizing
-                    new_element = new_grid.create_element(element.key, r, c)
-                    if new_element:
-                        new_element.tags = list(element.tags) # Copy tags
-                        new_grid.set_element(r, c, new_element)
-
-        self.grid = new_grid
+        # Resize the grid, keeping the elements that still fit
+        self.simulation.resize(self.game_height, self.game_width)
+        self.history.clear() # Keyframes and positions refer to the old size
 
         # Adjust cursor position to be within new bounds
         self.cursor_x = min(max(0, self.cursor_x), self.game_width - 1)
@@ -79,31 +119,52 @@ class Game:
 
         # Reset scroll might be best after resize
         self.element_scroll_offset = 0
-
+        # The screen is cleared after a resize; repaint everything on the next draw
+        self.renderer.invalidate_frame()
+
+
+    def run_ticks(self, count, progress=None, progress_interval=0.25):
+        """
+        Runs `count` simulation steps back to back, without drawing. `progress(done)` is
+        called about every `progress_interval` seconds. Returns the elapsed time in seconds.
+        """
+        start = time.perf_counter()
+        next_report = start + progress_interval
+        for done in range(1, count + 1):
+            self.update()
+            if progress is not None:
+                now = time.perf_counter()
+                if now >= next_report:
+                    progress(done)
+                    next_report = now + progress_interval
+        return time.perf_counter() - start
 
     def update(self):
         """Runs one simulation step."""
-        # 1. Reset processed flags for all elements
-        self.grid.reset_processed_flags()
-
-        # 2. Iterate and update elements
-        update_order = list(range(self.grid.height - 1, -1, -1)) # Default: bottom-up
-
-        # Simple check: if 'a' (AntiGravityPowder) is loaded, alternate directions
-        if 'a' in element_manager.get_registry():
-             if int(time.time()) % 2 == 0:
-                  update_order = list(range(self.grid.height)) # Top-down
-
-        for y in update_order:
-            x_indices = list(range(self.grid.width))
-            random.shuffle(x_indices)
-            for x in x_indices:
-                element = self.grid.get_element(y, x)
-                if element and not element.processed and element.y == y and element.x == x:
-                    try:
-                        element.update(self.grid)
-                    except Exception as e:
-                        raise RuntimeError(f"Error updating element {element.key} at ({x},{y}): {e}") from e
+        self.simulation.update()
+        if self.timeline is not None and self.timeline.recording:
+            self.timeline.record(self.grid, self.simulation.tick_count)
+        interval = self.keyframe_interval
+        if interval and self.simulation.tick_count % interval == 0:
+            tick = self.simulation.tick_count
+            self.history.add_keyframe(self.snapshots.capture(self.grid), f"tick {tick}")
+
+    def is_idle(self):
+        """True if nothing on screen changes unless a key is pressed (see idle_wakeup_delay)."""
+        return self.paused or self.simulation.is_idle()
+
+    def idle_wakeup_delay(self):
+        """
+        Seconds after which an idle screen still needs redrawing (a message expires or
+        flashing cells blink), or None if it can wait for input indefinitely.
+        """
+        delays = []
+        message_delay = self.messages.time_remaining()
+        if message_delay is not None:
+            delays.append(message_delay)
+        if self.renderer.has_animated_cells():
+            delays.append(self.renderer.time_to_flash_change())
+        return min(delays) if delays else None
 
     def _get_selected_element_class(self):
         """Gets the class of the currently selected element."""
@@ -122,7 +183,7 @@ class Game:
         """Calculates the maximum height available for the element list display."""
         # Needs to account for controls height, title, status lines, and the reserved bottom line
         # Estimate controls height (can be dynamic later if needed)
-        controls_height = 10 # Approximate number of lines for controls section
+        controls_height = 11 # Approximate number of lines for controls section
         title_height = 1
         status_height = 4 # Approximate lines for status + tags + border
         reserved_bottom_line = 1
@@ -145,10 +206,44 @@ class Game:
         self.element_scroll_offset = max(0, min(self.element_scroll_offset, max_offset))
 
 
+    def feed_key(self, key):
+        """
+        Handles one of the keys read this frame, batching them: movement keys are
+        summed into one displacement, and repeated place/delete keys at the same
+        cursor position are applied once. Call finish_input() after the last key.
+        """
+        move = _MOVE_KEYS.get(key)
+        if move is not None:
+            self._pending_dy += move[0]
+            self._pending_dx += move[1]
+            return True
+        action = _ACTION_KEYS.get(key)
+        self._apply_pending_move()
+        if action is not None and action == self._last_action:
+            return True # Same action at the same place, already applied this frame
+        handled = self.handle_input(key)
+        self._last_action = action
+        return handled
+
+    def finish_input(self):
+        """Applies the movement batched by feed_key() and ends the input frame."""
+        self._apply_pending_move()
+        self._last_action = None
+
+    def _apply_pending_move(self):
+        """Moves the cursor by the summed displacement, clamped to the grid."""
+        if self._pending_dy or self._pending_dx:
+            self.cursor_y = max(0, min(self.grid.height - 1, self.cursor_y + self._pending_dy))
+            self.cursor_x = max(0, min(self.grid.width - 1, self.cursor_x + self._pending_dx))
+            self._pending_dy = self._pending_dx = 0
+            self._last_action = None # New position: the next place/delete applies again
+
     def handle_input(self, key):
         """Processes user input. Returns True if input was handled, False otherwise."""
         if self.command_mode:
             return False # Let main loop handle command input
+        if self.recorder is not None:
+            self.recorder.record_key(self, key)
 
         list_max_height_recalc = self._get_list_max_height()
         total_elements = len(self.placeable_elements_keys) if self.placeable_elements_keys else 0
@@ -177,12 +272,12 @@ class Game:
                     element_key = getattr(element_class, 'key', None)
                     if element_key is None: element_key = element_class(0,0).key
                     if element_key:
-                        self._apply_cursor_action(lambda y, x: self.grid.create_element(element_key, y, x, tags=self.current_tags))
+                        self._apply_cursor_action(lambda y, x: self.grid.create_element(element_key, y, x, tags=self.current_tags), "place")
                  except Exception: pass
                  return True
             return False # No element selected
         elif key == curses.KEY_DC or key == ord('x'): # Delete element
-             self._apply_cursor_action(lambda y, x: None)
+             self._apply_cursor_action(lambda y, x: None, "delete")
              return True
         elif ord('1') <= key <= ord('9'):
             if total_elements > 0:
@@ -210,75 +305,135 @@ class Game:
             self.element_scroll_offset = max(0, self.element_scroll_offset)
             return True
         elif key == ord('c') or key == ord('C'):
-            self.grid.clear()
+            self.clear_grid()
+            return True
+        elif key == ord('u') or key == ord('U'):
+            self.undo()
+            return True
+        elif key == ord('r') or key == ord('R'):
+            self.redo()
             return True
         elif key == ord('/'):
             self.command_mode = True
+            self.command_line.start()
             return True
 
         return False
 
 
-    def _apply_cursor_action(self, action_func):
-        """Helper to apply an action within the cursor area."""
+    def _apply_cursor_action(self, action_func, label):
+        """Helper to apply an action within the cursor area (recorded for undo as `label`)."""
         half_size = (self.cursor_size - 1) // 2
         start_cx = self.cursor_x - half_size
         start_cy = self.cursor_y - half_size
         end_cx = start_cx + self.cursor_size
         end_cy = start_cy + self.cursor_size
 
+        grid = self.grid
+        edit = self.history.stroke(label, grid)
         for cy in range(start_cy, end_cy):
             for cx in range(start_cx, end_cx):
                 # Check against grid boundaries, not screen boundaries
-                if self.grid.is_valid(cy, cx):
+                if grid.is_valid(cy, cx):
                     element_to_set = action_func(cy, cx)
-                    self.grid.set_element(cy, cx, element_to_set)
+                    edit.record(cy, cx, grid.get_element(cy, cx), element_to_set)
+                    grid.set_element(cy, cx, element_to_set)
+
+    def clear_grid(self):
+        """Empties the grid as one undoable edit."""
+        grid = self.grid
+        edit = self.history.begin("clear", grid)
+        for y in range(grid.height):
+            for x, element in enumerate(grid.get_row(y)):
+                if element is not None:
+                    edit.record(y, x, element, None)
+        grid.clear()
+        self.history.commit(edit)
+
+    def undo(self):
+        """Reverts the last recorded edit (or keyframe). Returns False if there is none."""
+        label = self.history.undo(self.grid, self.snapshots)
+        if label is None:
+            self.messages.post("没有可撤销的操作.")
+            return False
+        self.messages.post(f"已撤销: {label} (剩余 {len(self.history)} 步)")
+        return True
+
+    def redo(self):
+        """Re-applies the last undone edit. Returns False if there is none."""
+        label = self.history.redo(self.grid, self.snapshots)
+        if label is None:
+            self.messages.post("没有可重做的操作.")
+            return False
+        self.messages.post(f"已重做: {label}")
+        return True
+
+    def stop_recording(self):
+        """Finishes the input log being recorded, if any. Returns its Recorder, or None."""
+        recorder = self.recorder
+        if recorder is not None:
+            self.recorder = None
+            recorder.stop(self)
+        return recorder
+
+    def close_timeline(self):
+        """Stops recording and closes the timeline file, if any."""
+        if self.timeline is not None:
+            self.timeline.close()
+            self.timeline = None
+
+    @property
+    def tick_rate(self):
+        """Simulation steps per second."""
+        return self.scheduler.tick_rate
+
+    @property
+    def render_rate(self):
+        """Drawn frames per second."""
+        return self.scheduler.render_rate
+
+    def set_tick_rate(self, new_rate):
+        """Sets the simulation rate (ticks per second) without changing the render rate."""
+        self.scheduler.set_tick_rate(new_rate)
+
+    def set_render_rate(self, new_rate):
+        """Sets the render rate (frames per second) without changing the simulation rate."""
+        self.scheduler.set_render_rate(new_rate)
 
     def set_target_fps(self, new_fps):
-        """Sets the target FPS for the simulation."""
-        self.target_fps = max(1.0, new_fps)
+        """Sets both the simulation rate and the render rate."""
+        self.set_tick_rate(new_fps)
+        self.set_render_rate(new_fps)
 
 
     def draw(self, stdscr):
         """Draws the entire game screen (grid, cursor, info panel)."""
+        snapshot = self.capture_frame()
+        if snapshot is not None:
+            self.draw_frame(stdscr, snapshot)
+
+    def capture_frame(self):
+        """
+        Captures what the next frame shows as a FrameSnapshot (plain chars and
+        attributes, no element objects). Returns None if there is nothing to draw.
+        """
         # Check if screen dimensions are valid before drawing anything
         if self.height <= 0 or self.width <= 0:
-            return
+            return None
         screen_h = self.height
         screen_w = self.width
         # Reserve the last line for commands/messages
         drawable_screen_h = screen_h - 1
 
-        try:
-            stdscr.erase()
-        except curses.error:
-             return # Ignore error if terminal too small
-
-        curses.curs_set(0) # Hide physical cursor
-
-        # --- Draw Game Grid ---
-        # Draw only within the game grid area, up to drawable_screen_h
-        for r in range(min(self.game_height, drawable_screen_h)):
-            for c in range(self.game_width):
-                # Additional check against overall screen width just in case
-                if c >= screen_w: continue
-                element = self.grid.get_element(r, c)
-                try:
-                    if element:
-                        char, color_pair_idx = element.get_drawing_info()
-                        attr = curses.A_NORMAL
-                        if "bold" in element.tags: attr |= curses.A_BOLD
-                        if "flash" in element.tags and int(time.time() * 2) % 2 == 0: attr |= curses.A_BLINK
-                        color_attr = curses.color_pair(color_pair_idx) | attr
-                    else:
-                        char = EMPTY_CHAR
-                        color_attr = curses.color_pair(DEFAULT_COLOR_PAIR_INDEX)
-                    stdscr.addch(r, c, char, color_attr)
-                except curses.error:
-                    pass # Ignore errors at screen edges
+        # Draw only within the game grid area, up to drawable_screen_h and the screen width
+        grid_rows = min(self.game_height, drawable_screen_h)
+        grid_cols = min(self.game_width, screen_w)
+        chars_rows, attrs_rows = self.renderer.capture_grid(self.grid, grid_rows, grid_cols)
 
-        # --- Draw Game Cursor ---
+        # --- Game Cursor ---
+        cursor_cells = []
         if not self.command_mode:
+            flash_on = self.renderer.flash_phase()
             half_size = (self.cursor_size - 1) // 2
             start_cy = self.cursor_y - half_size
             start_cx = self.cursor_x - half_size
@@ -289,26 +444,89 @@ class Game:
                 for cx in range(start_cx, end_cx):
                     # Ensure cursor is within grid bounds AND drawable screen height
                     if self.grid.is_valid(cy, cx) and cy < drawable_screen_h and cx < screen_w:
-                        try:
-                            element = self.grid.get_element(cy, cx)
-                            if element:
-                                char, color_pair_idx = element.get_drawing_info()
-                                color_attr = curses.color_pair(color_pair_idx)
-                                # Apply tag attributes if any for cursor preview
-                                if "bold" in element.tags: color_attr |= curses.A_BOLD
-                                if "flash" in element.tags and int(time.time() * 2) % 2 == 0: color_attr |= curses.A_BLINK
-                            else:
-                                char = EMPTY_CHAR
-                                color_attr = curses.color_pair(DEFAULT_COLOR_PAIR_INDEX)
-                            # Apply reverse attribute for cursor highlight
-                            stdscr.addch(cy, cx, char, color_attr | curses.A_REVERSE)
-                        except curses.error:
-                            pass # Ignore edge errors
+                        # Same char/attributes as the grid (including tags), highlighted
+                        char, color_attr = self.renderer.cell_info(self.grid.get_element(cy, cx), flash_on)
+                        cursor_cells.append((cy, cx, char, color_attr | curses.A_REVERSE))
+
+        # Inputs of the info panel; it is only redrawn when they change
+        panel_key = (self.selected_index, self.element_scroll_offset, self.cursor_x, self.cursor_y,
+                     self.cursor_size, self.tick_rate, self.render_rate, self.paused, tuple(self.current_tags), len(self.placeable_elements_keys))
+        # Bottom line: the command being typed, else the current message
+        if self.command_mode:
+            status_line = self.command_line.display()
+        else:
+            status_line = (self.messages.current() or "", None)
+        return FrameSnapshot(screen_h, screen_w, chars_rows, attrs_rows, tuple(cursor_cells), panel_key, status_line)
+
+    def draw_frame(self, stdscr, snapshot):
+        """Draws a captured frame; may run on the render thread (see render_thread.py)."""
+        screen_h = snapshot.screen_h
+        screen_w = snapshot.screen_w
+        if (screen_h, screen_w) != (self.height, self.width):
+            return # Captured before a resize; the next frame has the new layout
+        drawable_screen_h = screen_h - 1
+        chars_rows = snapshot.chars_rows
+        grid_cols = len(chars_rows[0]) if chars_rows else 0
+
+        # Only changed cells are repainted; the screen is erased only for a full repaint
+        full_redraw = self.renderer.begin_frame(screen_h, screen_w, len(chars_rows), grid_cols)
+        if full_redraw:
+            try:
+                stdscr.erase()
+            except curses.error:
+                 return # Ignore error if terminal too small
+
+        # --- Draw Game Grid ---
+        self.renderer.draw_rows(stdscr, chars_rows, snapshot.attrs_rows)
+
+        # --- Draw Game Cursor ---
+        for cy, cx, char, attr in snapshot.cursor_cells:
+            try:
+                stdscr.addch(cy, cx, char, attr)
+            except curses.error:
+                pass # Ignore edge errors
+            # Restore the plain cell once the cursor has moved away
+            self.renderer.mark_dirty(cy, cx)
+        self.renderer.end_frame()
 
         # --- Draw Info Panel ---
-        if self.info_width <= 0:
-             return # No space for info panel
+        # Only redraw the panel when something it shows has changed
+        if self.info_width > 0 and (full_redraw or snapshot.panel_key != self._info_panel_key):
+            self._info_panel_key = snapshot.panel_key
+            self._draw_info_panel(stdscr, screen_w, drawable_screen_h)
+
+        # --- Draw Status Line ---
+        self._draw_status_line(stdscr, screen_w, drawable_screen_h, snapshot.status_line, full_redraw)
 
+    def draw_status(self, stdscr, text):
+        """Shows text on the bottom line right away (e.g. progress while the loop is busy)."""
+        if self.height <= 0 or self.width <= 0:
+            return
+        self._draw_status_line(stdscr, self.width, self.height - 1, (text, None), False)
+        try:
+            stdscr.refresh()
+        except curses.error:
+            pass
+
+    def _draw_status_line(self, stdscr, screen_w, line, status_line, full_redraw):
+        """Draws the bottom line (command input or message) and places the terminal cursor."""
+        text, cursor_col = status_line
+        try:
+            if full_redraw or status_line != self._status_line:
+                self._status_line = status_line
+                stdscr.move(line, 0)
+                stdscr.clrtoeol()
+                if text:
+                    stdscr.addstr(line, 0, text[:screen_w - 1]) # Truncated to the screen width
+            # Physical cursor only inside the command line (curs_set is a no-op if unchanged)
+            curses.curs_set(0 if cursor_col is None else 1)
+            if cursor_col is not None:
+                stdscr.move(line, min(cursor_col, screen_w - 1))
+        except curses.error:
+            pass # Ignore errors if screen size is weird
+
+    def _draw_info_panel(self, stdscr, screen_w, drawable_screen_h):
+        """Draws the info panel (controls, element list, status) right of the grid."""
         info_col_start = self.game_width + 1
 
         # Helper to print lines in the info panel, respecting drawable height
@@ -322,6 +540,10 @@ class Game:
                     except curses.error:
                         pass
 
+        # Blank the panel first: without a full-screen erase, old lines would stay visible
+        for r in range(drawable_screen_h):
+            print_info(r, "")
+
         # --- Panel Content ---
         row = 0
         # Draw controls, check row against drawable_screen_h
@@ -335,6 +557,7 @@ class Game:
             ("+ / -: 循环选择", curses.A_NORMAL),
             ("PgUp/Dn: 列表滚动", curses.A_NORMAL),
             ("C:     清空", curses.A_NORMAL),
+            ("U / R: 撤销/重做", curses.A_NORMAL),
             ("/:     命令模式", curses.A_NORMAL),
             ("Q:     退出", curses.A_NORMAL),
         ]
@@ -428,7 +651,8 @@ class Game:
         if row >= drawable_screen_h : return
 
         # Cursor info
-        print_info(row, f"光标:({self.cursor_x},{self.cursor_y}) 大小:{self.cursor_size} FPS:{self.target_fps:.1f}")
+        rate_text = "已暂停" if self.paused else f"TPS:{self.tick_rate:.0f}"
+        print_info(row, f"光标:({self.cursor_x},{self.cursor_y}) 大小:{self.cursor_size} {rate_text} FPS:{self.render_rate:.0f}")
         row += 1
         if row >= drawable_screen_h : return
 
@@ -1,16 +1,34 @@
 # -*- coding: utf-8 -*-
+import itertools
+
+from .elements.base import Element, FrameClock
+from .rng import FastRandom
+from .config import CHUNK_SIZE, CHUNK_SLEEP_TICKS
+
+# Monotonic stamps for chunk changes, shared by all grids (see flush_changes)
+_change_stamps = itertools.count(1)
 
 class Grid:
     """Encapsulates the simulation grid and provides safe access methods."""
 
+    # Random source for element code (random module API plus coin()). The owning
+    # Simulation replaces it with its seeded SimulationRandom (see rng.py).
+    rng = FastRandom()
+
     def __init__(self, height, width, element_manager_instance):
         if height <= 0 or width <= 0:
             raise ValueError("Grid dimensions must be positive")
         self._height = height
         self._width = width
-        # Initialize grid with None (representing empty cells)
-        self._grid = [[None for _ in range(width)] for _ in range(height)]
         self._element_manager = element_manager_instance # Store the manager instance
+        self._clock = FrameClock() # Frame epoch of this grid, shared by the elements placed on it
+        # Active-chunk scheduling: the grid is split into CHUNK_SIZE x CHUNK_SIZE chunks
+        self._chunk_size = CHUNK_SIZE
+        self._chunk_rows = (height + CHUNK_SIZE - 1) // CHUNK_SIZE
+        self._chunk_cols = (width + CHUNK_SIZE - 1) // CHUNK_SIZE
+        self._build_axis_maps()
+        # Initialize grid with None (representing empty cells)
+        self.clear()
 
     # Remove set_registry, pass manager in constructor
 
@@ -28,6 +46,8 @@ class Grid:
             try:
                 # Create the new element instance, passing coordinates
                 new_element = element_class(y, x)
+                # Attach the grid's clock now, so 'processed' can be set before placement
+                new_element.frame_clock = self._clock
                 # Apply tags if provided
                 if tags is not None:
                     # Ensure tags is a list copy, not a reference
@@ -59,6 +79,10 @@ class Grid:
             return self._grid[y][x]
         return None
 
+    def get_row(self, y):
+        """Returns the elements of row y as a list (None = empty). Callers must not modify it."""
+        return self._grid[y]
+
     def set_element(self, y, x, element):
         """
         Sets the element object at (y, x).
@@ -68,34 +92,351 @@ class Grid:
         Returns True if successful, False otherwise (e.g., out of bounds).
         """
         if self.is_valid(y, x):
-            # Get current element before overwriting
-            # old_element = self._grid[y][x]
-            # Optional: Cleanup logic if needed when an element is overwritten
-            # if old_element and old_element != element:
-            #     pass # e.g., old_element.cleanup()
+            row = self._grid[y]
+            # Wake the chunk (and track always-active elements) before overwriting
+            self._note_change(y, x, row[x], element)
 
             # If placing an element (not None), update its coordinates
             if element:
                 element.y = y
                 element.x = x
-            self._grid[y][x] = element
+                element.frame_clock = self._clock
+            row[x] = element
             return True
         return False
 
+    def swap_elements(self, ya, xa, yb, xb):
+        """
+        Swaps the contents of cells (ya, xa) and (yb, xb) (either may be empty) and updates
+        the coordinates of the moved elements. Same effect as two set_element() calls, but
+        a swap inside one chunk, away from its borders, marks that chunk dirty only once.
+        Returns True if successful, False otherwise (e.g., out of bounds).
+        """
+        height = self._height
+        width = self._width
+        if not (0 <= ya < height and 0 <= xa < width and 0 <= yb < height and 0 <= xb < width):
+            return False
+        row_a = self._grid[ya]
+        row_b = self._grid[yb]
+        element_a = row_a[xa]
+        element_b = row_b[xb]
+        index = self._row_chunk[ya] + self._col_chunk[xa]
+        if (index == self._row_chunk[yb] + self._col_chunk[xb]
+                and not (self._row_border[ya] or self._col_border[xa]
+                         or self._row_border[yb] or self._col_border[xb])):
+            # Per-chunk counts are unchanged when both cells share the chunk
+            self._chunk_dirty[index] = 1
+        else:
+            self._note_change(ya, xa, element_a, element_b)
+            self._note_change(yb, xb, element_b, element_a)
+        row_a[xa] = element_b
+        row_b[xb] = element_a
+        if element_a:
+            element_a.y, element_a.x = yb, xb
+        if element_b:
+            element_b.y, element_b.x = ya, xa
+        return True
+
+    def set_span(self, y, x_start, elements):
+        """
+        Sets a run of cells of row y, from x_start on, to `elements` (None = empty).
+        Same effect as set_element() per cell, but the chunks are woken once per span.
+        The run must lie inside the grid. Returns the replaced elements as a list.
+        """
+        if not elements:
+            return []
+        x_end = x_start + len(elements)
+        row = self._grid[y]
+        replaced = row[x_start:x_end]
+        self._note_span(y, x_start, x_end, replaced, elements)
+        clock = self._clock
+        for x, element in enumerate(elements, x_start):
+            if element:
+                element.y = y
+                element.x = x
+                element.frame_clock = clock
+        row[x_start:x_end] = elements
+        return replaced
+
+    def _note_span(self, y, x_start, x_end, old_elements, new_elements):
+        """Like _note_change() for every cell of a row run, marking each touched chunk only once."""
+        if x_end - x_start == 1:
+            self._note_change(y, x_start, old_elements[0], new_elements[0])
+            return
+        # The end cells wake their neighbours across chunk borders (diagonals included);
+        # chunks next to inner cells are covered by the run itself and the rows next to it
+        self._note_change(y, x_start, old_elements[0], None)
+        self._note_change(y, x_end - 1, old_elements[-1], None)
+        size = self._chunk_size
+        cols = self._chunk_cols
+        cy, ry = divmod(y, size)
+        chunk_rows = [cy]
+        if ry == 0 and cy > 0:
+            chunk_rows.append(cy - 1)
+        if ry == size - 1 and cy + 1 < self._chunk_rows:
+            chunk_rows.append(cy + 1)
+        for chunk_row in chunk_rows:
+            base = chunk_row * cols
+            self._chunk_dirty[base + x_start // size:base + (x_end - 1) // size + 1] = (
+                b'\x01' * ((x_end - 1) // size - x_start // size + 1))
+        # Always-active counts (the end cells were counted as cleared above)
+        active = self._chunk_active
+        base = cy * cols
+        for x, old_element in zip(range(x_start + 1, x_end - 1), old_elements[1:-1]):
+            if old_element is not None and old_element.always_active:
+                active[base + x // size] -= 1
+        for x, new_element in enumerate(new_elements, x_start):
+            if new_element is not None and new_element.always_active:
+                active[base + x // size] += 1
+
+    def find_region(self, y, x, max_cells=None, bounds=None):
+        """
+        Scanline flood fill search: finds the cells connected to (y, x) through their
+        four neighbours that hold the same element type as (y, x) (or are empty, like it).
+        Whole runs of a row are taken at once; a bytearray per visited row marks the
+        matching cells not taken yet.
+
+        `bounds` = (y_start, y_end, x_start, x_end), end exclusive, limits the search.
+        Returns the region as a list of (y, x_start, x_end) row runs, or None if it has
+        more than `max_cells` cells (the search stops there).
+        """
+        y_start, y_end, x_start, x_end = bounds if bounds else (0, self._height, 0, self._width)
+        y_start, y_end = max(0, y_start), min(self._height, y_end)
+        x_start, x_end = max(0, x_start), min(self._width, x_end)
+        if not (y_start <= y < y_end and x_start <= x < x_end):
+            return []
+        target = self.get_element(y, x)
+        masks = {} # Row -> bytearray over [x_start, x_end): 1 = matching and not taken yet
+        masks[y] = self._match_row(y, x_start, x_end, target)
+        spans = []
+        count = 0
+        seeds = [(y, x - x_start)]
+        while seeds:
+            sy, sx = seeds.pop()
+            mask = masks[sy]
+            if not mask[sx]:
+                continue # Taken by an earlier run
+            # Widen the seed to its whole run and take it
+            left = mask.rfind(0, 0, sx) + 1
+            right = mask.find(0, sx)
+            if right < 0:
+                right = len(mask)
+            mask[left:right] = bytes(right - left)
+            spans.append((sy, left + x_start, right + x_start))
+            count += right - left
+            if max_cells is not None and count > max_cells:
+                return None
+            # One seed per matching run above and below
+            for ny in (sy - 1, sy + 1):
+                if not y_start <= ny < y_end:
+                    continue
+                neighbour = masks.get(ny)
+                if neighbour is None:
+                    neighbour = masks[ny] = self._match_row(ny, x_start, x_end, target)
+                position = neighbour.find(1, left, right)
+                while position >= 0:
+                    seeds.append((ny, position))
+                    position = neighbour.find(0, position, right)
+                    if position < 0:
+                        break
+                    position = neighbour.find(1, position, right)
+        return spans
+
+    def _match_row(self, y, x_start, x_end, target):
+        """Returns a bytearray over [x_start, x_end) of row y: 1 where the cell holds the type of `target` (None = empty)."""
+        cells = self._grid[y][x_start:x_end]
+        if target is None:
+            return bytearray(element is None for element in cells)
+        key = target.key
+        return bytearray(element is not None and element.key == key for element in cells)
+
     def clear(self):
         """Clears the entire grid, setting all cells to None."""
         # Optional: Add cleanup logic for removed elements if necessary
         # for element in self.get_all_elements():
         #     element.cleanup() # If elements need explicit cleanup
         self._grid = [[None for _ in range(self.width)] for _ in range(self.height)]
+        self._reset_chunks()
+
+    # --- Active-chunk scheduling ---
+
+    @property
+    def chunk_size(self):
+        return self._chunk_size
+
+    def _reset_chunks(self):
+        """Resets chunk bookkeeping. Every chunk starts asleep (the grid is empty)."""
+        chunk_count = self._chunk_rows * self._chunk_cols
+        self._chunk_dirty = bytearray(chunk_count) # Chunks changed since the last end_tick()
+        # Chunks changed since the last end_tick() whose change was already stamped (see flush_changes)
+        self._chunk_flushed = bytearray(chunk_count)
+        self._chunk_idle = [CHUNK_SLEEP_TICKS] * chunk_count # Ticks since each chunk last changed
+        self._chunk_active = [0] * chunk_count # Number of 'always_active' elements per chunk
+        # Stamp of the last tick in which each chunk changed or was simulated (or of the reset)
+        self._chunk_stamp = [next(_change_stamps)] * chunk_count
+
+    def _build_axis_maps(self):
+        """
+        Precomputes, per row and per column, the chunk offset and whether it lies on a
+        chunk border, so _note_change() needs no divmod for the common interior cell.
+        """
+        size = self._chunk_size
+        cols = self._chunk_cols
+        self._row_chunk = [(y // size) * cols for y in range(self._height)]
+        self._col_chunk = [x // size for x in range(self._width)]
+        self._row_border = bytes(y % size in (0, size - 1) for y in range(self._height))
+        self._col_border = bytes(x % size in (0, size - 1) for x in range(self._width))
+
+    def _note_change(self, y, x, old_element, new_element):
+        """
+        Records a cell change at (y, x): marks its chunk dirty (awake next tick) and keeps
+        the per-chunk count of always-active elements up to date. A change on the border
+        of a chunk also wakes the neighbouring chunk(s) across that border.
+        """
+        index = self._row_chunk[y] + self._col_chunk[x]
+        self._chunk_dirty[index] = 1
+        if old_element is not None and old_element.always_active:
+            self._chunk_active[index] -= 1
+        if new_element is not None and new_element.always_active:
+            self._chunk_active[index] += 1
+
+        if self._row_border[y] or self._col_border[x]:
+            size = self._chunk_size
+            cy, ry = divmod(y, size)
+            cx, rx = divmod(x, size)
+            dys = (-1, 0) if ry == 0 else ((0, 1) if ry == size - 1 else (0,))
+            dxs = (-1, 0) if rx == 0 else ((0, 1) if rx == size - 1 else (0,))
+            for dy in dys:
+                ny = cy + dy
+                if 0 <= ny < self._chunk_rows:
+                    for dx in dxs:
+                        nx = cx + dx
+                        if 0 <= nx < self._chunk_cols:
+                            self._chunk_dirty[ny * self._chunk_cols + nx] = 1
+
+    def wake_all(self):
+        """Marks every chunk awake, e.g. after bulk changes that bypass set_element."""
+        self._chunk_dirty = bytearray(b'\x01' * len(self._chunk_dirty))
+
+    def is_chunk_awake(self, chunk_index):
+        """A chunk is awake if it changed recently or holds elements that act on their own."""
+        return (self._chunk_idle[chunk_index] < CHUNK_SLEEP_TICKS
+                or self._chunk_dirty[chunk_index]
+                or self._chunk_flushed[chunk_index]
+                or self._chunk_active[chunk_index] > 0)
+
+    def begin_tick(self):
+        """
+        Starts a simulation tick. Returns, for each chunk row, the list of x indices that
+        belong to awake chunks (an empty list if the whole chunk row is asleep).
+        """
+        size = self._chunk_size
+        cols = self._chunk_cols
+        active_columns = []
+        for cy in range(self._chunk_rows):
+            columns = []
+            base = cy * cols
+            for cx in range(cols):
+                if self.is_chunk_awake(base + cx):
+                    columns.extend(range(cx * size, min(self._width, (cx + 1) * size)))
+            active_columns.append(columns)
+        return active_columns
+
+    def end_tick(self):
+        """
+        Finishes a simulation tick: chunks without changes move one tick closer to sleep.
+        Chunks that changed or were simulated get this tick's change stamp, since their
+        elements may also have changed their own state in place.
+        """
+        idle = self._chunk_idle
+        dirty = self._chunk_dirty
+        flushed = self._chunk_flushed
+        stamps = self._chunk_stamp
+        stamp = next(_change_stamps)
+        for index in range(len(idle)):
+            if dirty[index]:
+                idle[index] = 0
+                stamps[index] = stamp
+            elif flushed[index]:
+                idle[index] = 0 # Changed this tick before a flush_changes()
+                stamps[index] = stamp
+            elif idle[index] < CHUNK_SLEEP_TICKS:
+                idle[index] += 1
+                stamps[index] = stamp
+        self._chunk_dirty = bytearray(len(dirty))
+        self._chunk_flushed = bytearray(len(dirty))
+
+    def is_quiescent(self):
+        """True if every chunk is asleep: a tick would neither visit nor change any cell."""
+        return (not any(self._chunk_dirty)
+                and not any(self._chunk_flushed)
+                and not any(self._chunk_active)
+                and min(self._chunk_idle, default=CHUNK_SLEEP_TICKS) >= CHUNK_SLEEP_TICKS)
+
+    @property
+    def chunk_cols(self):
+        return self._chunk_cols
+
+    @property
+    def chunk_count(self):
+        return self._chunk_rows * self._chunk_cols
+
+    def chunk_bounds(self, chunk_index):
+        """Returns (y_start, y_end, x_start, x_end) of a chunk (end exclusive)."""
+        cy, cx = divmod(chunk_index, self._chunk_cols)
+        size = self._chunk_size
+        return (cy * size, min(self._height, (cy + 1) * size),
+                cx * size, min(self._width, (cx + 1) * size))
+
+    def flush_changes(self):
+        """
+        Stamps the chunk changes made since the last tick right away, and returns a
+        stamp later than every change so far. Lets chunk_unchanged_since() tell changes
+        made before this call apart from later ones within the same tick.
+        """
+        dirty = self._chunk_dirty
+        if any(dirty):
+            flushed = self._chunk_flushed
+            stamps = self._chunk_stamp
+            stamp = next(_change_stamps)
+            for index in range(len(dirty)):
+                if dirty[index]:
+                    flushed[index] = 1
+                    stamps[index] = stamp
+            self._chunk_dirty = bytearray(len(dirty))
+        return next(_change_stamps)
+
+    def chunk_unchanged_since(self, chunk_index, stamp):
+        """
+        True if the chunk's contents cannot have changed since flush_changes() returned
+        `stamp`: the chunk was neither changed nor simulated since, no change is pending,
+        and it holds no always-active element (those may change their own state at any tick).
+        """
+        return (self._chunk_stamp[chunk_index] < stamp
+                and not self._chunk_dirty[chunk_index]
+                and not self._chunk_active[chunk_index])
+
+    def get_awake_chunk_count(self):
+        """Returns the number of chunks that will be updated in the next tick."""
+        return sum(1 for index in range(len(self._chunk_idle)) if self.is_chunk_awake(index))
+
+    @property
+    def epoch(self):
+        """
+        The current frame epoch of this grid. An element is 'processed' when its
+        processed_epoch equals it. Each grid has its own clock, and epochs are unique
+        across all grids, so separate simulations never see each other's frames and
+        elements carried over into a new grid by resize or load never look processed.
+        """
+        return self._clock.epoch
+
+    def advance_epoch(self):
+        """Starts a new frame. Every element becomes unprocessed without visiting any cell."""
+        return self._clock.advance()
 
     def reset_processed_flags(self):
-        """Resets the 'processed' flag for all elements on the grid."""
-        for r in range(self._height):
-            for c in range(self._width):
-                element = self._grid[r][c]
-                if element:
-                    element.processed = False
+        """Resets the 'processed' flag for all elements on the grid (O(1), see advance_epoch)."""
+        self.advance_epoch()
 
     def get_all_elements(self):
         """Generator yielding all non-None elements in the grid."""
@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""
+Headless simulation runner: drives the grid and the element update loop without
+a terminal, then prints timing statistics.
+
+Usage:
+    python -m falling_sand_game.headless --size 400x200 --ticks 10000 --seed 1 --load scene.json
+    python -m falling_sand_game.headless --replay session.fsr
+    python -m falling_sand_game.headless --load scene.fsg --ticks 300 --compare-backends
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+
+from .config import ELEMENT_DIR, GRID_BACKEND
+from .element_manager import element_manager
+from .simulation import Simulation, GRID_BACKENDS
+from .savefile import save_grid, load_grid
+from .replay import ReplayPlayer, load_replay
+from .timeline import Timeline
+
+# With --compare-backends, count differences up to this many cells are noise (rare elements)
+COMPARE_MIN_CELLS = 10
+
+
+def parse_size(text):
+    """Parses a 'WIDTHxHEIGHT' string into (width, height)."""
+    try:
+        width, height = (int(part) for part in text.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size '{text}', expected WIDTHxHEIGHT (e.g. 400x200)")
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError(f"invalid size '{text}', width and height must be positive")
+    return width, height
+
+
+def build_parser():
+    """Creates the command line parser of the headless runner."""
+    parser = argparse.ArgumentParser(
+        prog="python -m falling_sand_game.headless",
+        description="Run the falling sand simulation without a terminal and report timing statistics.")
+    parser.add_argument("--size", type=parse_size, default=(200, 100), metavar="WxH",
+                        help="grid size as WIDTHxHEIGHT (default: 200x100; ignored with --load)")
+    parser.add_argument("--ticks", type=int, default=1000, help="number of simulation steps to run (default: 1000)")
+    parser.add_argument("--seed", type=int, default=None, help="random seed for a reproducible run")
+    parser.add_argument("--load", metavar="FILE", help="start from a saved scene (binary .fsg or JSON, as written by 'save')")
+    parser.add_argument("--save", metavar="FILE", help="save the final grid to FILE (JSON if FILE ends in .json, binary otherwise)")
+    parser.add_argument("--backend", choices=sorted(GRID_BACKENDS), default=GRID_BACKEND,
+                        help=f"grid storage backend (default: {GRID_BACKEND})")
+    parser.add_argument("--report-every", type=int, default=0, metavar="N",
+                        help="print progress every N ticks (default: only the final report)")
+    parser.add_argument("--timeline", metavar="FILE",
+                        help="record the run into a seekable timeline file (browse it in the game with 'timeline open')")
+    parser.add_argument("--overwrite", action="store_true",
+                        help="let --timeline replace an existing file")
+    parser.add_argument("--replay", metavar="FILE",
+                        help="play back a session recorded with the in-game 'record' command "
+                             "(grid, seed and backend come from the recording)")
+    parser.add_argument("--compare-backends", action="store_true",
+                        help="run the --load scene on every grid backend and compare the element counts "
+                             "(exit code 1 if they differ by more than --tolerance)")
+    parser.add_argument("--runs", type=int, default=3, metavar="N",
+                        help="with --compare-backends: runs per backend, seeded --seed, --seed+1, ... (default: 3)")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="with --compare-backends: allowed difference of the mean counts, "
+                             "as a fraction of the larger one (default: 0.15)")
+    return parser
+
+
+def format_stats(tick_times, total_time, simulation):
+    """Builds the final timing report lines."""
+    grid = simulation.grid
+    times_ms = sorted(t * 1000.0 for t in tick_times)
+    count = len(times_ms)
+    element_count = sum(1 for _ in grid.get_all_elements())
+    lines = [
+        f"Grid: {grid.width}x{grid.height} ({simulation.grid_class.__name__}), ticks: {count}, elements: {element_count}",
+        f"Total: {total_time:.3f} s, {count / total_time if total_time > 0 else 0.0:.1f} ticks/s",
+    ]
+    if count:
+        p95 = times_ms[min(count - 1, int(count * 0.95))]
+        lines.append(f"Tick ms: mean {statistics.fmean(times_ms):.3f}, median {statistics.median(times_ms):.3f}, "
+                     f"p95 {p95:.3f}, min {times_ms[0]:.3f}, max {times_ms[-1]:.3f}")
+    lines.append(f"Awake chunks at end: {grid.get_awake_chunk_count()}")
+    return lines
+
+
+def run(args):
+    """Runs a headless simulation with parsed arguments. Returns the process exit code."""
+    if args.ticks < 0:
+        print("Error: --ticks must not be negative.")
+        return 2
+
+    # Element modules are found relative to the project root, like in main()
+    if not element_manager.is_loaded:
+        element_manager.load_elements(ELEMENT_DIR)
+    if not element_manager.get_registry():
+        print(f"Error: No elements loaded from {ELEMENT_DIR}. Run from the project root directory.")
+        return 1
+
+    if args.replay:
+        return run_replay(args)
+    if args.compare_backends:
+        return run_compare(args)
+
+    width, height = args.size
+    simulation = Simulation(height, width, args.backend, args.seed)
+
+    if args.load:
+        if not os.path.exists(args.load):
+            print(f"Error: File '{args.load}' not found.")
+            return 1
+        try:
+            simulation.grid = load_grid(args.load, simulation.grid_class)
+        except (ValueError, OSError) as e:
+            print(f"Error: Could not load '{args.load}': {e}")
+            return 1
+
+    timeline = None
+    if args.timeline:
+        try:
+            timeline = Timeline(args.timeline, overwrite=args.overwrite)
+        except FileExistsError:
+            print(f"Error: '{args.timeline}' already exists (use --overwrite to replace it).")
+            return 1
+        except OSError as e:
+            print(f"Error: Could not create '{args.timeline}': {e}")
+            return 1
+        timeline.start(simulation.grid, simulation.tick_count)
+
+    tick_times = []
+    start = time.perf_counter()
+    try:
+        for tick in range(args.ticks):
+            tick_start = time.perf_counter()
+            simulation.update()
+            if timeline is not None:
+                timeline.record(simulation.grid, simulation.tick_count)
+            tick_times.append(time.perf_counter() - tick_start)
+            if args.report_every and (tick + 1) % args.report_every == 0:
+                recent = tick_times[-args.report_every:]
+                print(f"Tick {tick + 1}/{args.ticks}: {statistics.fmean(recent) * 1000.0:.3f} ms/tick")
+    except KeyboardInterrupt:
+        print(f"Interrupted after {len(tick_times)} ticks.")
+    finally:
+        if timeline is not None:
+            timeline.close()
+    total_time = time.perf_counter() - start
+
+    for line in format_stats(tick_times, total_time, simulation):
+        print(line)
+    if timeline is not None:
+        print(f"Timeline: '{args.timeline}', {timeline.keyframe_count} keyframes, {os.path.getsize(args.timeline) // 1024} KB.")
+
+    if args.save:
+        try:
+            save_grid(simulation.grid, args.save)
+            print(f"Saved final grid to '{args.save}'.")
+        except OSError as e:
+            print(f"Error: Could not save '{args.save}': {e}")
+            return 1
+    return 0
+
+
+def run_replay(args):
+    """Plays back a replay file at full speed and reports timing and whether the result matches."""
+    try:
+        player = ReplayPlayer(*load_replay(args.replay))
+    except OSError as e:
+        print(f"Error: Could not read '{args.replay}': {e}")
+        return 1
+    except (ValueError, KeyError, IndexError, TypeError) as e:
+        print(f"Error: Invalid replay file '{args.replay}': {e}")
+        return 1
+
+    print(f"Replaying {len(player.events)} inputs over {player.tick_count} ticks "
+          f"(seed {player.header['seed']}, from tick {player.header['tick']}).")
+    tick_times = []
+    try:
+        total_time = player.run(tick_times)
+    except KeyboardInterrupt:
+        print(f"Interrupted after {len(tick_times)} ticks.")
+        return 1
+
+    for line in format_stats(tick_times, total_time, player.game.simulation):
+        print(line)
+    matches = player.checksum_matches()
+    if matches is None:
+        print("Result: the recording has no end marker (session did not stop cleanly), nothing to compare.")
+    elif matches:
+        print("Result: final grid matches the recording.")
+    else:
+        print("Result: final grid DIFFERS from the recording.")
+
+    if args.save:
+        try:
+            save_grid(player.game.grid, args.save)
+            print(f"Saved final grid to '{args.save}'.")
+        except OSError as e:
+            print(f"Error: Could not save '{args.save}': {e}")
+            return 1
+    return 0 if matches is not False else 1
+
+
+def compare_counts(mean_counts, tolerance):
+    """
+    Compares mean element counts per backend ({backend: {key: mean count}}).
+    A key differs when its means are further apart than `tolerance` times the
+    larger mean (and more than COMPARE_MIN_CELLS). Returns the report lines and
+    the list of differing keys.
+    """
+    backends = sorted(mean_counts)
+    keys = sorted(set().union(*(counts.keys() for counts in mean_counts.values())))
+    lines = ["Key " + "".join(f"{backend:>10}" for backend in backends) + "      diff"]
+    differing = []
+    for key in keys:
+        means = [mean_counts[backend].get(key, 0.0) for backend in backends]
+        high = max(means)
+        spread = high - min(means)
+        differs = spread > max(tolerance * high, COMPARE_MIN_CELLS)
+        if differs:
+            differing.append(key)
+        lines.append(f"{key!r:>3} " + "".join(f"{mean:>10.1f}" for mean in means)
+                     + f"{spread / high if high else 0.0:>10.1%}" + ("  DIFFERS" if differs else ""))
+    return lines, differing
+
+
+def run_compare(args):
+    """Runs a scene on every grid backend and checks that the element counts agree."""
+    if not args.load:
+        print("Error: --compare-backends needs a scene (--load FILE).")
+        return 2
+    if args.runs <= 0 or args.tolerance < 0:
+        print("Error: --runs must be positive and --tolerance must not be negative.")
+        return 2
+    if not os.path.exists(args.load):
+        print(f"Error: File '{args.load}' not found.")
+        return 1
+
+    # The outcome of a single run is chaotic (one early ignition changes everything),
+    # so each backend is averaged over several seeds
+    base_seed = args.seed if args.seed is not None else 0
+    mean_counts = {}
+    try:
+        for backend in sorted(GRID_BACKENDS):
+            totals = Counter()
+            start = time.perf_counter()
+            for run_index in range(args.runs):
+                simulation = Simulation(1, 1, backend, base_seed + run_index)
+                try:
+                    simulation.grid = load_grid(args.load, simulation.grid_class)
+                except (ValueError, OSError) as e:
+                    print(f"Error: Could not load '{args.load}': {e}")
+                    return 1
+                for _ in range(args.ticks):
+                    simulation.update()
+                totals.update(element.key for element in simulation.grid.get_all_elements())
+            mean_counts[backend] = {key: count / args.runs for key, count in totals.items()}
+            print(f"{backend}: {args.runs} runs x {args.ticks} ticks in {time.perf_counter() - start:.2f} s")
+    except KeyboardInterrupt:
+        print("Interrupted.")
+        return 1
+
+    lines, differing = compare_counts(mean_counts, args.tolerance)
+    for line in lines:
+        print(line)
+    if differing:
+        print(f"Result: counts of {', '.join(repr(key) for key in differing)} differ by more than "
+              f"{args.tolerance:.0%} between backends.")
+        return 1
+    print(f"Result: all element counts agree within {args.tolerance:.0%}.")
+    return 0
+
+
+def main(argv=None):
+    """Entry point of 'python -m falling_sand_game.headless'."""
+    return run(build_parser().parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
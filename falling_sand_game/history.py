@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+import collections
+import time
+from array import array
+
+from .snapshot import build_element
+from .config import HISTORY_MEMORY_BUDGET, HISTORY_STROKE_GAP
+
+# Rough memory cost estimates (bytes) used for the history budget
+_ENTRY_OVERHEAD = 200 # Entry object, arrays and dict headers
+_CELL_COST = 8        # Position (4) plus before and after codes (2 each)
+_EXTRA_COST = 120     # A cell that carries tags or element state
+_CHUNK_REF_COST = 8   # One reference to a (possibly shared) snapshot chunk image
+
+_NO_EXTRA = ((), ()) # (tags, state) of a cell without either
+
+
+class CellEdit:
+    """
+    One undoable change made by the user: the cells it touched, each with its
+    contents before and after. Memory is proportional to the number of changed
+    cells, not to the grid.
+
+    While recording, cells are kept in a dict; finish() packs them into arrays of
+    cell positions and key codes, with tags and element state stored only for the
+    cells that have any.
+    """
+
+    def __init__(self, history, label, width):
+        self.label = label
+        self.size = 0 # Estimated bytes, set by finish()
+        self._history = history
+        self._cells = {} # (y, x) -> [before, after], each encoded by History.encode
+        self._width = width # Grid width, to pack positions
+        self._positions = None # array('I') of y * width + x
+        self._before = None    # array('H') of key codes, 0 = empty
+        self._after = None
+        self._before_extras = None # Index into the arrays -> (tags, state)
+        self._after_extras = None
+
+    def record(self, y, x, before, after):
+        """
+        Records that the cell at (y, x) went from element `before` to `after` (either
+        may be None). Recording the same cell again keeps its first 'before'.
+        """
+        encode = self._history.encode
+        cell = self._cells.get((y, x))
+        if cell is None:
+            self._cells[(y, x)] = [encode(before), encode(after)]
+        else:
+            cell[1] = encode(after)
+
+    def record_span(self, y, x_start, befores, afters):
+        """Records a run of cells of row y, from x_start on (see record())."""
+        encode = self._history.encode
+        cells = self._cells
+        for x, before, after in zip(range(x_start, x_start + len(afters)), befores, afters):
+            cell = cells.get((y, x))
+            if cell is None:
+                cells[(y, x)] = [encode(before), encode(after)]
+            else:
+                cell[1] = encode(after)
+
+    def finish(self):
+        """Packs the recorded cells (dropping unchanged ones). Returns the number of cells kept."""
+        width = self._width
+        positions = array('I')
+        before_codes = array('H')
+        after_codes = array('H')
+        before_extras = {}
+        after_extras = {}
+        for (y, x), (before, after) in self._cells.items():
+            if before == after:
+                continue
+            index = len(positions)
+            positions.append(y * width + x)
+            before_codes.append(before[0])
+            after_codes.append(after[0])
+            if before[1]:
+                before_extras[index] = before[1]
+            if after[1]:
+                after_extras[index] = after[1]
+        self._cells = None
+        self._positions = positions
+        self._before = before_codes
+        self._after = after_codes
+        self._before_extras = before_extras
+        self._after_extras = after_extras
+        self.size = (_ENTRY_OVERHEAD + _CELL_COST * len(positions)
+                     + _EXTRA_COST * (len(before_extras) + len(after_extras)))
+        return len(positions)
+
+    def apply(self, grid, snapshots, undo):
+        """Writes the 'before' (undo) or 'after' (redo) contents of every cell back to the grid."""
+        codes = self._before if undo else self._after
+        extras = self._before_extras if undo else self._after_extras
+        keys = self._history.keys
+        width = self._width
+        for index, position in enumerate(self._positions):
+            y, x = divmod(position, width)
+            if not grid.is_valid(y, x):
+                continue
+            code = codes[index]
+            if code == 0:
+                grid.set_element(y, x, None)
+            else:
+                tags, state = extras.get(index, _NO_EXTRA)
+                grid.set_element(y, x, build_element(grid, keys[code], y, x, tags, state))
+
+
+class Keyframe:
+    """
+    A checkpoint of the whole grid (a copy-on-write snapshot, see snapshot.py) taken
+    while the simulation runs. Undoing it rewinds the grid to the checkpoint; the
+    state it replaced is captured at that moment so redo can return to it.
+    """
+
+    def __init__(self, label, snapshot, size):
+        self.label = label
+        self.size = size
+        self._snapshot = snapshot
+        self._redo_snapshot = None
+
+    def apply(self, grid, snapshots, undo):
+        if undo:
+            self._redo_snapshot = snapshots.capture(grid)
+            snapshots.restore(self._snapshot, grid)
+        elif self._redo_snapshot is not None:
+            snapshots.restore(self._redo_snapshot, grid)
+            self._redo_snapshot = None
+
+
+class History:
+    """
+    Undo/redo ring buffer of CellEdit deltas (cursor strokes, fill, clear) and
+    optional simulation Keyframes.
+
+    The total estimated size of all entries is kept within `budget` bytes by
+    dropping the oldest entries. Consecutive cursor actions of the same kind less
+    than `stroke_gap` seconds apart are merged into one entry (a "stroke"), so
+    holding down Space while moving undoes in one step.
+    """
+
+    def __init__(self, budget=HISTORY_MEMORY_BUDGET, stroke_gap=HISTORY_STROKE_GAP, clock=time.monotonic):
+        self.budget = budget
+        self.stroke_gap = stroke_gap
+        self._clock = clock
+        self._undo = collections.deque() # Oldest first
+        self._redo = [] # Most recently undone last
+        self.memory_used = 0 # Estimated bytes of all undo and redo entries
+        self.keys = [None] # Code -> element key, code 0 = empty
+        self._key_codes = {}
+        self._stroke = None # Open CellEdit of the current cursor stroke
+        self._stroke_time = 0.0
+        self._last_keyframe = None # Snapshot of the newest keyframe (for size estimates)
+
+    def __len__(self):
+        return len(self._undo)
+
+    @property
+    def redo_count(self):
+        return len(self._redo)
+
+    def encode(self, element):
+        """Returns (key code, (tags, state) or None) for an element or None."""
+        if element is None:
+            return (0, None)
+        code = self._key_codes.get(element.key)
+        if code is None:
+            code = self._key_codes[element.key] = len(self.keys)
+            self.keys.append(element.key)
+        fields = element.state_fields
+        if element.tags or fields:
+            return (code, (tuple(element.tags), tuple(getattr(element, name) for name in fields)))
+        return (code, None)
+
+    def begin(self, label, grid):
+        """Starts recording an edit (ends any open stroke first). Pass it to commit() when done."""
+        self.end_stroke()
+        return CellEdit(self, label, grid.width)
+
+    def stroke(self, label, grid):
+        """
+        Returns the edit to record a cursor action into: the open stroke if it has the
+        same label and the previous action was recent enough, else a new stroke.
+        """
+        now = self._clock()
+        stroke = self._stroke
+        if stroke is None or stroke.label != label or now - self._stroke_time > self.stroke_gap:
+            self.end_stroke()
+            stroke = self._stroke = CellEdit(self, label, grid.width)
+        self._stroke_time = now
+        return stroke
+
+    def end_stroke(self):
+        """Commits the open cursor stroke, if any."""
+        if self._stroke is not None:
+            stroke = self._stroke
+            self._stroke = None
+            self.commit(stroke)
+
+    def commit(self, edit):
+        """Adds a recorded edit to the history. Returns False if it changed nothing."""
+        if not edit.finish():
+            return False
+        self._push(edit)
+        return True
+
+    def add_keyframe(self, snapshot, label):
+        """Adds a grid snapshot as a checkpoint that undo can rewind to."""
+        self.end_stroke()
+        # Only chunks not shared with the previous keyframe cost memory
+        previous = self._last_keyframe
+        size = _ENTRY_OVERHEAD + _CHUNK_REF_COST * len(snapshot.chunks)
+        for index, image in enumerate(snapshot.chunks):
+            if previous is None or len(previous.chunks) != len(snapshot.chunks) or previous.chunks[index] is not image:
+                size += 2 * len(image.codes) + _EXTRA_COST * len(image.extras)
+        self._last_keyframe = snapshot
+        self._push(Keyframe(label, snapshot, size))
+
+    def _push(self, entry):
+        """Adds an entry, drops the redo entries and evicts the oldest entries over budget."""
+        for undone in self._redo:
+            self.memory_used -= undone.size
+        self._redo.clear()
+        if entry.size > self.budget:
+            # Cannot be undone; older entries would no longer apply on top of it
+            self.clear()
+            return
+        self._undo.append(entry)
+        self.memory_used += entry.size
+        while self.memory_used > self.budget:
+            self.memory_used -= self._undo.popleft().size
+
+    def undo(self, grid, snapshots):
+        """Reverts the newest entry. Returns its label, or None if there is nothing to undo."""
+        self.end_stroke()
+        if not self._undo:
+            return None
+        entry = self._undo.pop()
+        entry.apply(grid, snapshots, undo=True)
+        self._redo.append(entry)
+        return entry.label
+
+    def redo(self, grid, snapshots):
+        """Re-applies the most recently undone entry. Returns its label, or None."""
+        self.end_stroke()
+        if not self._redo:
+            return None
+        entry = self._redo.pop()
+        entry.apply(grid, snapshots, undo=False)
+        self._undo.append(entry)
+        return entry.label
+
+    def clear(self):
+        """Forgets all entries (e.g. when the grid is replaced or resized)."""
+        self._stroke = None
+        self._undo.clear()
+        self._redo.clear()
+        self._last_keyframe = None
+        self.memory_used = 0
@@ -0,0 +1,551 @@
+# -*- coding: utf-8 -*-
+"""
+Batched movement kernels for the TypedGrid backend.
+
+Instead of calling update() on every element object, the kernels walk the flat
+type-code array of a TypedGrid and resolve movement with per-type lookup tables
+(density, powder/liquid/gas kind). They are still Python loops over single
+cells that move the element objects along, so they cost about as much as the
+update() calls they replace (see the README for measurements). Elements keep their run_interactions() hooks:
+Simulation.update calls those in its normal per-object pass, and the kernels
+move every element that is still unprocessed. The simulation runs them one row
+at a time inside that pass (gases of a row before its elements, since gases only
+interact when they could not move; powders and liquids after them), so the
+elements see the same processed neighbours as with the object backend.
+Each kernel can be limited to a row range and draws its random choices from
+the given generator.
+"""
+import random
+
+from .elements.base import Powder, Liquid, Gas
+
+# Movement kinds stored per type code
+KIND_EMPTY = 0
+KIND_POWDER = 1
+KIND_LIQUID = 2
+KIND_GAS = 3
+KIND_OTHER = 4 # Solids and anything else that never gets displaced
+KIND_DYNAMIC = 5 # Instances change their own kind/density; read from the object
+
+
+def kind_of(element):
+    """Returns the movement kind of an element instance (or class)."""
+    if element.is_powder:
+        return KIND_POWDER
+    if element.is_liquid:
+        return KIND_LIQUID
+    if element.is_gas:
+        return KIND_GAS
+    return KIND_OTHER
+
+
+class CodeTables:
+    """
+    Per-type-code lookup tables built from the ElementManager's interned classes.
+    Tables are rebuilt lazily whenever new type codes are interned.
+    """
+
+    def __init__(self, element_manager_instance):
+        self._element_manager = element_manager_instance
+        self._size = 0
+        self.kind = bytearray(1)
+        self.density = [0.0]
+        self.interacts = bytearray(1) # 1 if the class overrides run_interactions
+        self.batched = bytearray(1) # Kind of the kernel that moves this type (0 = moved by update())
+        self.flow_speed = bytearray(1) # Liquid.flow_speed per type
+        self.rise_speed = bytearray(1) # Gas.rise_speed per type
+        self.spread_factor = bytearray(1) # Gas.spread_factor per type
+        self.boundary_chance = [0.0] # Gas.boundary_dissipation_chance per type
+        self.max_rise_speed = 0 # Largest rise_speed of any batched gas
+        self.refresh()
+
+    def refresh(self):
+        """Rebuilds the tables if the number of interned type codes changed."""
+        classes = self._element_manager.code_classes
+        if len(classes) == self._size:
+            return
+        self._size = len(classes)
+        self.kind = bytearray(self._size)
+        self.density = [0.0] * self._size
+        self.interacts = bytearray(self._size)
+        self.batched = bytearray(self._size)
+        self.flow_speed = bytearray(self._size)
+        self.rise_speed = bytearray(self._size)
+        self.spread_factor = bytearray(self._size)
+        self.boundary_chance = [0.0] * self._size
+        self.max_rise_speed = 0
+
+        for code, element_class in enumerate(classes):
+            if element_class is None:
+                continue # Code 0: empty cell
+            if element_class.has_dynamic_properties:
+                self.kind[code] = KIND_DYNAMIC
+            else:
+                self.kind[code] = kind_of(element_class)
+            self.density[code] = element_class.density
+            # Pure-movement types: the default base update(), no per-instance physical properties
+            for base_class, kernel_kind in ((Powder, KIND_POWDER), (Liquid, KIND_LIQUID), (Gas, KIND_GAS)):
+                if issubclass(element_class, base_class):
+                    if (element_class.update is base_class.update and not element_class.has_dynamic_properties
+                            and getattr(element_class, 'check_boundary_dissipation', None) is getattr(base_class, 'check_boundary_dissipation', None)):
+                        self.batched[code] = kernel_kind
+                        self.interacts[code] = element_class.run_interactions is not base_class.run_interactions
+                    break
+            if self.batched[code] == KIND_LIQUID:
+                self.flow_speed[code] = max(0, min(255, int(element_class.flow_speed)))
+            elif self.batched[code] == KIND_GAS:
+                self.rise_speed[code] = max(0, min(255, int(element_class.rise_speed)))
+                self.spread_factor[code] = max(0, min(255, int(element_class.spread_factor)))
+                self.boundary_chance[code] = element_class.boundary_dissipation_chance
+                self.max_rise_speed = max(self.max_rise_speed, self.rise_speed[code])
+
+
+def _row_order(y_start, y_end, top_down):
+    """Rows y_start..y_end-1 in the order the per-object pass visits them."""
+    if top_down:
+        return range(y_start, y_end)
+    return range(y_end - 1, y_start - 1, -1)
+
+
+def powder_pass(grid, tables, active_columns, epoch, tick, y_start=0, y_end=None, rng=random, top_down=False):
+    """
+    Moves every unprocessed batched powder in the awake chunks of a TypedGrid.
+
+    Follows Powder.update: fall straight down into empty cells or displace lighter
+    liquids/gases/powders, otherwise slide diagonally if the side cell is passable.
+    Rows are resolved in the order of the per-object pass (bottom-up, or top-down
+    when `top_down`), so a column falls as fast as with the object backend. The
+    scan direction alternates per row and tick, and the preferred diagonal
+    alternates in a checkerboard pattern, so no cell is moved twice and piles
+    spread evenly without a random shuffle per cell.
+    """
+    codes = grid.codes
+    cells = grid.cells
+    width = grid.width
+    height = grid.height
+    chunk_size = grid.chunk_size
+    kind = tables.kind
+    density = tables.density
+    batched = tables.batched
+    swap_cells = grid.swap_cells
+
+    if y_end is None:
+        y_end = height
+    # The bottom row of the grid cannot fall any further
+    for y in _row_order(y_start, min(y_end, height - 1), top_down):
+        columns = active_columns[y // chunk_size]
+        if not columns:
+            continue
+        if (y + tick) & 1:
+            columns = reversed(columns)
+        row_start = y * width
+        below_start = row_start + width
+
+        for x in columns:
+            index = row_start + x
+            code = codes[index]
+            if batched[code] != KIND_POWDER:
+                continue
+            element = cells[index]
+            if element.processed_epoch == epoch:
+                continue # Already moved, or handled by its interactions
+            element.processed_epoch = epoch
+            own_density = density[code]
+
+            # 1. Straight down
+            target = below_start + x
+            target_code = codes[target]
+            if target_code == 0:
+                swap_cells(index, target)
+                continue
+            target_kind = kind[target_code]
+            if target_kind == KIND_DYNAMIC:
+                target_element = cells[target]
+                target_kind = kind_of(target_element)
+                target_density = target_element.density
+            else:
+                target_density = density[target_code]
+            if target_kind != KIND_OTHER and own_density > target_density:
+                swap_cells(index, target)
+                continue
+
+            # 2. Diagonally down, preferred side alternating like a checkerboard
+            first_dx = -1 if (x + y + tick) & 1 else 1
+            for dx in (first_dx, -first_dx):
+                nx = x + dx
+                if nx < 0 or nx >= width:
+                    continue
+                # The side cell must be empty, liquid or gas to pass through
+                side_code = codes[index + dx]
+                if side_code:
+                    side_kind = kind[side_code]
+                    if side_kind == KIND_DYNAMIC:
+                        side_kind = kind_of(cells[index + dx])
+                    if side_kind != KIND_LIQUID and side_kind != KIND_GAS:
+                        continue
+                target = below_start + nx
+                target_code = codes[target]
+                if target_code == 0:
+                    swap_cells(index, target)
+                    break
+                target_kind = kind[target_code]
+                if target_kind == KIND_DYNAMIC:
+                    target_element = cells[target]
+                    target_kind = kind_of(target_element)
+                    target_density = target_element.density
+                else:
+                    target_density = density[target_code]
+                if target_kind != KIND_OTHER and own_density > target_density:
+                    swap_cells(index, target)
+                    break
+
+
+def liquid_pass(grid, tables, active_columns, epoch, tick, y_start=0, y_end=None, rng=random, top_down=False):
+    """
+    Moves every unprocessed batched liquid in the awake chunks of a TypedGrid.
+
+    Follows Liquid.update: fall down, then slide diagonally (side cell empty or gas),
+    then flow up to `flow_speed` cells sideways, displacing lighter liquids and gases.
+    Rows are resolved in the order of the per-object pass, like powder_pass, and the
+    liquids of a row are visited in random order like the shuffled per-object pass
+    (a fixed scan direction lets a whole run flow sideways behind a gap in one
+    tick, which changes how often it touches its neighbours). A cell inside a run
+    of the same liquid is blocked on both sides, so the sideways scan only runs at
+    the ends of each row segment. Every liquid is still visited one by one, and
+    collecting and shuffling them per row costs about what the scans save: water
+    is slower than with the object backend.
+    """
+    codes = grid.codes
+    cells = grid.cells
+    width = grid.width
+    height = grid.height
+    chunk_size = grid.chunk_size
+    kind = tables.kind
+    density = tables.density
+    batched = tables.batched
+    flow_speed = tables.flow_speed
+    swap_cells = grid.swap_cells
+    getrandbits = rng.getrandbits
+    shuffle = rng.shuffle
+    last_x = width - 1
+
+    if y_end is None:
+        y_end = height
+    for y in _row_order(y_start, y_end, top_down):
+        columns = active_columns[y // chunk_size]
+        if not columns:
+            continue
+        row_start = y * width
+        below_start = row_start + width
+        has_below = y < height - 1
+        row_liquids = [x for x in columns if batched[codes[row_start + x]] == KIND_LIQUID]
+        if not row_liquids:
+            continue
+        shuffle(row_liquids)
+
+        for x in row_liquids:
+            index = row_start + x
+            code = codes[index]
+            if batched[code] != KIND_LIQUID:
+                continue # Moved away earlier in this row
+            element = cells[index]
+            if element.processed_epoch == epoch:
+                continue
+            element.processed_epoch = epoch
+            own_density = density[code]
+
+            if has_below:
+                # 1. Straight down: empty, or a lighter liquid/gas
+                target = below_start + x
+                target_code = codes[target]
+                if target_code == 0:
+                    swap_cells(index, target)
+                    continue
+                target_kind = kind[target_code]
+                if target_kind == KIND_DYNAMIC:
+                    target_element = cells[target]
+                    target_kind = kind_of(target_element)
+                    target_density = target_element.density
+                else:
+                    target_density = density[target_code]
+                if (target_kind == KIND_LIQUID or target_kind == KIND_GAS) and own_density > target_density:
+                    swap_cells(index, target)
+                    continue
+
+                # 2. Diagonally down, the side cell must be empty or gas
+                first_dx = -1 if (x + y + tick) & 1 else 1
+                moved = False
+                for dx in (first_dx, -first_dx):
+                    nx = x + dx
+                    if nx < 0 or nx > last_x:
+                        continue
+                    side_code = codes[index + dx]
+                    if side_code:
+                        side_kind = kind[side_code]
+                        if side_kind == KIND_DYNAMIC:
+                            side_kind = kind_of(cells[index + dx])
+                        if side_kind != KIND_GAS:
+                            continue
+                    target = below_start + nx
+                    target_code = codes[target]
+                    if target_code == 0:
+                        swap_cells(index, target)
+                        moved = True
+                        break
+                    target_kind = kind[target_code]
+                    if target_kind == KIND_DYNAMIC:
+                        target_element = cells[target]
+                        target_kind = kind_of(target_element)
+                        target_density = target_element.density
+                    else:
+                        target_density = density[target_code]
+                    if (target_kind == KIND_LIQUID or target_kind == KIND_GAS) and own_density > target_density:
+                        swap_cells(index, target)
+                        moved = True
+                        break
+                if moved:
+                    continue
+
+            # 3. Sideways flow. Inside a segment of the same liquid both neighbours block.
+            if (x == 0 or codes[index - 1] == code) and (x == last_x or codes[index + 1] == code):
+                continue
+            speed = flow_speed[code]
+            direction = 1 if getrandbits(1) else -1
+            can_flow = False
+            is_swap = False
+            final_x = x
+
+            # Preferred direction: go as far as the empty gap reaches, or stop at a swap
+            for i in range(1, speed + 1):
+                nx = x + direction * i
+                if nx < 0 or nx > last_x:
+                    break
+                check_code = codes[row_start + nx]
+                if check_code == 0:
+                    final_x = nx
+                    can_flow = True
+                    continue
+                check_kind = kind[check_code]
+                if check_kind == KIND_DYNAMIC:
+                    check_element = cells[row_start + nx]
+                    check_kind = kind_of(check_element)
+                    check_density = check_element.density
+                else:
+                    check_density = density[check_code]
+                if (check_kind == KIND_LIQUID or check_kind == KIND_GAS) and own_density > check_density:
+                    final_x = nx
+                    can_flow = True
+                    is_swap = True
+                break
+
+            # Other direction: a swap there wins, an empty gap only if nothing was found yet
+            if not is_swap:
+                for i in range(1, speed + 1):
+                    nx = x - direction * i
+                    if nx < 0 or nx > last_x:
+                        break
+                    check_code = codes[row_start + nx]
+                    if check_code == 0:
+                        if not can_flow:
+                            final_x = nx
+                            can_flow = True
+                        continue
+                    check_kind = kind[check_code]
+                    if check_kind == KIND_DYNAMIC:
+                        check_element = cells[row_start + nx]
+                        check_kind = kind_of(check_element)
+                        check_density = check_element.density
+                    else:
+                        check_density = density[check_code]
+                    if (check_kind == KIND_LIQUID or check_kind == KIND_GAS) and own_density > check_density:
+                        final_x = nx
+                        can_flow = True
+                    break
+
+            if can_flow and final_x != x:
+                swap_cells(index, row_start + final_x)
+
+
+def _dissipate_at_boundary(grid, tables, columns, y, epoch, rng):
+    """
+    Removes gases in row y that would rise out of the top edge this tick.
+
+    A gas dissipates at the boundary only if every cell between it and the top edge
+    (within its rise_speed) is empty. Instead of one random() call per such cell,
+    the number of removed cells is drawn once per row and type from a binomial
+    distribution and that many cells are picked at random.
+    """
+    codes = grid.codes
+    cells = grid.cells
+    width = grid.width
+    batched = tables.batched
+    rise_speed = tables.rise_speed
+    boundary_chance = tables.boundary_chance
+    row_start = y * width
+
+    candidates = {} # type code -> list of flat indices
+    for x in columns:
+        index = row_start + x
+        code = codes[index]
+        if batched[code] != KIND_GAS or y >= rise_speed[code] or not boundary_chance[code]:
+            continue
+        if cells[index].processed_epoch == epoch:
+            continue
+        # Every cell above must be empty for the upward scan to reach the edge
+        above = index - width
+        while above >= 0 and codes[above] == 0:
+            above -= width
+        if above < 0:
+            candidates.setdefault(code, []).append(index)
+
+    for code, indices in candidates.items():
+        count = rng.binomialvariate(len(indices), boundary_chance[code])
+        for index in rng.sample(indices, count):
+            grid.set_element(y, index - row_start, None)
+
+
+def gas_pass(grid, tables, active_columns, epoch, tick, y_start=0, y_end=None, rng=random, top_down=False):
+    """
+    Moves every unprocessed batched gas in the awake chunks of a TypedGrid.
+
+    Follows Gas.update: rise up to `rise_speed` cells through empty space (or swap
+    with a lighter gas above); a gas that could not rise spreads up to
+    `spread_factor` cells sideways. Rows are resolved in the order of the
+    per-object pass: bottom-up, a gas column only loses its top cell per tick and
+    the gases below it stay in place; top-down, the whole column rises. Gases that
+    moved are marked processed; the others are left for the per-object pass, which
+    runs their interactions like Gas.update does after a failed move. The gas
+    counts still drift from the object backend: smoke about 10% in the test
+    scenes (see headless --compare-backends).
+    """
+    codes = grid.codes
+    cells = grid.cells
+    width = grid.width
+    height = grid.height
+    chunk_size = grid.chunk_size
+    kind = tables.kind
+    density = tables.density
+    batched = tables.batched
+    rise_speed = tables.rise_speed
+    spread_factor = tables.spread_factor
+    swap_cells = grid.swap_cells
+    getrandbits = rng.getrandbits
+    shuffle = rng.shuffle
+    last_x = width - 1
+
+    if y_end is None:
+        y_end = height
+    for y in _row_order(y_start, y_end, top_down):
+        columns = active_columns[y // chunk_size]
+        if not columns:
+            continue
+        if y < tables.max_rise_speed:
+            _dissipate_at_boundary(grid, tables, columns, y, epoch, rng)
+        row_start = y * width
+        # Visit the gases of the row in random order, like the shuffled per-object pass.
+        # A fixed scan direction would let a whole run of gas shift sideways behind
+        # a gap in one tick, so none of it would get to interact.
+        row_gases = [x for x in columns if batched[codes[row_start + x]] == KIND_GAS]
+        if not row_gases:
+            continue
+        shuffle(row_gases)
+
+        for x in row_gases:
+            index = row_start + x
+            code = codes[index]
+            if batched[code] != KIND_GAS:
+                continue # Moved away earlier in this row
+            element = cells[index]
+            if element.processed_epoch == epoch:
+                continue
+            own_density = density[code]
+
+            # A. Rise as far as empty space allows, or swap with a lighter gas
+            target = index
+            above = index
+            for i in range(rise_speed[code]):
+                above -= width
+                if above < 0:
+                    break # Top edge; boundary dissipation was already sampled for this row
+                above_code = codes[above]
+                if above_code == 0:
+                    target = above
+                    continue
+                above_kind = kind[above_code]
+                if above_kind == KIND_DYNAMIC:
+                    above_element = cells[above]
+                    above_kind = kind_of(above_element)
+                    above_density = above_element.density
+                else:
+                    above_density = density[above_code]
+                if above_kind == KIND_GAS and own_density > above_density:
+                    target = above
+                break
+            if target != index:
+                element.processed_epoch = epoch
+                displaced = cells[target]
+                if displaced is not None:
+                    # The lighter gas lands on a cell this pass already visited, so like with
+                    # Gas.update it neither moves nor interacts again this tick
+                    displaced.processed_epoch = epoch
+                swap_cells(index, target)
+                continue
+
+            # B. Spread sideways, same search as Liquid flow but only through gases
+            speed = spread_factor[code]
+            direction = 1 if getrandbits(1) else -1
+            can_spread = False
+            is_swap = False
+            final_x = x
+
+            for i in range(1, speed + 1):
+                nx = x + direction * i
+                if nx < 0 or nx > last_x:
+                    break
+                check_code = codes[row_start + nx]
+                if check_code == 0:
+                    final_x = nx
+                    can_spread = True
+                    continue
+                check_kind = kind[check_code]
+                if check_kind == KIND_DYNAMIC:
+                    check_element = cells[row_start + nx]
+                    check_kind = kind_of(check_element)
+                    check_density = check_element.density
+                else:
+                    check_density = density[check_code]
+                if check_kind == KIND_GAS and own_density > check_density:
+                    final_x = nx
+                    can_spread = True
+                    is_swap = True
+                break
+
+            if not is_swap:
+                for i in range(1, speed + 1):
+                    nx = x - direction * i
+                    if nx < 0 or nx > last_x:
+                        break
+                    check_code = codes[row_start + nx]
+                    if check_code == 0:
+                        if not can_spread:
+                            final_x = nx
+                            can_spread = True
+                        continue
+                    check_kind = kind[check_code]
+                    if check_kind == KIND_DYNAMIC:
+                        check_element = cells[row_start + nx]
+                        check_kind = kind_of(check_element)
+                        check_density = check_element.density
+                    else:
+                        check_density = density[check_code]
+                    if check_kind == KIND_GAS and own_density > check_density:
+                        final_x = nx
+                        can_spread = True
+                        is_swap = True
+                    break
+
+            if can_spread and final_x != x:
+                element.processed_epoch = epoch
+                if is_swap:
+                    cells[row_start + final_x].processed_epoch = epoch
+                swap_cells(index, row_start + final_x)
@@ -1,16 +1,19 @@
 # -*- coding: utf-8 -*-
+import argparse
 import curses
 import time
 import sys
+import threading
 import traceback
 import math
 import os # Import os for path checking
 
 # Import game components
-from .config import DEFAULT_TARGET_FPS, GAME_AREA_RATIO, ELEMENT_DIR, DEFAULT_COLOR_PAIR_INDEX
+from .config import GAME_AREA_RATIO, ELEMENT_DIR, DEFAULT_COLOR_PAIR_INDEX, INPUT_POLL_INTERVAL, RENDER_THREAD, MAX_KEYS_PER_FRAME, IDLE_SLEEP
 # Import the element manager instance
 from .element_manager import element_manager
 from .game import Game
+from .render_thread import RenderThread
 # Import the command processor
 from .command import CommandProcessor, CommandError
 
@@ -99,65 +102,34 @@ def setup_colors():
     # print(f"Initialized {pair_id_counter - 1} color pairs.")
     return True
 
-def get_command_input(stdscr, prompt="CMD> "):
-    """Gets command input from the user at the bottom of the screen."""
-    h, w = stdscr.getmaxyx()
-    prompt_line = h - 1
-    command_str = ""
-    cursor_pos = len(prompt)
+def read_pending_keys(stdscr, limit):
+    """Returns all keys waiting in the input queue (at most `limit`) without blocking."""
+    keys = []
+    while len(keys) < limit:
+        key = stdscr.getch()
+        if key == -1:
+            break
+        keys.append(key)
+    return keys
 
-    curses.curs_set(1) # Show cursor for input
-    stdscr.nodelay(False) # Blocking input for command entry
 
-    while True:
-        # Display prompt and current command string
-        try:
-            stdscr.move(prompt_line, 0)
-            stdscr.clrtoeol() # Clear the line
-            display_str = prompt + command_str
-            stdscr.addstr(prompt_line, 0, display_str[:w-1]) # Show command, truncated
-            # Move cursor to correct position within the input string
-            stdscr.move(prompt_line, min(cursor_pos, w - 1))
-            stdscr.refresh()
-        except curses.error:
-            pass # Ignore screen errors
-
-        key = stdscr.getch() # Wait for key
-
-        # Handle Enter
-        if key == curses.KEY_ENTER or key == 10 or key == 13:
-            break
-        # Handle Backspace/Delete
-        elif key == curses.KEY_BACKSPACE or key == 127 or key == 8:
-            if cursor_pos > len(prompt):
-                command_str = command_str[:cursor_pos - len(prompt) - 1] + command_str[cursor_pos - len(prompt):]
-                cursor_pos -= 1
-        # Handle regular characters
-        elif 32 <= key <= 126: # Printable ASCII
-             # Insert character at cursor position
-             command_str = command_str[:cursor_pos - len(prompt)] + chr(key) + command_str[cursor_pos - len(prompt):]
-             cursor_pos += 1
-        # Handle other keys (like arrows, etc.) - currently ignored for simplicity
-        elif key == curses.KEY_LEFT:
-             cursor_pos = max(len(prompt), cursor_pos - 1)
-        elif key == curses.KEY_RIGHT:
-             cursor_pos = min(len(prompt) + len(command_str), cursor_pos + 1)
-        # Add other special key handlers if needed (Home, End, Delete key, etc.)
-
-    curses.curs_set(0) # Hide cursor again
-    stdscr.nodelay(True) # Restore non-blocking input
-    # Clear the prompt line after finishing
+def wait_for_input(stdscr, timeout=None):
+    """
+    Blocks until a key arrives (or `timeout` seconds pass) without using the CPU.
+    The key is pushed back so the next read_pending_keys() sees it. curses reports
+    a terminal resize as KEY_RESIZE, so resizing wakes up the loop as well.
+    """
+    stdscr.timeout(-1 if timeout is None else max(1, int(timeout * 1000)))
     try:
-        stdscr.move(prompt_line, 0)
-        stdscr.clrtoeol()
-        stdscr.refresh()
-    except curses.error:
-        pass
-    return command_str
+        key = stdscr.getch()
+    finally:
+        stdscr.nodelay(True) # Back to non-blocking input
+    if key != -1:
+        curses.ungetch(key)
 
 
-def game_loop(stdscr):
-    """The main game loop managed by curses.wrapper."""
+def game_loop(stdscr, seed=None):
+    """The main game loop managed by curses.wrapper. `seed` makes the simulation reproducible."""
     # --- Initial Curses Setup ---
     stdscr.nodelay(True)  # Non-blocking input
     curses.curs_set(0)    # Hide terminal cursor
@@ -190,91 +162,134 @@ def game_loop(stdscr):
 
     # --- Game Initialization ---
     height, width = stdscr.getmaxyx()
-    game_instance = Game(height, width, GAME_AREA_RATIO)
+    game_instance = Game(height, width, GAME_AREA_RATIO, seed=seed)
     command_processor = CommandProcessor(game_instance, stdscr) # Pass game and screen
 
     # --- Timing ---
-    last_frame_time = time.time()
+    # Simulation ticks and drawn frames are scheduled independently (see scheduler.py)
+    scheduler = game_instance.scheduler
+    scheduler.reset()
+    frame_stale = True # Something changed since the last drawn frame
+
+    # --- Rendering ---
+    # Every curses call must hold screen_lock once a render thread draws in the background
+    screen_lock = threading.Lock()
+    render_thread = None
+    if RENDER_THREAD:
+        render_thread = RenderThread(game_instance, stdscr, screen_lock)
+        render_thread.start()
 
     # --- Main Loop ---
-    while game_instance.running:
-        # Calculate dynamic frame duration based on game's target FPS
-        frame_duration = 1.0 / game_instance.target_fps
-        current_time = time.time()
-        last_frame_time = current_time
-
-        # --- Handle Input ---
-        key = stdscr.getch() # Get input (-1 if none)
-
-        if game_instance.command_mode:
-            # Enter command input state
-            command_string = get_command_input(stdscr)
-            game_instance.command_mode = False # Exit command mode after input
-            if command_string:
-                command_processor.process_command(command_string)
-            # After processing command, redraw immediately
-            try:
-                game_instance.draw(stdscr)
-                stdscr.refresh()
-            except curses.error: pass # Ignore draw errors
-            continue # Skip rest of loop iteration
-
-        # --- Handle Normal Game Input and Resize ---
-        if key != -1:
-            if key == curses.KEY_RESIZE:
-                new_height, new_width = stdscr.getmaxyx()
-                # Check if resize actually occurred and dimensions are valid
-                if (new_height != game_instance.height or new_width != game_instance.width) and new_height > 0 and new_width > 0:
-                     try:
-                         # Important: redraw *before* resize calculations if needed
-                         # stdscr.clear(); stdscr.refresh() # Maybe clear first?
-                         game_instance.resize(new_height, new_width)
-                         # Re-create command processor with new screen dimensions?
-                         # No, it holds a reference, should be fine.
-                         stdscr.clear() # Clear after resize logic completes
-                         stdscr.refresh()
-                     except Exception as resize_err:
-                         # Log or display? Can be disruptive. Re-raise for main handler.
-                         raise RuntimeError(f"Resize Error: {resize_err}") from resize_err
-            else:
-                # Pass other keys to game instance for handling
-                game_instance.handle_input(key)
-
-
-        # --- Update Simulation ---
-        if game_instance.running: # Check if input caused exit
-            try:
-                game_instance.update()
-            except Exception as sim_error:
-                raise RuntimeError(f"Simulation Error: {sim_error}") from sim_error # Reraise
-
-        # --- Draw Screen ---
-        if game_instance.running:
-            try:
-                # Draw game state (grid, cursor, info panel)
-                game_instance.draw(stdscr)
-                # Refresh the physical screen AFTER drawing everything
-                stdscr.refresh()
-            except curses.error as draw_error:
-                # Ignore common non-fatal curses errors during drawing
-                # (e.g., drawing off-screen during resize transient state)
-                if "addch" in str(draw_error) or "addstr" in str(draw_error):
-                     pass # Often happens at edges or small terminals, try to continue
+    try:
+        while game_instance.running:
+            # --- Handle Input ---
+            # Read every key queued since the last frame, so held keys never lag behind
+            with screen_lock:
+                keys = read_pending_keys(stdscr, MAX_KEYS_PER_FRAME)
+
+            for key in keys:
+                if key == curses.KEY_RESIZE:
+                    new_height, new_width = stdscr.getmaxyx()
+                    # Check if resize actually occurred and dimensions are valid
+                    if (new_height != game_instance.height or new_width != game_instance.width) and new_height > 0 and new_width > 0:
+                         try:
+                             # Not while the render thread is drawing the old layout
+                             with screen_lock:
+                                 game_instance.finish_input() # Apply batched moves to the old layout
+                                 game_instance.resize(new_height, new_width)
+                                 # Re-create command processor with new screen dimensions?
+                                 # No, it holds a reference, should be fine.
+                                 stdscr.clear() # Clear after resize logic completes
+                                 stdscr.refresh()
+                         except Exception as resize_err:
+                             # Log or display? Can be disruptive. Re-raise for main handler.
+                             raise RuntimeError(f"Resize Error: {resize_err}") from resize_err
+                elif game_instance.command_mode:
+                    # Command line is edited key by key; the game keeps running meanwhile
+                    command_string = game_instance.command_line.handle_key(key)
+                    if command_string is not None:
+                        game_instance.command_mode = False # Exit command mode after Enter/Esc
+                        if command_string:
+                            # Commands may draw progress themselves (e.g. ff)
+                            with screen_lock:
+                                command_processor.process_command(command_string)
                 else:
-                     # Re-raise other curses errors if they seem more critical
-                     raise RuntimeError(f"Drawing Error (curses): {draw_error}") from draw_error
-            except Exception as draw_exception:
-                 raise RuntimeError(f"Drawing Error: {draw_exception}") from draw_exception # Reraise
-
-        # --- Frame Rate Control ---
-        elapsed_time = time.time() - current_time
-        sleep_time = frame_duration - elapsed_time
-        if sleep_time > 0:
-            time.sleep(sleep_time)
+                    # Game keys are batched: moves summed, repeated place/delete applied once
+                    game_instance.feed_key(key)
+            game_instance.finish_input()
+            if keys:
+                frame_stale = True
+
+            # --- Update Simulation ---
+            # Run as many fixed steps as have come due (capped, see MAX_CATCHUP_TICKS)
+            if game_instance.running: # Check if input caused exit
+                try:
+                    ticks = scheduler.ticks_due()
+                    if game_instance.paused:
+                        ticks = 0 # Time passes, the world does not
+                    for _ in range(ticks):
+                        game_instance.update()
+                        frame_stale = True
+                except Exception as sim_error:
+                    raise RuntimeError(f"Simulation Error: {sim_error}") from sim_error # Reraise
+
+            # --- Draw Screen ---
+            if render_thread is not None and render_thread.error is not None:
+                raise RuntimeError(f"Drawing Error (render thread): {render_thread.error}") from render_thread.error
+            if game_instance.running and scheduler.render_due():
+                try:
+                    if render_thread is not None:
+                        # Capture now, draw in the background while the next ticks run
+                        snapshot = game_instance.capture_frame()
+                        if snapshot is not None:
+                            render_thread.publish(snapshot)
+                    else:
+                        with screen_lock:
+                            # Draw game state (grid, cursor, info panel)
+                            game_instance.draw(stdscr)
+                            # Refresh the physical screen AFTER drawing everything
+                            stdscr.refresh()
+                except curses.error as draw_error:
+                    # Ignore common non-fatal curses errors during drawing
+                    # (e.g., drawing off-screen during resize transient state)
+                    if "addch" in str(draw_error) or "addstr" in str(draw_error):
+                         pass # Often happens at edges or small terminals, try to continue
+                    else:
+                         # Re-raise other curses errors if they seem more critical
+                         raise RuntimeError(f"Drawing Error (curses): {draw_error}") from draw_error
+                except Exception as draw_exception:
+                     raise RuntimeError(f"Drawing Error: {draw_exception}") from draw_exception # Reraise
+                frame_stale = False
+
+            # --- Idle ---
+            # Settled world, no input, screen up to date: block until a key (or resize) arrives
+            if IDLE_SLEEP and game_instance.running and not keys and not frame_stale and game_instance.is_idle():
+                if render_thread is not None:
+                    render_thread.wait_drawn() # The last published frame must reach the screen first
+                with screen_lock:
+                    wait_for_input(stdscr, game_instance.idle_wakeup_delay())
+                # The time spent idle is not caught up
+                scheduler.reset()
+                continue
+
+            # --- Rate Control ---
+            # Sleep until the next tick or frame is due, but keep polling input regularly
+            sleep_time = min(scheduler.time_until_next(), INPUT_POLL_INTERVAL)
+            if sleep_time > 0:
+                time.sleep(sleep_time)
+    finally:
+        if render_thread is not None:
+            render_thread.stop()
+        game_instance.stop_recording() # Also after an error: the log ends at the failing tick
+        game_instance.close_timeline()
 
 # --- Entry Point ---
-def main():
+def main(argv=None):
     """Program entry point, sets up curses wrapper and error handling."""
+    parser = argparse.ArgumentParser(description="Falling sand game in the terminal.")
+    parser.add_argument("--seed", type=int, default=None, help="random seed of the simulation (reproducible runs)")
+    args = parser.parse_args(argv)
+
     # Create elements directory early if it doesn't exist
     if not os.path.exists(ELEMENT_DIR):
         try:
@@ -287,7 +302,7 @@ def main():
 
     try:
         # curses.wrapper handles terminal setup and safe restoration
-        curses.wrapper(game_loop)
+        curses.wrapper(game_loop, args.seed)
         print("Game exited normally.")
     except RuntimeError as loop_error:
          # curses should be ended by wrapper here
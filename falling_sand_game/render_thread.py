@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+import curses
+import threading
+
+
+class FrameSnapshot:
+    """
+    Immutable picture of one frame, captured on the simulation thread.
+
+    Holds only plain chars and curses attributes (no Element objects), so it can be
+    drawn while the simulation already changes the grid for the next tick.
+    """
+    __slots__ = ("screen_h", "screen_w", "chars_rows", "attrs_rows", "cursor_cells", "panel_key", "status_line")
+
+    def __init__(self, screen_h, screen_w, chars_rows, attrs_rows, cursor_cells, panel_key, status_line):
+        self.screen_h = screen_h
+        self.screen_w = screen_w
+        self.chars_rows = chars_rows     # Per grid row: list of chars
+        self.attrs_rows = attrs_rows     # Per grid row: list of curses attributes
+        self.cursor_cells = cursor_cells # Tuple of (y, x, char, attr) drawn highlighted
+        self.panel_key = panel_key       # Inputs of the info panel (redrawn when it changes)
+        self.status_line = status_line   # Bottom line: (text, input cursor column or None)
+
+
+class FrameBuffer:
+    """
+    Double buffer between the simulation thread and the render thread.
+
+    publish() replaces the pending frame, so a frame that was not drawn in time is
+    dropped in favour of the newer one; take() waits for the next pending frame.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._pending = None # Latest published frame, not yet taken
+        self._closed = False
+        self._published = 0 # Frames published so far
+        self._taken = 0     # Value of _published when the frame being drawn was taken
+        self._drawn = 0     # Value of _published when the last drawn frame was taken
+        self.dropped_frames = 0
+
+    def publish(self, snapshot):
+        """Makes a snapshot the next frame to draw (dropping an undrawn older one)."""
+        with self._condition:
+            if self._pending is not None:
+                self.dropped_frames += 1
+            self._pending = snapshot
+            self._published += 1
+            self._condition.notify_all()
+
+    def take(self, timeout=None):
+        """Returns the latest pending frame, or None on timeout or after close()."""
+        with self._condition:
+            if self._pending is None and not self._closed:
+                self._condition.wait(timeout)
+            snapshot = self._pending
+            self._pending = None
+            self._taken = self._published
+            return snapshot
+
+    def frame_done(self):
+        """Called by the consumer once the frame returned by take() is on screen."""
+        with self._condition:
+            self._drawn = self._taken
+            self._condition.notify_all()
+
+    def wait_drawn(self):
+        """Blocks until the latest published frame has been drawn (or the buffer is closed)."""
+        with self._condition:
+            while self._drawn < self._published and not self._closed:
+                self._condition.wait()
+
+    def close(self):
+        """Wakes up and stops the consumer."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+
+class RenderThread(threading.Thread):
+    """
+    Draws published frame snapshots to the screen in the background.
+
+    All curses calls of the program must hold `screen_lock`, since curses itself
+    is not thread-safe. An exception raised while drawing is kept in `error` and
+    stops the thread; the main loop re-raises it.
+    """
+
+    def __init__(self, game, stdscr, screen_lock):
+        super().__init__(name="render", daemon=True)
+        self.game = game
+        self.stdscr = stdscr
+        self.screen_lock = screen_lock
+        self.buffer = FrameBuffer()
+        self.error = None
+
+    def publish(self, snapshot):
+        """Hands a captured frame to the render thread."""
+        self.buffer.publish(snapshot)
+
+    def run(self):
+        buffer = self.buffer
+        while not buffer.closed:
+            snapshot = buffer.take(timeout=0.5)
+            if snapshot is None:
+                continue
+            try:
+                with self.screen_lock:
+                    self.game.draw_frame(self.stdscr, snapshot)
+                    self.stdscr.refresh()
+            except curses.error as e:
+                # Same tolerance as the main loop: edge writes during a resize are harmless
+                if not ("addch" in str(e) or "addstr" in str(e)):
+                    self._fail(e)
+                    return
+            except Exception as e:
+                self._fail(e)
+                return
+            buffer.frame_done()
+
+    def _fail(self, error):
+        """Records a drawing error for the main loop and releases anyone waiting on frames."""
+        self.error = error
+        self.buffer.close()
+
+    def wait_drawn(self):
+        """Blocks until every published frame has been drawn (e.g. before the main loop idles)."""
+        self.buffer.wait_drawn()
+
+    def stop(self):
+        """Stops the thread after the frame being drawn (if any) is finished."""
+        self.buffer.close()
+        self.join()
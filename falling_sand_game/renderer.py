@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+import curses
+import time
+
+from .elements.base import Element
+from .config import EMPTY_CHAR, DEFAULT_COLOR_PAIR_INDEX
+
+_DYNAMIC = object() # Marker: the class computes its drawing info per instance
+
+
+class GridRenderer:
+    """
+    Draws the game grid with one addstr() per run of neighbouring cells that share
+    the same curses attribute, instead of one addch() per cell.
+
+    Character and attribute per element class are cached; classes that override
+    get_drawing_info() (state-dependent appearance) are still asked per cell.
+
+    Drawing is split in two steps that keep separate state, so they may run on
+    different threads (see render_thread.py):
+      - capture_grid() turns the grid into per-row char/attribute lists. A row holding
+        the very same element objects as last capture, none of which draws dynamically
+        or flashes, reuses the previous lists after a single list comparison.
+      - draw_rows() keeps the previously drawn frame and only writes the cells that
+        changed; reused row lists are skipped with an identity check.
+    """
+
+    def __init__(self):
+        self._class_info = {} # element class -> (char, attr), or _DYNAMIC
+        self._pair_attrs = {} # color pair index -> curses attribute
+        # Previous capture, per grid row (see capture_grid)
+        self._capture_size = None # (rows, cols) of the previous capture
+        self._capture_cells = []
+        self._capture_chars = []
+        self._capture_attrs = []
+        self._capture_dynamic = [] # Row had cells whose appearance can change by itself
+        # Previously drawn frame, per screen row (None = must be repainted)
+        self._prev_chars = []
+        self._prev_attrs = []
+        self._frame_size = None # (rows, cols, screen_h, screen_w) of the previous frame
+        self._full_redraw = True
+
+    def invalidate_frame(self):
+        """Forces a full repaint on the next frame (e.g. after the screen was cleared)."""
+        self._full_redraw = True
+
+    def begin_frame(self, screen_h, screen_w, rows, cols):
+        """
+        Starts a frame. Returns True if the whole screen must be repainted, in which
+        case the caller erases the screen before drawing.
+        """
+        size = (rows, cols, screen_h, screen_w)
+        if size != self._frame_size:
+            self._frame_size = size
+            self._full_redraw = True
+        if not self._full_redraw:
+            return False
+        self._prev_chars = [None] * rows
+        self._prev_attrs = [None] * rows
+        return True
+
+    def end_frame(self):
+        """Finishes a frame; the next one is differential unless invalidated."""
+        self._full_redraw = False
+
+    def mark_dirty(self, r, c):
+        """Marks a screen cell as overdrawn (e.g. by the cursor) so it is repainted next frame."""
+        if 0 <= r < len(self._prev_chars) and self._prev_chars[r] is not None:
+            # Captured rows are shared with later captures, so mark a copy
+            chars = list(self._prev_chars[r])
+            if c < len(chars):
+                chars[c] = None
+            self._prev_chars[r] = chars
+
+    def invalidate(self):
+        """Drops cached attributes, e.g. after color pairs were (re)initialized."""
+        self._class_info.clear()
+        self._pair_attrs.clear()
+        self._capture_size = None
+
+    def _pair_attr(self, pair_index):
+        """Cached curses.color_pair() lookup."""
+        attr = self._pair_attrs.get(pair_index)
+        if attr is None:
+            attr = self._pair_attrs[pair_index] = curses.color_pair(pair_index)
+        return attr
+
+    def _lookup_class(self, element_class):
+        """Builds the cache entry for an element class."""
+        if element_class.get_drawing_info is not Element.get_drawing_info:
+            info = _DYNAMIC
+        else:
+            info = (element_class.char, self._pair_attr(element_class.color_pair_index))
+        self._class_info[element_class] = info
+        return info
+
+    def cell_info(self, element, flash_on):
+        """Returns (char, attr) used to draw an element (or an empty cell for None)."""
+        if element is None:
+            return EMPTY_CHAR, self._pair_attr(DEFAULT_COLOR_PAIR_INDEX)
+        info = self._class_info.get(element.__class__)
+        if info is None:
+            info = self._lookup_class(element.__class__)
+        if info is _DYNAMIC:
+            char, pair_index = element.get_drawing_info()
+            attr = self._pair_attr(pair_index)
+        else:
+            char, attr = info
+        tags = element.tags
+        if tags:
+            if "bold" in tags: attr |= curses.A_BOLD
+            if "flash" in tags and flash_on: attr |= curses.A_BLINK
+        return char, attr
+
+    @staticmethod
+    def flash_phase():
+        """True during the visible half of the 'flash' tag blink cycle."""
+        return int(time.time() * 2) % 2 == 0
+
+    @staticmethod
+    def time_to_flash_change():
+        """Seconds until flash_phase() changes."""
+        return 0.5 - (time.time() % 0.5)
+
+    def has_animated_cells(self):
+        """True if the last capture had cells that can look different without a grid change."""
+        return any(self._capture_dynamic)
+
+    def draw_grid(self, stdscr, grid, rows, cols):
+        """Draws the changed cells among the top-left rows x cols cells of the grid."""
+        chars_rows, attrs_rows = self.capture_grid(grid, rows, cols)
+        self.draw_rows(stdscr, chars_rows, attrs_rows)
+
+    def capture_grid(self, grid, rows, cols):
+        """
+        Computes the chars and attributes of the top-left rows x cols cells of the grid.
+        Returns (chars_rows, attrs_rows): one list per row, never modified afterwards.
+        """
+        if (rows, cols) != self._capture_size:
+            self._capture_size = (rows, cols)
+            self._capture_cells = [None] * rows
+            self._capture_chars = [None] * rows
+            self._capture_attrs = [None] * rows
+            self._capture_dynamic = [True] * rows
+        flash_on = self.flash_phase()
+        grid_rows = grid.height
+        class_info = self._class_info
+        empty_attr = self._pair_attr(DEFAULT_COLOR_PAIR_INDEX)
+        bold = curses.A_BOLD
+        blink = curses.A_BLINK
+        prev_cells = self._capture_cells
+        capture_chars = self._capture_chars
+        capture_attrs = self._capture_attrs
+        row_dynamic = self._capture_dynamic
+
+        for r in range(rows):
+            # Cells beyond the grid (e.g. a smaller loaded grid) are drawn empty
+            row = list(grid.get_row(r)[:cols]) if r < grid_rows else []
+            if len(row) < cols:
+                row.extend([None] * (cols - len(row)))
+            # Same objects in the same places and nothing animated: reuse the last lists
+            if not row_dynamic[r] and row == prev_cells[r]:
+                continue
+
+            chars = [EMPTY_CHAR] * cols
+            attrs = [empty_attr] * cols
+            dynamic = False
+            for c, element in enumerate(row):
+                # Inlined cell_info() for the hot loop
+                if element is None:
+                    continue
+                info = class_info.get(element.__class__)
+                if info is None:
+                    info = self._lookup_class(element.__class__)
+                if info is _DYNAMIC:
+                    char, pair_index = element.get_drawing_info()
+                    attr = self._pair_attr(pair_index)
+                    dynamic = True
+                else:
+                    char, attr = info
+                tags = element.tags
+                if tags:
+                    if "bold" in tags: attr |= bold
+                    if "flash" in tags:
+                        dynamic = True
+                        if flash_on: attr |= blink
+                chars[c] = char
+                attrs[c] = attr
+
+            old_chars = capture_chars[r]
+            if old_chars is not None and chars == old_chars and attrs == capture_attrs[r]:
+                # Animated row that happens to look the same: keep the old lists
+                chars = old_chars
+                attrs = capture_attrs[r]
+            prev_cells[r] = row
+            capture_chars[r] = chars
+            capture_attrs[r] = attrs
+            row_dynamic[r] = dynamic
+        return capture_chars[:rows], capture_attrs[:rows]
+
+    def draw_rows(self, stdscr, chars_rows, attrs_rows):
+        """Writes the cells of captured rows that differ from the previously drawn frame."""
+        prev_chars = self._prev_chars
+        prev_attrs = self._prev_attrs
+        for r, chars in enumerate(chars_rows):
+            attrs = attrs_rows[r]
+            old_chars = prev_chars[r]
+            old_attrs = prev_attrs[r]
+            # Row lists reused by capture_grid(): nothing to repaint
+            if chars is old_chars and attrs is old_attrs:
+                continue
+            cols = len(chars)
+            if old_chars is None:
+                self._write_runs(stdscr, r, chars, attrs, 0, cols)
+            elif chars != old_chars or attrs != old_attrs:
+                # Repaint only the changed spans
+                c = 0
+                while c < cols:
+                    if chars[c] == old_chars[c] and attrs[c] == old_attrs[c]:
+                        c += 1
+                        continue
+                    span_start = c
+                    while c < cols and (chars[c] != old_chars[c] or attrs[c] != old_attrs[c]):
+                        c += 1
+                    self._write_runs(stdscr, r, chars, attrs, span_start, c)
+            prev_chars[r] = chars
+            prev_attrs[r] = attrs
+
+    def _write_runs(self, stdscr, r, chars, attrs, start, end):
+        """Writes cells start..end-1 of a row, one addstr per run of equal attributes."""
+        write_run = self._write_run
+        run_start = start
+        run_attr = attrs[start]
+        for c in range(start + 1, end):
+            if attrs[c] != run_attr:
+                write_run(stdscr, r, run_start, chars[run_start:c], run_attr)
+                run_start = c
+                run_attr = attrs[c]
+        write_run(stdscr, r, run_start, chars[run_start:end], run_attr)
+
+    @staticmethod
+    def _write_run(stdscr, r, c, chars, attr):
+        """Writes one run of cells with a single attribute."""
+        try:
+            stdscr.addstr(r, c, ''.join(chars), attr)
+        except curses.error:
+            pass # Writing the bottom-right corner cell raises after output; ignore edge errors
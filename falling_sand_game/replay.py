@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""
+Input-log recording and deterministic playback of game sessions.
+
+A replay file stores the starting point of a session (random seed, tick count,
+grid, cursor and UI settings) and then every input as it was processed: keys
+handled by Game.handle_input, commands run by CommandProcessor.process_command
+and terminal resizes. Each event carries the simulation tick at which it happened,
+so playback runs exactly the recorded number of ticks between inputs and, with the
+seeded per-chunk random streams (see rng.py), ends in the same grid. No frames are
+stored, so a replay of a long session stays small.
+
+File format (UTF-8 JSON lines, written and flushed as the session goes, so a
+crashed session still leaves a usable log):
+    line 1   header object: {"format": "fsg-replay", "version": 1, "seed", "tick",
+             "backend", "screen": [h, w], "area_ratio", "cursor": [y, x],
+             "cursor_size", "selected_index", "tags", "keyframe_interval",
+             "grid": base64 of the binary save format (see savefile.py)}
+    events   [time, tick, "key", key code, cursor y, cursor x]
+             [time, tick, "cmd", command string, cursor y, cursor x]
+             [time, tick, "resize", screen height, screen width]
+             [time, tick, "grid", base64 of the binary save format]   (grid set by a timeline seek)
+             [time, tick, "end", grid checksum]   (last line of a finished recording)
+Times are seconds since the recording started (they drive the undo stroke merging).
+"""
+import base64
+import hashlib
+import json
+import time
+
+from .game import Game
+from .history import History
+from .simulation import GRID_BACKENDS
+from .savefile import grid_to_bytes, bytes_to_grid
+
+REPLAY_FORMAT = "fsg-replay"
+REPLAY_VERSION = 1
+REPLAY_EXTENSION = ".fsr"
+
+# Commands that should not run again on playback: they do not change the game, or
+# they read and write files (a timeline seek is logged as the grid it set instead,
+# see Recorder.record_grid; running 'timeline start' again would replace the file)
+_UNRECORDED_COMMANDS = ("record", "replay", "save", "timeline")
+
+
+def grid_checksum(grid):
+    """Short hash of the grid contents (keys, tags and element state), to compare runs."""
+    return hashlib.sha1(grid_to_bytes(grid)).hexdigest()[:16]
+
+
+class Recorder:
+    """
+    Writes the inputs of a running game to a replay file.
+
+    Starting a recording makes the live game reproducible from this point: every
+    chunk is woken (a replay starts with a freshly loaded grid), the random streams
+    are restarted from the current seed and the undo history is cleared (undoing
+    edits made before the recording could not be replayed).
+    """
+
+    def __init__(self, game, path, clock=time.monotonic):
+        self.path = path
+        self.event_count = 0
+        self._clock = clock
+        self._start = clock()
+        self._file = open(path, 'w', encoding='utf-8')
+        simulation = game.simulation
+        game.finish_input()
+        game.grid.wake_all()
+        simulation.set_seed(simulation.seed)
+        game.history.clear()
+        header = {
+            "format": REPLAY_FORMAT,
+            "version": REPLAY_VERSION,
+            "seed": simulation.seed,
+            "tick": simulation.tick_count,
+            "backend": next((name for name, grid_class in GRID_BACKENDS.items()
+                             if grid_class is simulation.grid_class), "object"),
+            "screen": [game.height, game.width],
+            "area_ratio": game.game_area_ratio,
+            "cursor": [game.cursor_y, game.cursor_x],
+            "cursor_size": game.cursor_size,
+            "selected_index": game.selected_index,
+            "tags": list(game.current_tags),
+            "keyframe_interval": game.keyframe_interval,
+            "grid": base64.b64encode(grid_to_bytes(game.grid)).decode('ascii'),
+        }
+        self._write_line(header)
+
+    def _write_line(self, value):
+        self._file.write(json.dumps(value, ensure_ascii=False, separators=(',', ':')) + "\n")
+        self._file.flush() # Keep the log usable if the session crashes
+
+    def _event(self, game, kind, *values):
+        elapsed = round(self._clock() - self._start, 3)
+        self._write_line([elapsed, game.simulation.tick_count, kind, *values])
+        self.event_count += 1
+
+    def record_key(self, game, key):
+        """Logs a key about to be handled by Game.handle_input."""
+        self._event(game, "key", key, game.cursor_y, game.cursor_x)
+
+    def record_command(self, game, command_name, command_string):
+        """Logs a command about to be run by CommandProcessor.process_command."""
+        if command_name not in _UNRECORDED_COMMANDS:
+            self._event(game, "cmd", command_string, game.cursor_y, game.cursor_x)
+
+    def record_grid(self, game):
+        """Logs the grid and tick just set by a command that is not replayed (timeline seek)."""
+        self._event(game, "grid", base64.b64encode(grid_to_bytes(game.grid)).decode('ascii'))
+
+    def record_resize(self, game, height, width):
+        """Logs a terminal resize about to be applied by Game.resize."""
+        self._event(game, "resize", height, width)
+
+    def stop(self, game):
+        """Writes the end marker (with the final grid checksum) and closes the file."""
+        if self._file.closed:
+            return
+        self._write_line([round(self._clock() - self._start, 3), game.simulation.tick_count,
+                          "end", grid_checksum(game.grid)])
+        self._file.close()
+
+
+def load_replay(path):
+    """Reads a replay file. Returns (header dict, list of events). Raises ValueError if malformed."""
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = [line for line in f if line.strip()]
+    if not lines:
+        raise ValueError("Empty replay file.")
+    try:
+        header = json.loads(lines[0])
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Corrupt replay header: {e}")
+    events = []
+    for number, line in enumerate(lines[1:], 2):
+        try:
+            events.append(json.loads(line))
+        except json.JSONDecodeError as e:
+            if number == len(lines):
+                break # Last line cut off by a crash: play what was written
+            raise ValueError(f"Corrupt replay file (line {number}): {e}")
+    if not isinstance(header, dict) or header.get("format") != REPLAY_FORMAT:
+        raise ValueError("Not a replay file.")
+    if header.get("version") != REPLAY_VERSION:
+        raise ValueError(f"Unsupported replay version {header.get('version')}.")
+    return header, events
+
+
+class ReplayPlayer:
+    """
+    Rebuilds the recorded game headlessly (no screen) and plays the input log back
+    at maximum speed. `game` is the replayed Game; after run() it holds the final state.
+    """
+
+    def __init__(self, header, events):
+        from .command import CommandProcessor # command.py imports this module
+        self.header = header
+        self.events = events
+        self.now = 0.0 # Recorded time of the event being played (clock of the undo history)
+        height, width = header["screen"]
+        game = self.game = Game(height, width, header["area_ratio"], header["backend"], header["seed"])
+        game.history = History(clock=lambda: self.now)
+        game.grid = bytes_to_grid(base64.b64decode(header["grid"]), game.simulation.grid_class)
+        game.grid.wake_all() # Like the live grid when the recording started
+        game.game_height = game.grid.height
+        game.game_width = game.grid.width
+        game.simulation.tick_count = header["tick"]
+        game.cursor_y, game.cursor_x = header["cursor"]
+        game.cursor_size = header["cursor_size"]
+        game.selected_index = header["selected_index"]
+        game.current_tags = list(header["tags"])
+        game.keyframe_interval = header["keyframe_interval"]
+        self.processor = CommandProcessor(game, None)
+        end = events[-1] if events and events[-1][2] == "end" else None
+        self.end_tick = end[1] if end else (events[-1][1] if events else header["tick"])
+        self.expected_checksum = end[3] if end else None # None: the recording did not finish
+
+    @property
+    def tick_count(self):
+        """Number of ticks the playback runs."""
+        return self.end_tick - self.header["tick"]
+
+    def _run_until(self, tick, tick_times, progress):
+        game = self.game
+        while game.simulation.tick_count < tick:
+            start = time.perf_counter()
+            game.update()
+            end = time.perf_counter()
+            if tick_times is not None:
+                tick_times.append(end - start)
+            if progress is not None and end >= self._next_report:
+                progress(game.simulation.tick_count - self.header["tick"])
+                self._next_report = end + self._progress_interval
+
+    def run(self, tick_times=None, progress=None, progress_interval=0.25):
+        """
+        Plays the whole log. Appends the duration of every tick to `tick_times` (if given).
+        `progress(ticks done)` is called about every `progress_interval` seconds.
+        Returns the elapsed time in seconds.
+        """
+        game = self.game
+        start = time.perf_counter()
+        self._next_report = start + progress_interval
+        self._progress_interval = progress_interval
+        for event in self.events:
+            elapsed, tick, kind = event[0], event[1], event[2]
+            if kind == "grid":
+                # Set without simulating up to the tick (a seek can also go back in time)
+                self.now = elapsed
+                game.set_grid(bytes_to_grid(base64.b64decode(event[3]), game.simulation.grid_class))
+                game.simulation.tick_count = tick
+                continue
+            self._run_until(tick, tick_times, progress)
+            self.now = elapsed
+            if kind == "key":
+                game.command_mode = False # Keys in command mode are never logged
+                game.cursor_y, game.cursor_x = event[4], event[5]
+                game.handle_input(event[3])
+            elif kind == "cmd":
+                game.command_mode = False
+                game.cursor_y, game.cursor_x = event[4], event[5]
+                self.processor.process_command(event[3])
+            elif kind == "resize":
+                game.resize(event[3], event[4])
+        self._run_until(self.end_tick, tick_times, progress)
+        return time.perf_counter() - start
+
+    def checksum_matches(self):
+        """True/False whether the final grid matches the recording, None if the recording has no end marker."""
+        if self.expected_checksum is None:
+            return None
+        return grid_checksum(self.game.grid) == self.expected_checksum
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+import random
+
+_MASK64 = (1 << 64) - 1
+
+# Stream families (see SimulationRandom.stream)
+STREAM_CHUNK = 0  # Element updates inside one chunk
+STREAM_ORDER = 1  # Update order of the rows of one chunk row
+STREAM_KERNEL = 2 # Batched movement kernels on the rows of one chunk row (see kernels.py)
+
+
+def mix_seed(*values):
+    """Hashes integers into a 64-bit seed (SplitMix64 finalizer per value)."""
+    h = 0x9E3779B97F4A7C15
+    for value in values:
+        h = (h ^ (value & _MASK64)) * 0xBF58476D1CE4E5B9 & _MASK64
+        h = (h ^ (h >> 31)) * 0x94D049BB133111EB & _MASK64
+        h ^= h >> 29
+    return h
+
+
+# Lists up to this length are shuffled in place (Fisher-Yates); longer ones by sorting on random keys
+_SHORT_SHUFFLE = 8
+
+
+class FastRandom(random.Random):
+    """
+    random.Random with cheaper integer-valued draws for the simulation's hot paths.
+
+    The random module derives choice(), shuffle() and randint() from _randbelow(),
+    a Python-level rejection loop over getrandbits() that costs several times a
+    random() call. Here they scale one C-level random() float instead (bias below
+    n / 2**53, far under anything a simulation can observe). Long lists are shuffled
+    by sorting on a block of random keys, which runs the permutation in C. coin()
+    is the cheapest draw of all, for the [-1, 1] direction picks of movable elements.
+    """
+
+    def coin(self):
+        """Returns True or False with equal probability."""
+        return self.random() < 0.5
+
+    def choice(self, seq):
+        return seq[int(self.random() * len(seq))]
+
+    def randint(self, a, b):
+        return a + int(self.random() * (b - a + 1))
+
+    def shuffle(self, x):
+        draw = self.random
+        n = len(x)
+        if n <= _SHORT_SHUFFLE:
+            for i in range(n - 1, 0, -1):
+                j = int(draw() * (i + 1))
+                x[i], x[j] = x[j], x[i]
+        else:
+            keys = [draw() for _ in range(n)]
+            order = sorted(range(n), key=keys.__getitem__)
+            x[:] = [x[i] for i in order]
+
+
+class SimulationRandom:
+    """
+    Seeded random number service of a simulation, used by element code as `grid.rng`
+    (a drop-in for the `random` module functions elements use).
+
+    Draws come from counter-based streams: the stream of a chunk in a tick is a
+    FastRandom seeded from (seed, tick, chunk), so what element code does in a
+    chunk does not depend on how many numbers other chunks drew or in which order
+    the chunks are updated. The simulation selects the current stream before
+    calling into element code (see Simulation._update_rows); outside a tick draws
+    come from a stream of its own. The row update order and the batched kernels
+    work on whole rows, so their streams belong to a chunk row instead of a chunk.
+    """
+
+    def __init__(self, seed=None):
+        self.set_seed(seed)
+
+    def set_seed(self, seed=None):
+        """Restarts all streams from `seed` (a random seed if None)."""
+        self.seed = seed if seed is not None else random.randrange(2**32)
+        self._tick = -1
+        self._streams = {} # (family, index) -> stream of the current tick
+        self._chunk_streams = {} # Chunk index -> STREAM_CHUNK stream (lookup cache for select)
+        self._default = FastRandom(mix_seed(self.seed, _MASK64))
+        self._current = self._default # Stream that element code draws from
+
+    def begin_tick(self, tick):
+        """Starts the streams of a new tick (drops those of the previous one)."""
+        self._tick = tick
+        self._streams = {}
+        self._chunk_streams = {}
+        self._current = self._default
+
+    def stream(self, family, index):
+        """Returns the FastRandom of stream (family, index) in the current tick."""
+        key = (family, index)
+        stream = self._streams.get(key)
+        if stream is None:
+            stream = self._streams[key] = FastRandom(mix_seed(self.seed, self._tick, family, index))
+        return stream
+
+    def select(self, chunk_index):
+        """Makes the chunk's stream the current one."""
+        # Called for most elements of a tick, so the common case is a single dict lookup
+        stream = self._chunk_streams.get(chunk_index)
+        if stream is None:
+            stream = self._chunk_streams[chunk_index] = self.stream(STREAM_CHUNK, chunk_index)
+        self._current = stream
+
+    # --- random module compatible API (plus coin), drawn from the current stream ---
+
+    def random(self):
+        return self._current.random()
+
+    def coin(self):
+        return self._current.random() < 0.5
+
+    def uniform(self, a, b):
+        return self._current.uniform(a, b)
+
+    def randint(self, a, b):
+        return self._current.randint(a, b)
+
+    def randrange(self, *args):
+        return self._current.randrange(*args)
+
+    def choice(self, seq):
+        return self._current.choice(seq)
+
+    def shuffle(self, seq):
+        self._current.shuffle(seq)
+
+    def sample(self, population, k):
+        return self._current.sample(population, k)
+
+    def getrandbits(self, k):
+        return self._current.getrandbits(k)
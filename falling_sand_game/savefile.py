@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+"""
+Grid save/load helpers shared by the in-game commands and the headless runner.
+
+Two file formats are supported:
+  - JSON (.json): one dict per non-empty cell; readable, kept for interchange.
+  - Binary (.fsg, the default): a fixed header followed by a zlib-compressed body
+    holding the key table, the type-code plane (one code per cell, row-major,
+    0 = empty) and sparse side tables for tags and element-specific state.
+
+Binary layout (little-endian):
+    header  "FSG\0", version (u8), code size in bytes (u8), reserved (u16),
+            height (u32), width (u32)
+    body    zlib( key count (u16), per key: length (u8) + UTF-8 key,
+                  code plane (height * width * code size bytes),
+                  side tables as UTF-8 JSON (see below) )
+
+Side tables: {"tags": [[cell, [tag, ...]], ...], "state": {key: {"fields": [...],
+"cells": [...], "columns": [[...], ...]}}}. Element state (Element.state_fields) is
+stored column-wise per element type: one column per field, one row per cell listed
+in "cells". Version 1 files stored "state" as [[cell, {field: value}], ...].
+
+JSON saves carry the same version number in "version" (files without it are
+version 2). Keys that changed between versions are mapped on load (see
+migrate_key), so older saves keep their elements.
+"""
+import json # For saving/loading game state
+import struct
+import sys
+import zlib
+from array import array
+
+from .element_manager import element_manager
+
+
+# Element keys renamed by a save version: (version, old key, new key).
+_KEY_RENAMES = [
+    (3, 'B', 'o'), # Bomb (mod) shared 'B' with Ember and took its registry slot; Bomb is 'o' now
+]
+
+
+def migrate_key(key, version):
+    """Maps an element key read from a save of the given version to the current key."""
+    for since, old_key, new_key in _KEY_RENAMES:
+        if version < since and key == old_key:
+            key = new_key
+    return key
+
+
+def element_state(element):
+    """Returns the values of the element's declared state_fields (besides key, position and tags)."""
+    return {name: getattr(element, name) for name in element.state_fields}
+
+
+def apply_element_state(element, element_data):
+    """Restores state saved by element_state() onto a freshly created element."""
+    for name in element.state_fields:
+        if name in element_data:
+            setattr(element, name, element_data[name])
+    element.on_state_loaded()
+
+
+def grid_to_dict(grid):
+    """Serializes the grid state to a dictionary."""
+    # This is a basic implementation. More complex elements might need custom serialization.
+    grid_data = {
+        "version": BINARY_VERSION,
+        "height": grid.height,
+        "width": grid.width,
+        "elements": [] # List of element dictionaries
+    }
+    for r in range(grid.height):
+        for c in range(grid.width):
+            element = grid.get_element(r, c)
+            if element:
+                element_data = {
+                    "key": element.key,
+                    "y": element.y,
+                    "x": element.x,
+                    "tags": list(element.tags) # Save tags
+                }
+                # Add specific state for elements that need it
+                element_data.update(element_state(element))
+                grid_data["elements"].append(element_data)
+    return grid_data
+
+
+def dict_to_grid(grid_data, grid_class):
+    """Deserializes grid state from a dictionary."""
+    if not grid_data or "height" not in grid_data or "width" not in grid_data or "elements" not in grid_data:
+        raise ValueError("Invalid grid data format.")
+
+    height = grid_data["height"]
+    width = grid_data["width"]
+    elements_data = grid_data["elements"]
+    version = grid_data.get("version", 2)
+
+    # Create a new grid with specified dimensions
+    new_grid = grid_class(height, width, element_manager)
+
+    # Place elements from data
+    for element_data in elements_data:
+        key = element_data.get("key")
+        y = element_data.get("y")
+        x = element_data.get("x")
+        tags = element_data.get("tags", []) # Load tags
+
+        if key is None or y is None or x is None:
+            print(f"Warning: Skipping malformed element data: {element_data}")
+            continue
+
+        # Create element instance using the new grid's factory method
+        element = new_grid.create_element(migrate_key(key, version), y, x)
+
+        if element:
+            # Apply tags
+            if tags:
+                element.tags = list(tags)
+
+            # Load specific state for elements
+            apply_element_state(element, element_data)
+
+
+            # Place the element on the new grid
+            new_grid.set_element(y, x, element)
+        else:
+             print(f"Warning: Element class for key '{key}' not found during loading.")
+
+    return new_grid
+
+
+BINARY_MAGIC = b"FSG\0"
+BINARY_VERSION = 3
+BINARY_EXTENSION = ".fsg"
+JSON_EXTENSION = ".json"
+_HEADER = struct.Struct("<4sBBHII")
+
+
+def grid_to_bytes(grid):
+    """Serializes the grid to the compact binary format (see module docstring)."""
+    height, width = grid.height, grid.width
+    keys = [] # Code - 1 -> element key
+    key_codes = {} # Element key -> code
+    cell_codes = []
+    tags_table = []
+    state_tables = {} # Element key -> {"fields", "cells", "columns"}
+    index = 0
+    for r in range(height):
+        for element in grid.get_row(r):
+            if element is None:
+                cell_codes.append(0)
+            else:
+                key = element.key
+                code = key_codes.get(key)
+                if code is None:
+                    keys.append(key)
+                    code = key_codes[key] = len(keys)
+                cell_codes.append(code)
+                if element.tags:
+                    tags_table.append([index, list(element.tags)])
+                fields = element.state_fields
+                if fields:
+                    table = state_tables.get(key)
+                    if table is None:
+                        table = state_tables[key] = {"fields": list(fields), "cells": [],
+                                                     "columns": [[] for _ in fields]}
+                    table["cells"].append(index)
+                    for column, name in zip(table["columns"], table["fields"]):
+                        column.append(getattr(element, name, None))
+            index += 1
+
+    code_size = 1 if len(keys) <= 255 else 2
+    codes = array('B' if code_size == 1 else 'H', cell_codes)
+    if sys.byteorder == 'big':
+        codes.byteswap() # The file stores little-endian codes
+
+    body = [struct.pack("<H", len(keys))]
+    for key in keys:
+        encoded = key.encode('utf-8')
+        body.append(struct.pack("<B", len(encoded)))
+        body.append(encoded)
+    body.append(codes.tobytes())
+    side_tables = {"tags": tags_table, "state": state_tables}
+    body.append(json.dumps(side_tables, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+    header = _HEADER.pack(BINARY_MAGIC, BINARY_VERSION, code_size, 0, height, width)
+    return header + zlib.compress(b"".join(body), 6)
+
+
+def bytes_to_grid(data, grid_class):
+    """Deserializes a grid from the binary format written by grid_to_bytes()."""
+    if len(data) < _HEADER.size:
+        raise ValueError("File too short for a binary save.")
+    magic, version, code_size, _, height, width = _HEADER.unpack_from(data)
+    if magic != BINARY_MAGIC:
+        raise ValueError("Not a binary save file.")
+    if version not in (1, 2, BINARY_VERSION):
+        raise ValueError(f"Unsupported binary save version {version}.")
+    if code_size not in (1, 2):
+        raise ValueError(f"Invalid code size {code_size}.")
+    try:
+        body = zlib.decompress(data[_HEADER.size:])
+    except zlib.error as e:
+        raise ValueError(f"Corrupt binary save: {e}")
+
+    try:
+        (key_count,) = struct.unpack_from("<H", body, 0)
+        offset = 2
+        keys = [None] # Code 0 = empty
+        for _ in range(key_count):
+            (length,) = struct.unpack_from("<B", body, offset)
+            offset += 1
+            keys.append(migrate_key(body[offset:offset + length].decode('utf-8'), version))
+            offset += length
+        plane_size = height * width * code_size
+        codes = array('B' if code_size == 1 else 'H')
+        codes.frombytes(body[offset:offset + plane_size])
+        offset += plane_size
+        side_tables = json.loads(body[offset:].decode('utf-8'))
+    except (struct.error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError(f"Corrupt binary save: {e}")
+    if len(codes) != height * width:
+        raise ValueError("Corrupt binary save: truncated code plane.")
+    if sys.byteorder == 'big':
+        codes.byteswap()
+
+    tags_by_cell = {index: tags for index, tags in side_tables.get("tags", [])}
+    state_by_cell = {}
+    if version == 1:
+        state_by_cell = {index: state for index, state in side_tables.get("state", [])}
+    else:
+        # Unpack the per-type columns into per-cell values
+        for table in side_tables.get("state", {}).values():
+            fields = table["fields"]
+            columns = table["columns"]
+            for row, index in enumerate(table["cells"]):
+                state_by_cell[index] = {name: column[row] for name, column in zip(fields, columns)}
+    missing_keys = set()
+    new_grid = grid_class(height, width, element_manager)
+    index = 0
+    for y in range(height):
+        for x in range(width):
+            code = codes[index]
+            if code:
+                if code >= len(keys):
+                    raise ValueError(f"Corrupt binary save: unknown code {code}.")
+                element = new_grid.create_element(keys[code], y, x)
+                if element:
+                    tags = tags_by_cell.get(index)
+                    if tags:
+                        element.tags = list(tags)
+                    state = state_by_cell.get(index)
+                    if state is not None:
+                        apply_element_state(element, state)
+                    new_grid.set_element(y, x, element)
+                else:
+                    missing_keys.add(keys[code])
+            index += 1
+    for key in sorted(missing_keys):
+        print(f"Warning: Element class for key '{key}' not found during loading.")
+    return new_grid
+
+
+def is_json_path(path):
+    """True if a save path selects the JSON format (by its extension)."""
+    return path.lower().endswith(JSON_EXTENSION)
+
+
+def save_grid(grid, path):
+    """Writes the grid state to a file: JSON for '.json' paths, the binary format otherwise."""
+    if is_json_path(path):
+        grid_data = grid_to_dict(grid)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(grid_data, f, ensure_ascii=False, indent=4)
+    else:
+        with open(path, 'wb') as f:
+            f.write(grid_to_bytes(grid))
+
+
+def load_grid(path, grid_class):
+    """Reads a grid written by save_grid(). The format is detected from the file contents."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data.startswith(BINARY_MAGIC):
+        return bytes_to_grid(data, grid_class)
+    try:
+        grid_data = json.loads(data.decode('utf-8'))
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError(f"Not a valid save file (neither binary nor JSON): {e}")
+    return dict_to_grid(grid_data, grid_class)
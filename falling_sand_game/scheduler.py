@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+import time
+
+from .config import DEFAULT_TICK_RATE, DEFAULT_RENDER_RATE, MAX_CATCHUP_TICKS
+
+
+class FrameScheduler:
+    """
+    Fixed-timestep scheduler with independent simulation and render rates.
+
+    Simulation time is accumulated from a monotonic clock and consumed in fixed
+    steps of 1/tick_rate, so physics speed does not depend on how long drawing
+    takes. If the loop falls behind, at most `max_catchup` steps are run per loop
+    iteration and the remaining backlog is dropped (avoids the "spiral of death"
+    where catching up makes each iteration slower still). Frames are rendered at
+    most render_rate times per second.
+    """
+
+    def __init__(self, tick_rate=DEFAULT_TICK_RATE, render_rate=DEFAULT_RENDER_RATE,
+                 max_catchup=MAX_CATCHUP_TICKS, clock=time.monotonic):
+        self._clock = clock
+        self.max_catchup = max(1, int(max_catchup))
+        self.set_tick_rate(tick_rate)
+        self.set_render_rate(render_rate)
+        self.reset()
+
+    def reset(self):
+        """Restarts timing from now (e.g. after blocking for command input)."""
+        now = self._clock()
+        self._last_time = now
+        self._accumulator = 0.0
+        self._next_render = now
+        self.dropped_ticks = 0 # Ticks skipped because the simulation could not keep up
+
+    @property
+    def tick_rate(self):
+        return self._tick_rate
+
+    @property
+    def render_rate(self):
+        return self._render_rate
+
+    def set_tick_rate(self, tick_rate):
+        """Sets simulation ticks per second."""
+        self._tick_rate = max(1.0, float(tick_rate))
+        self._tick_interval = 1.0 / self._tick_rate
+
+    def set_render_rate(self, render_rate):
+        """Sets rendered frames per second."""
+        self._render_rate = max(1.0, float(render_rate))
+        self._render_interval = 1.0 / self._render_rate
+
+    def ticks_due(self):
+        """
+        Advances the clock and returns how many simulation ticks to run now
+        (0..max_catchup). Excess backlog beyond max_catchup is dropped.
+        """
+        now = self._clock()
+        self._accumulator += now - self._last_time
+        self._last_time = now
+        ticks = int(self._accumulator / self._tick_interval)
+        if ticks > self.max_catchup:
+            self.dropped_ticks += ticks - self.max_catchup
+            ticks = self.max_catchup
+            self._accumulator = 0.0 # Forget the backlog instead of chasing it
+        else:
+            self._accumulator -= ticks * self._tick_interval
+        return ticks
+
+    def render_due(self):
+        """Returns True if a frame should be drawn now, and schedules the next one."""
+        now = self._clock()
+        if now < self._next_render:
+            return False
+        self._next_render += self._render_interval
+        if self._next_render <= now:
+            # Rendering fell behind; don't try to draw the missed frames
+            self._next_render = now + self._render_interval
+        return True
+
+    def time_until_next(self):
+        """Seconds until the next tick or frame is due (0 if one is due already)."""
+        now = self._clock()
+        until_tick = self._tick_interval - self._accumulator - (now - self._last_time)
+        until_render = self._next_render - now
+        return max(0.0, min(until_tick, until_render))
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+from .grid import Grid
+from .typed_grid import TypedGrid
+from .kernels import CodeTables, gas_pass, powder_pass, liquid_pass
+from .rng import SimulationRandom, STREAM_ORDER, STREAM_KERNEL
+# Import the manager instance directly
+from .element_manager import element_manager
+from .config import GRID_BACKEND, DEFAULT_TICK_RATE
+
+# Available grid storage backends, selectable by name
+GRID_BACKENDS = {
+    "object": Grid,
+    "typed": TypedGrid,
+}
+
+class Simulation:
+    """
+    Owns the grid and runs the element update loop.
+    Has no curses/UI state, so it can be driven by the game or headless (see headless.py).
+    """
+
+    def __init__(self, height, width, grid_backend=GRID_BACKEND, seed=None):
+        # Pick the grid storage backend (unknown names fall back to the object grid)
+        self.grid_class = GRID_BACKENDS.get(grid_backend, Grid)
+        # Seeded per-chunk random streams, handed to element code as grid.rng
+        self.rng = SimulationRandom(seed)
+        # Pass the manager instance to the Grid constructor
+        self.grid = self.grid_class(max(1, height), max(1, width), element_manager)
+        # Per-type lookup tables for the batched kernels (typed backend only)
+        self.kernel_tables = CodeTables(element_manager)
+        self.tick_count = 0 # Number of simulation steps run so far
+
+    @property
+    def grid(self):
+        return self._grid
+
+    @grid.setter
+    def grid(self, new_grid):
+        new_grid.rng = self.rng # Element code draws from the simulation's streams
+        self._grid = new_grid
+
+    @property
+    def seed(self):
+        return self.rng.seed
+
+    def set_seed(self, seed=None):
+        """Restarts the random streams from `seed` (a random seed if None)."""
+        self.rng.set_seed(seed)
+
+    def resize(self, new_height, new_width):
+        """Replaces the grid with one of the new size, keeping the overlapping elements."""
+        old_grid = self.grid
+        # Create a new grid with the same backend, passing the manager instance
+        new_grid = self.grid_class(max(1, new_height), max(1, new_width), element_manager)
+        # Copy old elements, considering the potentially changed size
+        for r in range(min(old_grid.height, new_grid.height)):
+            for c in range(min(old_grid.width, new_grid.width)):
+                element = old_grid.get_element(r, c)
+                if element:
+                    # Use the factory method on the NEW grid to create elements
+                    # Preserve tags when resizing
+                    new_element = new_grid.create_element(element.key, r, c)
+                    if new_element:
+                        new_element.tags = list(element.tags) # Copy tags
+                        new_grid.set_element(r, c, new_element)
+        self.grid = new_grid
+
+    def is_idle(self):
+        """
+        True if the world has settled: no cell changed recently and no element that acts
+        on its own (always_active: emitters, timers, random events) is on the grid.
+        """
+        return self.grid.is_quiescent()
+
+    def update(self):
+        """Runs one simulation step."""
+        # 1. Start a new frame epoch (marks every element unprocessed in O(1))
+        epoch = self.grid.advance_epoch()
+
+        # 2. Iterate and update elements
+        top_down = False # Default: bottom-up
+
+        # Simple check: if 'a' (AntiGravityPowder) is loaded, alternate directions
+        # (every second at the default tick rate; counted in ticks to stay reproducible)
+        if 'a' in element_manager.get_registry():
+             if (self.tick_count // DEFAULT_TICK_RATE) % 2 == 0:
+                  top_down = True
+
+        self.rng.begin_tick(self.tick_count)
+
+        # Only cells inside awake chunks are visited; settled chunks are skipped entirely
+        active_columns = self.grid.begin_tick()
+
+        # With the typed backend, plain powders, liquids and gases are moved by the batched kernels
+        tables = None
+        if isinstance(self.grid, TypedGrid):
+            tables = self.kernel_tables
+            tables.refresh()
+
+        self._update_rows(active_columns, epoch, top_down, tables)
+
+        # 3. Let chunks without changes move towards sleep
+        self.grid.end_tick()
+        self.tick_count += 1
+
+    def _update_rows(self, active_columns, epoch, top_down, tables):
+        """
+        Calls update() (or only run_interactions() for batched types) on each element.
+        Before an element runs, the random stream of its chunk is selected.
+
+        With the typed backend the batched kernels run row by row inside this pass, in
+        the same order as the elements: gases of a row move before its elements run
+        (like Gas.update, only gases that could not move interact), powders and liquids
+        move right after. A neighbour in an already visited row is then processed,
+        and one in a row still ahead is not, exactly like with the object backend,
+        so reactions that skip processed neighbours happen as often on both backends.
+        The kernels draw from the kernel stream of the row's chunk row.
+        """
+        grid = self.grid
+        chunk_size = grid.chunk_size
+        chunk_cols = grid.chunk_cols
+        rng = self.rng
+        select_stream = rng.select
+        current_chunk = -1
+        if tables is not None:
+            batched = tables.batched
+            interacts = tables.interacts
+            width = grid.width
+            tick = self.tick_count
+
+        if top_down:
+            update_order = range(grid.height)
+        else:
+            update_order = range(grid.height - 1, -1, -1)
+
+        for y in update_order:
+            columns = active_columns[y // chunk_size]
+            if not columns:
+                continue # Whole chunk row is asleep
+            if tables is not None:
+                kernel_rng = rng.stream(STREAM_KERNEL, y // chunk_size)
+                self._run_kernel(gas_pass, tables, active_columns, epoch, tick, y, kernel_rng, top_down)
+                codes = grid.codes # The code plane may have been widened
+                row_start = y * width
+            x_indices = list(columns)
+            rng.stream(STREAM_ORDER, y // chunk_size).shuffle(x_indices)
+            chunk_base = (y // chunk_size) * chunk_cols
+            for x in x_indices:
+                if tables is not None:
+                    code = codes[row_start + x]
+                    if not code or (batched[code] and not interacts[code]):
+                        continue # Empty, or moved entirely by the kernels
+                element = grid.get_element(y, x)
+                if element and element.processed_epoch != epoch and element.y == y and element.x == x:
+                    chunk = chunk_base + x // chunk_size
+                    if chunk != current_chunk:
+                        select_stream(chunk)
+                        current_chunk = chunk
+                    try:
+                        if tables is not None and batched[code]:
+                            element.run_interactions(grid)
+                        else:
+                            element.update(grid)
+                    except Exception as e:
+                        raise RuntimeError(f"Error updating element {element.key} at ({x},{y}): {e}") from e
+            if tables is not None:
+                self._run_kernel(powder_pass, tables, active_columns, epoch, tick, y, kernel_rng, top_down)
+                self._run_kernel(liquid_pass, tables, active_columns, epoch, tick, y, kernel_rng, top_down)
+
+    def _run_kernel(self, kernel, tables, active_columns, epoch, tick, y, rng, top_down):
+        """Runs a batched movement kernel on row y."""
+        try:
+            kernel(self.grid, tables, active_columns, epoch, tick, y, y + 1, rng, top_down)
+        except Exception as e:
+            raise RuntimeError(f"Error in movement kernels: {e}") from e
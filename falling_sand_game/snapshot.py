@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+from array import array
+
+from .element_manager import element_manager
+
+_NO_EXTRA = ((), ()) # (tags, state) of a cell without either
+
+
+def build_element(grid, key, y, x, tags, state):
+    """
+    Creates the element for a cell from its key, tags tuple and state_fields values
+    tuple (as stored by snapshots and history entries). Returns None for unknown keys.
+    """
+    element = grid.create_element(key, y, x)
+    if element is not None:
+        if tags:
+            element.tags = list(tags)
+        if state:
+            for name, value in zip(element.state_fields, state):
+                setattr(element, name, value)
+            element.on_state_loaded()
+    return element
+
+
+class ChunkImage:
+    """
+    Frozen contents of one chunk: a compact code per cell plus the few cells that
+    carry tags or element state. Never modified once built, so any number of
+    snapshots can share it.
+    """
+    __slots__ = ("codes", "extras")
+
+    def __init__(self, codes, extras):
+        self.codes = codes   # array('H'): key code per cell (chunk row-major), 0 = empty
+        self.extras = extras # Tuple of (cell, tags tuple, state values tuple)
+
+
+class GridSnapshot:
+    """A point-in-time copy of a grid, made of (shared) chunk images."""
+    __slots__ = ("height", "width", "keys", "chunks")
+
+    def __init__(self, height, width, keys, chunks):
+        self.height = height
+        self.width = width
+        self.keys = keys     # Code -> element key (append-only list shared by the store)
+        self.chunks = chunks # One ChunkImage per grid chunk
+
+
+class SnapshotStore:
+    """
+    Takes and restores copy-on-write snapshots of the live grid.
+
+    The store remembers the last image it built for every chunk of the live grid.
+    A chunk that has not changed since (see Grid.chunk_unchanged_since) reuses that
+    image, so a snapshot of a mostly settled world costs O(chunks) and snapshots
+    share all chunks they have in common. Restoring likewise rewrites only chunks
+    whose live contents differ from the snapshot.
+    """
+
+    def __init__(self):
+        self._keys = [None] # Code -> element key, code 0 = empty
+        self._key_codes = {}
+        self._grid = None   # Live grid the cached images belong to
+        self._images = []   # Last image per chunk of that grid
+        self._image_stamps = [] # Grid.flush_changes() stamp at which each image was built
+
+    def _track(self, grid):
+        """Starts caching chunk images for `grid` (drops the cache of a previous grid)."""
+        if grid is not self._grid or len(self._images) != grid.chunk_count:
+            self._grid = grid
+            self._images = [None] * grid.chunk_count
+            self._image_stamps = [0] * grid.chunk_count
+
+    def capture(self, grid):
+        """Returns a GridSnapshot of the grid, re-encoding only chunks that changed."""
+        self._track(grid)
+        stamp = grid.flush_changes()
+        images = self._images
+        image_stamps = self._image_stamps
+        for index in range(grid.chunk_count):
+            image = images[index]
+            if image is None or not grid.chunk_unchanged_since(index, image_stamps[index]):
+                images[index] = self._encode_chunk(grid, index)
+                image_stamps[index] = stamp
+        return GridSnapshot(grid.height, grid.width, self._keys, list(images))
+
+    def restore(self, snapshot, grid):
+        """
+        Makes the grid match the snapshot. Returns the grid to use: `grid` itself, or a
+        new grid of the same class if the snapshot has different dimensions.
+        """
+        if grid.height != snapshot.height or grid.width != snapshot.width:
+            grid = grid.__class__(snapshot.height, snapshot.width, element_manager)
+        tracked = grid is self._grid
+        decoded = []
+        for index, image in enumerate(snapshot.chunks):
+            # The live chunk still holds exactly what this image was built from
+            if tracked and self._images[index] is image and grid.chunk_unchanged_since(index, self._image_stamps[index]):
+                continue
+            self._decode_chunk(grid, index, image, snapshot.keys)
+            decoded.append(index)
+        # The rewritten chunks now match the snapshot's images: share them from here on
+        self._track(grid)
+        stamp = grid.flush_changes()
+        for index in decoded:
+            self._images[index] = snapshot.chunks[index]
+            self._image_stamps[index] = stamp
+        return grid
+
+    def _code_for(self, key):
+        """Interns an element key."""
+        code = self._key_codes.get(key)
+        if code is None:
+            code = self._key_codes[key] = len(self._keys)
+            self._keys.append(key)
+        return code
+
+    def _encode_chunk(self, grid, chunk_index):
+        """Builds the image of one chunk."""
+        y_start, y_end, x_start, x_end = grid.chunk_bounds(chunk_index)
+        codes = array('H')
+        extras = []
+        key_codes = self._key_codes
+        cell = 0
+        for y in range(y_start, y_end):
+            row = grid.get_row(y)
+            for x in range(x_start, x_end):
+                element = row[x]
+                if element is None:
+                    codes.append(0)
+                else:
+                    code = key_codes.get(element.key)
+                    if code is None:
+                        code = self._code_for(element.key)
+                    codes.append(code)
+                    fields = element.state_fields
+                    if element.tags or fields:
+                        extras.append((cell, tuple(element.tags), tuple(getattr(element, name) for name in fields)))
+                cell += 1
+        return ChunkImage(codes, tuple(extras))
+
+    def _decode_chunk(self, grid, chunk_index, image, keys):
+        """Rewrites one chunk of the grid from an image (with new element objects)."""
+        y_start, y_end, x_start, x_end = grid.chunk_bounds(chunk_index)
+        extras = {cell: (tags, state) for cell, tags, state in image.extras}
+        codes = image.codes
+        cell = 0
+        for y in range(y_start, y_end):
+            for x in range(x_start, x_end):
+                code = codes[cell]
+                if code == 0:
+                    if grid.get_element(y, x) is not None:
+                        grid.set_element(y, x, None)
+                else:
+                    tags, state = extras.get(cell, _NO_EXTRA)
+                    grid.set_element(y, x, build_element(grid, keys[code], y, x, tags, state))
+                cell += 1
@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+"""
+Seekable timeline of a simulation run: a full keyframe every K ticks plus, for
+every tick, the cells that changed (flat index and new type code). Any recorded
+tick can be rebuilt by loading the nearest keyframe at or before it and applying
+the following deltas, without re-simulating.
+
+Deltas are found with the grid's chunk change tracking (see Grid.flush_changes
+and Grid.chunk_unchanged_since): only chunks changed or simulated since the
+previous tick are compared with the timeline's copy of the grid, so a settled
+world costs next to nothing to record.
+
+File layout (append-only, little-endian): a header "FST\\0", version (u8), then
+records of kind (u8), tick (u64), payload length (u32) and the payload:
+    K  keyframe: the grid in the binary save format (see savefile.py)
+    T  type: UTF-8 element key of the next timeline code (codes start at 1, 0 = empty)
+    D  delta: zlib( cell count (u32), flat cell indices (u32 each), type codes (u16 each) )
+A D record with tick t holds the changes that brought the grid from tick t - 1 to t
+(including edits made between the two ticks). Ticks without changes have no record.
+Deltas store type codes only: tags and element state are exact at keyframes, while
+cells changed since are rebuilt as fresh elements of their type.
+"""
+import bisect
+import struct
+import sys
+import zlib
+from array import array
+
+from .savefile import grid_to_bytes, bytes_to_grid, migrate_key
+from .config import TIMELINE_KEYFRAME_TICKS
+
+TIMELINE_MAGIC = b"FST\0"
+TIMELINE_VERSION = 2
+# Save version whose element keys a timeline version uses (see savefile.migrate_key)
+_KEY_VERSIONS = {1: 2, 2: 3}
+TIMELINE_EXTENSION = ".fst"
+_FILE_HEADER = struct.Struct("<4sB")
+_RECORD_HEADER = struct.Struct("<cQI")
+_COUNT = struct.Struct("<I")
+_KEYFRAME = b"K"
+_TYPE = b"T"
+_DELTA = b"D"
+
+
+class Timeline:
+    """
+    A timeline file, either being recorded (Timeline(path)) or opened for seeking
+    (Timeline.open(path)). Both can seek; only a recording timeline accepts record().
+    Recording refuses to replace an existing file (FileExistsError) unless
+    `overwrite` is set.
+
+    The index kept in memory lists the tick and file offset of every keyframe, so
+    seek() finds its starting keyframe by binary search and then reads at most one
+    keyframe interval of deltas.
+    """
+
+    def __init__(self, path, keyframe_interval=TIMELINE_KEYFRAME_TICKS, overwrite=False, _file=None):
+        self.path = path
+        self.keyframe_interval = max(1, int(keyframe_interval))
+        self.keys = [None] # Timeline code -> element key, code 0 = empty
+        self._key_codes = {}
+        self._keyframe_ticks = [] # Index: tick of every keyframe, ascending
+        self._keyframe_offsets = [] # File offset of each keyframe record
+        self.first_tick = None
+        self.last_tick = None
+        self._file = _file
+        # Recording state: the grid being followed and its contents as last recorded
+        self._grid = None
+        self._shadow = None # array('H') of timeline codes, row-major
+        self._shadow_rows = None # Per row, the list of element objects
+        self._stamp = 0 # Grid.flush_changes() stamp of the last record() call
+        self._last_keyframe = None
+        if _file is None:
+            self._file = open(path, 'w+b' if overwrite else 'x+b')
+            self._file.write(_FILE_HEADER.pack(TIMELINE_MAGIC, TIMELINE_VERSION))
+
+    @classmethod
+    def open(cls, path):
+        """Opens an existing timeline file for seeking (rebuilds the index from the record headers)."""
+        f = open(path, 'rb')
+        try:
+            header = f.read(_FILE_HEADER.size)
+            if len(header) < _FILE_HEADER.size:
+                raise ValueError("File too short for a timeline.")
+            magic, version = _FILE_HEADER.unpack(header)
+            if magic != TIMELINE_MAGIC:
+                raise ValueError("Not a timeline file.")
+            if version not in _KEY_VERSIONS:
+                raise ValueError(f"Unsupported timeline version {version}.")
+            timeline = cls(path, _file=f)
+            offset = _FILE_HEADER.size
+            while True:
+                record_header = f.read(_RECORD_HEADER.size)
+                if len(record_header) < _RECORD_HEADER.size:
+                    break # End of file (or a record cut off by a crash)
+                kind, tick, length = _RECORD_HEADER.unpack(record_header)
+                if kind == _TYPE:
+                    timeline._add_key(migrate_key(f.read(length).decode('utf-8'), _KEY_VERSIONS[version]))
+                else:
+                    f.seek(length, 1)
+                    if kind == _KEYFRAME:
+                        timeline._index_keyframe(tick, offset)
+                    timeline._note_tick(tick)
+                offset += _RECORD_HEADER.size + length
+        except UnicodeDecodeError as e:
+            f.close()
+            raise ValueError(f"Corrupt timeline: {e}")
+        except Exception:
+            f.close()
+            raise
+        if not timeline._keyframe_ticks:
+            f.close()
+            raise ValueError("Timeline has no keyframe.")
+        return timeline
+
+    @property
+    def recording(self):
+        """True while the timeline follows a grid (record() accepts ticks)."""
+        return self._grid is not None
+
+    @property
+    def keyframe_count(self):
+        return len(self._keyframe_ticks)
+
+    @property
+    def size(self):
+        """File size in bytes."""
+        return self._file.seek(0, 2)
+
+    def _add_key(self, key):
+        code = self._key_codes[key] = len(self.keys)
+        self.keys.append(key)
+        return code
+
+    def _index_keyframe(self, tick, offset):
+        self._keyframe_ticks.append(tick)
+        self._keyframe_offsets.append(offset)
+
+    def _note_tick(self, tick):
+        if self.first_tick is None:
+            self.first_tick = tick
+        self.last_tick = tick
+
+    def _write(self, kind, tick, payload):
+        """Appends a record, returns its offset."""
+        f = self._file
+        offset = f.seek(0, 2)
+        f.write(_RECORD_HEADER.pack(kind, tick, len(payload)))
+        f.write(payload)
+        return offset
+
+    def _code_for(self, key):
+        """Interns an element key, writing its T record the first time."""
+        code = self._add_key(key)
+        self._write(_TYPE, 0, key.encode('utf-8'))
+        return code
+
+    def start(self, grid, tick):
+        """Starts following `grid` (writes a keyframe of it at `tick`)."""
+        self._write_keyframe(grid, tick)
+
+    def _write_keyframe(self, grid, tick):
+        offset = self._write(_KEYFRAME, tick, grid_to_bytes(grid))
+        self._index_keyframe(tick, offset)
+        self._note_tick(tick)
+        self._last_keyframe = tick
+        # Rebuild the copy of the grid contents
+        key_codes = self._key_codes
+        shadow = array('H')
+        shadow_rows = []
+        for y in range(grid.height):
+            row = grid.get_row(y)
+            shadow_rows.append(list(row))
+            for element in row:
+                if element is None:
+                    shadow.append(0)
+                else:
+                    code = key_codes.get(element.key)
+                    shadow.append(code if code is not None else self._code_for(element.key))
+        self._grid = grid
+        self._shadow = shadow
+        self._shadow_rows = shadow_rows
+        self._stamp = grid.flush_changes()
+
+    def record(self, grid, tick):
+        """
+        Records the grid after the simulation reached `tick` (ticks must increase):
+        a keyframe every keyframe_interval ticks (or when the grid was replaced),
+        else the changed cells.
+        """
+        if grid is not self._grid or tick - self._last_keyframe >= self.keyframe_interval:
+            self._write_keyframe(grid, tick)
+            return
+        stamp = grid.flush_changes()
+        previous_stamp = self._stamp
+        self._stamp = stamp
+        shadow = self._shadow
+        shadow_rows = self._shadow_rows
+        key_codes = self._key_codes
+        width = grid.width
+        indices = array('I')
+        codes = array('H')
+        size = grid.chunk_size
+        cols = grid.chunk_cols
+        unchanged = grid.chunk_unchanged_since
+        for cy in range((grid.height + size - 1) // size):
+            # Column spans of the changed chunks in this chunk row (adjacent chunks merged)
+            spans = []
+            for cx in range(cols):
+                if unchanged(cy * cols + cx, previous_stamp):
+                    continue
+                if spans and spans[-1][1] == cx * size:
+                    spans[-1][1] = min(width, (cx + 1) * size)
+                else:
+                    spans.append([cx * size, min(width, (cx + 1) * size)])
+            if not spans:
+                continue
+            for y in range(cy * size, min(grid.height, (cy + 1) * size)):
+                row = grid.get_row(y)
+                shadow_row = shadow_rows[y]
+                base = y * width
+                for x_start, x_end in spans:
+                    # Compared by element identity first (a C-level list comparison);
+                    # only cells holding another object are looked at one by one
+                    if row[x_start:x_end] == shadow_row[x_start:x_end]:
+                        continue
+                    for x in range(x_start, x_end):
+                        element = row[x]
+                        if element is shadow_row[x]:
+                            continue
+                        shadow_row[x] = element
+                        if element is None:
+                            code = 0
+                        else:
+                            code = key_codes.get(element.key)
+                            if code is None:
+                                code = self._code_for(element.key)
+                        if code != shadow[base + x]: # Not just another element of the same type
+                            shadow[base + x] = code
+                            indices.append(base + x)
+                            codes.append(code)
+        if indices:
+            if sys.byteorder == 'big':
+                indices.byteswap() # The file stores little-endian values
+                codes.byteswap()
+            payload = _COUNT.pack(len(indices)) + indices.tobytes() + codes.tobytes()
+            self._write(_DELTA, tick, zlib.compress(payload, 1))
+        self._note_tick(tick)
+
+    def stop(self):
+        """Stops following the grid (the file stays open for seeking)."""
+        self._grid = None
+        self._shadow = None
+        self._shadow_rows = None
+        self._file.flush()
+
+    def close(self):
+        self.stop()
+        self._file.close()
+
+    def seek(self, tick, grid_class):
+        """Rebuilds the grid as it was at `tick` (a new grid of `grid_class`). Raises ValueError if not recorded."""
+        if not self._keyframe_ticks or tick < self._keyframe_ticks[0] or tick > self.last_tick:
+            raise ValueError(f"Tick {tick} is not on the timeline ({self.first_tick}-{self.last_tick}).")
+        position = bisect.bisect_right(self._keyframe_ticks, tick) - 1
+        f = self._file
+        f.flush()
+        f.seek(self._keyframe_offsets[position])
+        kind, keyframe_tick, length = _RECORD_HEADER.unpack(f.read(_RECORD_HEADER.size))
+        grid = bytes_to_grid(f.read(length), grid_class)
+
+        # Collect the last code of every cell changed up to the tick, then set each once
+        changes = {}
+        while True:
+            record_header = f.read(_RECORD_HEADER.size)
+            if len(record_header) < _RECORD_HEADER.size:
+                break
+            kind, record_tick, length = _RECORD_HEADER.unpack(record_header)
+            if kind == _KEYFRAME or (kind == _DELTA and record_tick > tick):
+                break
+            payload = f.read(length)
+            if kind != _DELTA:
+                continue
+            try:
+                payload = zlib.decompress(payload)
+            except zlib.error as e:
+                raise ValueError(f"Corrupt timeline delta at tick {record_tick}: {e}")
+            (count,) = _COUNT.unpack_from(payload)
+            indices = array('I')
+            indices.frombytes(payload[_COUNT.size:_COUNT.size + 4 * count])
+            codes = array('H')
+            codes.frombytes(payload[_COUNT.size + 4 * count:])
+            if sys.byteorder == 'big':
+                indices.byteswap()
+                codes.byteswap()
+            changes.update(zip(indices, codes))
+
+        keys = self.keys
+        width = grid.width
+        for index, code in changes.items():
+            y, x = divmod(index, width)
+            grid.set_element(y, x, grid.create_element(keys[code], y, x) if code else None)
+        f.seek(0, 2)
+        return grid
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+from array import array
+
+from .grid import Grid
+
+class TypedGrid(Grid):
+    """
+    Grid backend that keeps a dense array of interned element-type codes next to
+    the element objects.
+
+    The cells are kept row-major in flat storage (index = y * width + x):
+      - `codes`: array of uint8 (or uint16 with more than 255 element types), 0 = empty
+      - `cells`: the Element objects, kept for the get_element/set_element facade
+
+    Element modules keep working unchanged through the facade, since they rely on
+    per-instance state (tags, timers, lit/burning flags) and object identity.
+    Hot kernels read and compare the raw `codes` array instead of going through
+    per-cell method calls and attribute lookups.
+
+    This backend saves no memory, and so far no time either (see the README).
+    Every non-empty cell still owns its Element object (about 160 bytes), and
+    per-cell state stays on those objects (there are no per-cell state arrays).
+    The code plane and the chunk maps add about 6 bytes per cell, so a full grid
+    takes slightly more memory than with the object backend.
+    """
+
+    def clear(self):
+        """Clears the entire grid, setting all cells to empty."""
+        size = self._height * self._width
+        # uint8 codes are enough unless more than 255 element types are interned
+        typecode = 'B' if self._element_manager is None or self._element_manager.get_type_code_count() <= 256 else 'H'
+        self._codes = array(typecode, bytes(size * array(typecode).itemsize))
+        self._cells = [None] * size
+        self._reset_chunks()
+        self._build_chunk_maps()
+
+    def _build_chunk_maps(self):
+        """
+        Precomputes, per flat cell index, the chunk it belongs to and whether it lies
+        on a chunk border. Lets swap_cells() skip the general _note_change() path for
+        the common case of two cells inside the same chunk.
+        """
+        size = self._chunk_size
+        cols = self._chunk_cols
+        width = self._width
+        chunk_of = array('I', bytes(4 * self._height * width))
+        on_border = bytearray(self._height * width)
+        index = 0
+        for y in range(self._height):
+            cy, ry = divmod(y, size)
+            row_border = ry == 0 or ry == size - 1
+            for x in range(width):
+                cx, rx = divmod(x, size)
+                chunk_of[index] = cy * cols + cx
+                on_border[index] = row_border or rx == 0 or rx == size - 1
+                index += 1
+        self._chunk_of = chunk_of
+        self._on_border = on_border
+
+    @property
+    def codes(self):
+        """The flat array of type codes (row-major). Read-only for callers outside the grid."""
+        return self._codes
+
+    @property
+    def cells(self):
+        """The flat list of element objects (row-major). Read-only for callers outside the grid."""
+        return self._cells
+
+    def index_of(self, y, x):
+        """Returns the flat index of (y, x). Does not check bounds."""
+        return y * self._width + x
+
+    def get_code(self, y, x):
+        """Gets the type code at (y, x). Returns 0 if empty or out of bounds."""
+        if 0 <= y < self._height and 0 <= x < self._width:
+            return self._codes[y * self._width + x]
+        return 0
+
+    def get_row_codes(self, y):
+        """Returns a copy of the type codes of row y as an array."""
+        start = y * self._width
+        return self._codes[start:start + self._width]
+
+    def get_element(self, y, x):
+        """Gets the element object at (y, x). Returns None if empty or out of bounds."""
+        if 0 <= y < self._height and 0 <= x < self._width:
+            return self._cells[y * self._width + x]
+        return None
+
+    def get_row(self, y):
+        """Returns a copy of the element objects of row y."""
+        start = y * self._width
+        return self._cells[start:start + self._width]
+
+    def set_element(self, y, x, element):
+        """
+        Sets the element object at (y, x), keeping the type code plane in sync.
+        If element is None, clears the cell.
+        Returns True if successful, False otherwise (e.g., out of bounds).
+        """
+        if 0 <= y < self._height and 0 <= x < self._width:
+            index = y * self._width + x
+            # Wake the chunk (and track always-active elements) before overwriting
+            self._note_change(y, x, self._cells[index], element)
+            if element:
+                element.y = y
+                element.x = x
+                element.frame_clock = self._clock
+                self._codes[index] = self._code_for(element)
+            else:
+                self._codes[index] = 0
+            self._cells[index] = element
+            return True
+        return False
+
+    def set_span(self, y, x_start, elements):
+        """
+        Sets a run of cells of row y, from x_start on, to `elements` (None = empty),
+        writing the objects and the type codes as slices. The run must lie inside the grid.
+        Returns the replaced elements as a list.
+        """
+        if not elements:
+            return []
+        start = y * self._width + x_start
+        end = start + len(elements)
+        replaced = self._cells[start:end]
+        self._note_span(y, x_start, x_start + len(elements), replaced, elements)
+        codes = []
+        clock = self._clock
+        last_class = last_code = None # Runs usually hold one element type
+        for x, element in enumerate(elements, x_start):
+            if element:
+                element.y = y
+                element.x = x
+                element.frame_clock = clock
+                if element.__class__ is not last_class:
+                    last_class = element.__class__
+                    last_code = self._code_for(element)
+                codes.append(last_code)
+            else:
+                codes.append(0)
+        # _code_for() may have widened the code plane, so it is looked up afterwards
+        self._codes[start:end] = array(self._codes.typecode, codes)
+        self._cells[start:end] = elements
+        return replaced
+
+    def _match_row(self, y, x_start, x_end, target):
+        """Returns a bytearray over [x_start, x_end) of row y: 1 where the cell holds the type of `target` (None = empty)."""
+        code = self._code_for(target) if target is not None else 0
+        start = y * self._width
+        codes = self._codes[start + x_start:start + x_end]
+        if codes.typecode == 'B':
+            # Byte codes map to 0/1 through a translation table, without a Python loop
+            table = bytearray(256)
+            table[code] = 1
+            return bytearray(codes.tobytes().translate(table))
+        return bytearray(value == code for value in codes)
+
+    def swap_cells(self, index_a, index_b):
+        """
+        Swaps the contents of two cells given by flat index (either may be empty).
+        Used by the batched kernels; keeps codes, objects, coordinates and chunks in sync.
+        """
+        width = self._width
+        cells = self._cells
+        codes = self._codes
+        element_a = cells[index_a]
+        element_b = cells[index_b]
+        ya, xa = divmod(index_a, width)
+        yb, xb = divmod(index_b, width)
+        chunk = self._chunk_of[index_a]
+        if chunk == self._chunk_of[index_b] and not (self._on_border[index_a] or self._on_border[index_b]):
+            # Same chunk, away from its borders: per-chunk counts are unchanged
+            self._chunk_dirty[chunk] = 1
+        else:
+            self._note_change(ya, xa, element_a, element_b)
+            self._note_change(yb, xb, element_b, element_a)
+        cells[index_a] = element_b
+        cells[index_b] = element_a
+        codes[index_a], codes[index_b] = codes[index_b], codes[index_a]
+        if element_a:
+            element_a.y, element_a.x = yb, xb
+        if element_b:
+            element_b.y, element_b.x = ya, xa
+
+    def swap_elements(self, ya, xa, yb, xb):
+        """Swaps the contents of cells (ya, xa) and (yb, xb); see Grid.swap_elements()."""
+        height = self._height
+        width = self._width
+        if not (0 <= ya < height and 0 <= xa < width and 0 <= yb < height and 0 <= xb < width):
+            return False
+        self.swap_cells(ya * width + xa, yb * width + xb)
+        return True
+
+    def _code_for(self, element):
+        """Gets the type code for an element instance, interning its class if needed."""
+        code = element.type_code
+        manager = self._element_manager
+        # 'type_code' is inherited by subclasses, so confirm it belongs to this exact class
+        if code and manager.code_classes[code] is element.__class__:
+            return code
+        code = manager.intern_type(element.__class__)
+        if code > 255 and self._codes.typecode == 'B':
+            # Widen the code plane once more than 255 element types are in use
+            self._codes = array('H', self._codes)
+        return code
+
+    def get_all_elements(self):
+        """Generator yielding all non-None elements in the grid."""
+        for element in self._cells:
+            if element:
+                yield element
+
+    def __iter__(self):
+        """Allows iterating through rows of the grid (each row is a list copy)."""
+        width = self._width
+        for start in range(0, self._height * width, width):
+            yield self._cells[start:start + width]
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+import contextlib
+import io
+import os
+import random
+
+import pytest
+
+from falling_sand_game.element_manager import element_manager
+from falling_sand_game.game import Game
+
+ELEMENT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           "falling_sand_game", "elements")
+BACKENDS = ("object", "typed")
+
+# Sand, wall, water, lava, oil, fire, smoke and steam: falling, flowing, rising and reacting cells
+SCENE_KEYS = "S#WLIFKG"
+
+
+@pytest.fixture(scope="session", autouse=True)
+def elements():
+    """Loads the element classes once (quietly) for the whole test session."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        element_manager.load_elements(ELEMENT_DIR)
+    return element_manager
+
+
+def fill_scene(grid, seed, density=0.3):
+    """Scatters SCENE_KEYS over the grid, reproducibly for a given seed."""
+    rng = random.Random(seed)
+    for y in range(grid.height):
+        for x in range(grid.width):
+            if rng.random() < density:
+                key = rng.choice(SCENE_KEYS)
+                grid.set_element(y, x, grid.create_element(key, y, x))
+
+
+def cell_keys(grid):
+    """The element key of every cell (None = empty), row-major."""
+    return [element.key if element else None
+            for y in range(grid.height) for element in grid.get_row(y)]
+
+
+@pytest.fixture
+def make_game():
+    """Builds a small game with a seeded simulation on the given backend."""
+    def make(backend="object", seed=1, scene_seed=None):
+        game = Game(30, 60, 0.7, grid_backend=backend, seed=seed)
+        if scene_seed is not None:
+            fill_scene(game.grid, scene_seed)
+        return game
+    return make
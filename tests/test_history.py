@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from falling_sand_game.command import CommandProcessor
+from falling_sand_game.savefile import grid_to_bytes
+from conftest import BACKENDS
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_fill_undo_redo(make_game, backend):
+    game = make_game(backend)
+    grid = game.grid
+    # A closed box of wall, so the fill stays inside it
+    for x in range(2, 12):
+        grid.set_element(2, x, grid.create_element('#', 2, x))
+        grid.set_element(9, x, grid.create_element('#', 9, x))
+    for y in range(3, 9):
+        grid.set_element(y, 2, grid.create_element('#', y, 2))
+        grid.set_element(y, 11, grid.create_element('#', y, 11))
+    grid.set_element(5, 5, grid.create_element('S', 5, 5))
+    processor = CommandProcessor(game, None)
+    game.cursor_y, game.cursor_x = 4, 4
+    before = grid_to_bytes(game.grid)
+
+    processor.process_command("fill W")
+    filled = grid_to_bytes(game.grid)
+    assert filled != before
+    assert sum(element.key == 'W' for element in game.grid.get_all_elements()) == 6 * 8 - 1
+    assert game.grid.get_element(5, 5).key == 'S'
+    assert game.grid.get_element(1, 1) is None
+
+    processor.process_command("undo")
+    assert grid_to_bytes(game.grid) == before
+    processor.process_command("redo")
+    assert grid_to_bytes(game.grid) == filled
+    game.undo()
+    assert grid_to_bytes(game.grid) == before
+
+
+def test_fill_over_limit_changes_nothing(make_game):
+    game = make_game()
+    processor = CommandProcessor(game, None)
+    before = grid_to_bytes(game.grid)
+    processor.process_command("fill W 10") # The empty grid is far larger
+    assert grid_to_bytes(game.grid) == before
+    assert len(game.history) == 0
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+import random
+
+import pytest
+
+from falling_sand_game.command import CommandProcessor
+from falling_sand_game.replay import Recorder, ReplayPlayer, grid_checksum, load_replay
+from conftest import BACKENDS
+
+
+def _play(game, processor, rng, ticks):
+    """Draws with random elements at random spots and runs the simulation, like a player."""
+    for tick in range(ticks):
+        game.cursor_y = rng.randrange(game.grid.height)
+        game.cursor_x = rng.randrange(game.grid.width)
+        game.handle_input(ord(str(rng.randrange(1, 7)))) # Select an element by number
+        game.handle_input(ord(' ')) # Place it
+        if tick == ticks // 2:
+            processor.process_command("fill W 60 3")
+        game.update()
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_record_replay_checksum(tmp_path, make_game, backend):
+    path = str(tmp_path / "session.fsr")
+    game = make_game(backend, seed=3, scene_seed=4)
+    processor = CommandProcessor(game, None)
+    game.recorder = Recorder(game, path)
+    _play(game, processor, random.Random(1), 60)
+    expected = grid_checksum(game.grid)
+    game.stop_recording()
+
+    player = ReplayPlayer(*load_replay(path))
+    player.run()
+    assert player.checksum_matches() is True
+    assert grid_checksum(player.game.grid) == expected
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_replay_after_timeline_seek(tmp_path, make_game, backend):
+    path = str(tmp_path / "session.fsr")
+    timeline_path = str(tmp_path / "run.fst")
+    game = make_game(backend, seed=3, scene_seed=4)
+    processor = CommandProcessor(game, None)
+    game.recorder = Recorder(game, path)
+    rng = random.Random(2)
+    processor.process_command(f"timeline start {timeline_path} 10")
+    _play(game, processor, rng, 30)
+    processor.process_command("timeline seek 12") # Back in time: not replayed as a command
+    assert game.simulation.tick_count == 12
+    _play(game, processor, rng, 20)
+    expected = grid_checksum(game.grid)
+    game.stop_recording()
+
+    player = ReplayPlayer(*load_replay(path))
+    player.run()
+    assert player.checksum_matches() is True
+    assert grid_checksum(player.game.grid) == expected
+
+
+def test_replay_detects_a_changed_log(tmp_path, make_game):
+    path = str(tmp_path / "session.fsr")
+    game = make_game("object", seed=3, scene_seed=4)
+    game.recorder = Recorder(game, path)
+    _play(game, CommandProcessor(game, None), random.Random(1), 30)
+    game.stop_recording()
+
+    header, events = load_replay(path)
+    key_events = [event for event in events if event[2] == "key" and event[3] == ord(' ')]
+    key_events[0][4] = (key_events[0][4] + 7) % game.grid.height # Place the first element elsewhere
+    player = ReplayPlayer(header, events)
+    player.run()
+    assert player.checksum_matches() is False
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+import json
+import struct
+import zlib
+
+import pytest
+
+from falling_sand_game import savefile
+from falling_sand_game.grid import Grid
+from falling_sand_game.typed_grid import TypedGrid
+from conftest import cell_keys, fill_scene
+
+
+def _sample_grid(grid_class):
+    """A grid with tags and element state, next to a few plain elements."""
+    grid = grid_class(6, 8, savefile.element_manager)
+    fill_scene(grid, 3, density=0.5)
+    grid.set_element(0, 0, grid.create_element('T', 0, 0, ["hot"])) # Thermite
+    grid.get_element(0, 0).is_burning = True
+    grid.get_element(0, 0).burn_timer = 7
+    grid.set_element(5, 7, grid.create_element('o', 5, 7)) # Bomb
+    return grid
+
+
+def _with_version(data, version, rename=None):
+    """
+    Rewrites a current binary save as an older version: sets the version byte,
+    renames a key (old, new) and, for version 1, stores "state" per cell.
+    """
+    header = bytearray(data[:savefile._HEADER.size])
+    header[4] = version
+    body = zlib.decompress(data[savefile._HEADER.size:])
+    (key_count,) = struct.unpack_from("<H", body, 0)
+    offset = 2
+    keys = []
+    for _ in range(key_count):
+        (length,) = struct.unpack_from("<B", body, offset)
+        keys.append(body[offset + 1:offset + 1 + length].decode('utf-8'))
+        offset += 1 + length
+    _, _, code_size, _, height, width = savefile._HEADER.unpack_from(data)
+    plane = body[offset:offset + height * width * code_size]
+    side_tables = json.loads(body[offset + len(plane):].decode('utf-8'))
+    if rename is not None:
+        keys = [rename[1] if key == rename[0] else key for key in keys]
+    if version == 1:
+        side_tables["state"] = [[index, dict(zip(table["fields"], values))]
+                                for table in side_tables["state"].values()
+                                for index, *values in zip(table["cells"], *table["columns"])]
+    new_body = [struct.pack("<H", len(keys))]
+    for key in keys:
+        encoded = key.encode('utf-8')
+        new_body.append(struct.pack("<B", len(encoded)) + encoded)
+    new_body.append(plane)
+    new_body.append(json.dumps(side_tables).encode('utf-8'))
+    return bytes(header) + zlib.compress(b"".join(new_body))
+
+
+def _assert_same_cells(loaded, original):
+    assert (loaded.height, loaded.width) == (original.height, original.width)
+    assert cell_keys(loaded) == cell_keys(original)
+    assert savefile.grid_to_bytes(loaded) == savefile.grid_to_bytes(original)
+
+
+@pytest.mark.parametrize("grid_class", [Grid, TypedGrid])
+@pytest.mark.parametrize("extension", [savefile.BINARY_EXTENSION, savefile.JSON_EXTENSION])
+def test_save_load_round_trip(tmp_path, grid_class, extension):
+    grid = _sample_grid(grid_class)
+    path = str(tmp_path / f"scene{extension}")
+    savefile.save_grid(grid, path)
+    loaded = savefile.load_grid(path, grid_class)
+    _assert_same_cells(loaded, grid)
+    thermite = loaded.get_element(0, 0)
+    assert thermite.tags == ["hot"]
+    assert (thermite.is_burning, thermite.burn_timer) == (True, 7)
+
+
+@pytest.mark.parametrize("version", [1, 2])
+def test_load_older_binary_versions(version):
+    grid = _sample_grid(Grid)
+    # Before version 3 the Bomb was saved under 'B'
+    old_data = _with_version(savefile.grid_to_bytes(grid), version, rename=('o', 'B'))
+    loaded = savefile.bytes_to_grid(old_data, Grid)
+    _assert_same_cells(loaded, grid)
+    assert loaded.get_element(5, 7).key == 'o'
+    assert loaded.get_element(0, 0).burn_timer == 7
+
+
+def test_load_json_without_version_migrates_keys():
+    grid = _sample_grid(Grid)
+    grid_data = savefile.grid_to_dict(grid)
+    del grid_data["version"]
+    for element_data in grid_data["elements"]:
+        if element_data["key"] == 'o':
+            element_data["key"] = 'B'
+    loaded = savefile.dict_to_grid(grid_data, Grid)
+    assert loaded.get_element(5, 7).key == 'o'
+
+
+def test_current_binary_keeps_ember_key():
+    grid = Grid(2, 2, savefile.element_manager)
+    grid.set_element(1, 1, grid.create_element('B', 1, 1)) # Ember
+    loaded = savefile.bytes_to_grid(savefile.grid_to_bytes(grid), Grid)
+    assert loaded.get_element(1, 1).key == 'B'
+
+
+def test_rejects_unknown_version():
+    data = _with_version(savefile.grid_to_bytes(_sample_grid(Grid)), 99)
+    with pytest.raises(ValueError):
+        savefile.bytes_to_grid(data, Grid)
+
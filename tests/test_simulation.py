@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from falling_sand_game.savefile import grid_to_bytes
+from conftest import BACKENDS
+
+
+def _run(make_game, backend, seed, ticks=40):
+    game = make_game(backend, seed=seed, scene_seed=2)
+    for _ in range(ticks):
+        game.update()
+    return grid_to_bytes(game.grid)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_same_seed_gives_identical_save(make_game, backend):
+    assert _run(make_game, backend, 5) == _run(make_game, backend, 5)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_seed_changes_the_outcome(make_game, backend):
+    assert _run(make_game, backend, 5) != _run(make_game, backend, 6)
+
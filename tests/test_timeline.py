@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from falling_sand_game.timeline import Timeline
+from conftest import BACKENDS, cell_keys
+
+
+def _record(game, path, ticks, keyframe_interval=5):
+    """Records `ticks` ticks of the game. Returns the cell keys after every tick."""
+    timeline = Timeline(path, keyframe_interval)
+    simulation = game.simulation
+    timeline.start(game.grid, simulation.tick_count)
+    states = {simulation.tick_count: cell_keys(game.grid)}
+    for _ in range(ticks):
+        game.update()
+        timeline.record(game.grid, simulation.tick_count)
+        states[simulation.tick_count] = cell_keys(game.grid)
+    return timeline, states
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_seek_rebuilds_every_tick(tmp_path, make_game, backend):
+    game = make_game(backend, seed=2, scene_seed=6)
+    path = str(tmp_path / "run.fst")
+    timeline, states = _record(game, path, 23)
+    grid_class = game.simulation.grid_class
+    try:
+        for tick in sorted(states, reverse=True): # Backwards too, across keyframes
+            assert cell_keys(timeline.seek(tick, grid_class)) == states[tick]
+    finally:
+        timeline.close()
+
+    reopened = Timeline.open(path)
+    try:
+        assert reopened.keyframe_count == timeline.keyframe_count
+        for tick in (min(states), 7, 10, max(states)):
+            assert cell_keys(reopened.seek(tick, grid_class)) == states[tick]
+        with pytest.raises(ValueError):
+            reopened.seek(max(states) + 1, grid_class)
+    finally:
+        reopened.close()
+
+
+def test_timeline_refuses_to_overwrite(tmp_path, make_game):
+    path = tmp_path / "run.fst"
+    timeline, _ = _record(make_game(scene_seed=1), str(path), 3)
+    timeline.close()
+    size = path.stat().st_size
+    with pytest.raises(FileExistsError):
+        Timeline(str(path))
+    assert path.stat().st_size == size
+    Timeline(str(path), overwrite=True).close()
+    assert path.stat().st_size < size